@@ -0,0 +1,28 @@
+"""add document content hash
+
+Revision ID: 7c1f3a9e2b4d
+Revises: 3d506c6ad88b
+Create Date: 2024-03-18 10:12:45.318204
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7c1f3a9e2b4d"
+down_revision: Union[str, None] = "3d506c6ad88b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "documents", sa.Column("content_hash", sa.String(length=64), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("documents", "content_hash")
@@ -0,0 +1,45 @@
+"""add blobs
+
+Revision ID: b5e2d8c4f1a7
+Revises: 7c1f3a9e2b4d
+Create Date: 2024-03-20 14:05:12.904127
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b5e2d8c4f1a7"
+down_revision: Union[str, None] = "7c1f3a9e2b4d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "blobs",
+        sa.Column("id", sa.String(length=64), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.Column(
+            "updated_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.add_column(
+        "documents", sa.Column("blob_id", sa.String(length=64), nullable=True)
+    )
+    op.create_foreign_key(
+        "documents_blob_id_fkey", "documents", "blobs", ["blob_id"], ["id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("documents_blob_id_fkey", "documents", type_="foreignkey")
+    op.drop_column("documents", "blob_id")
+    op.drop_table("blobs")
@@ -0,0 +1,33 @@
+"""add keyset indexes
+
+Revision ID: d4a9c2e7f3b1
+Revises: b5e2d8c4f1a7
+Create Date: 2024-03-22 10:41:37.215804
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d4a9c2e7f3b1"
+down_revision: Union[str, None] = "b5e2d8c4f1a7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_projects_created_at_id", "projects", ["created_at", "id"], unique=False
+    )
+    op.create_index(
+        "ix_documents_project_id_created_at_id",
+        "documents",
+        ["project_id", "created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_documents_project_id_created_at_id", table_name="documents")
+    op.drop_index("ix_projects_created_at_id", table_name="projects")
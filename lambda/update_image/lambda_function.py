@@ -1,9 +1,22 @@
-import uuid
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 from urllib.parse import unquote_plus
 
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 from PIL import Image
 
+log = logging.getLogger()
+log.setLevel(logging.INFO)
+
+# records are processed in threads, PIL releases the GIL while decoding and
+#   encoding, and the S3 requests mostly wait on the network
+WORKERS = int(os.environ.get("WORKERS", 8))
+
 
 # https://note.nkmk.me/en/python-pillow-square-circle-thumbnail/
 def crop_center(pil_img: Image.Image, crop_width, crop_height):
@@ -23,27 +36,135 @@ def crop_max_square(pil_img):
     return crop_center(pil_img, min(pil_img.size), min(pil_img.size))
 
 
-def resize_image(file, filename):
-    with Image.open(file) as im:
-        im = crop_max_square(im)
-        im.thumbnail((400, 400))
-        im.save(filename, "JPEG")
+# same as src.shared.config of the API
+LOGO_SIZE = 200
+LOGO_SIZES = [
+    int(size) for size in os.environ.get("LOGO_SIZES", "32,64,200,400").split(",")
+]
+LOGO_FORMATS = os.environ.get("LOGO_FORMATS", "webp,jpeg").split(",")
 
 
-s3_client = boto3.client("s3")
+def renditions(key):
+    # "<key>" is the default logo, see src.services.renditions of the API
+    return [(key, LOGO_SIZE, "jpeg")] + [
+        (f"{key}_{size}.{format}", size, format)
+        for size in LOGO_SIZES
+        for format in LOGO_FORMATS
+    ]
 
 
-def lambda_handler(event, context):
-    for record in event["Records"]:
-        bucket = record["s3"]["bucket"]["name"]
-        key = unquote_plus(record["s3"]["object"]["key"])
+MEDIA_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp"}
+
+
+# same as src.services.local.images of the API
+IMAGE_RESAMPLE = os.environ.get("IMAGE_RESAMPLE", "lanczos")
+MAX_IMAGE_PIXELS = int(os.environ.get("MAX_IMAGE_PIXELS", 50_000_000))
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+
+def opaque(image):
+    # JPEG has no alpha, transparent pixels would be black without the background
+    background = Image.new("RGB", image.size, "white")
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+
+def resize_image(file, targets):
+    """Encoded images for the (name, size, format) targets, kept in memory."""
+    with Image.open(file) as im:  # only the header is read here
+        # PIL itself only raises over twice the MAX_IMAGE_PIXELS
+        if im.width * im.height > MAX_IMAGE_PIXELS:
+            raise Image.DecompressionBombError(
+                f"Image size ({im.width * im.height} pixels) exceeds limit"
+            )
+        largest = max(size for _, size, _ in targets)
+
+        # JPEG is decoded at 1/2, 1/4 or 1/8 of the size right away,
+        #   as long as the square stays larger than the largest image
+        width, height = im.size
+        side = min(width, height)
+        im.draft("RGB", (largest * width // side, largest * height // side))
+
+        image = crop_max_square(im)
+        # cheap integer downscaling, keeping twice the size for the final filter
+        factor = min(image.size) // (largest * 2)
+        if factor > 1:
+            image = image.reduce(factor)
+        image = image.convert("RGBA")
+
+    images = []
+    resample = Image.Resampling[IMAGE_RESAMPLE.upper()]
+    # each image is resized from the previous larger one
+    for name, size, format in sorted(targets, key=lambda t: -t[1]):
+        image = image.copy()
+        image.thumbnail((size, size), resample)
+        output = BytesIO()
+        (image if format == "webp" else opaque(image)).save(output, format.upper())
+        images.append((name, output.getvalue(), format))
+    return images
+
 
-        tmpkey = key.replace("/", "")
-        download_path = "/tmp/{}{}".format(uuid.uuid4(), tmpkey)
-        upload_path = "/tmp/resized-{}".format(tmpkey)
+s3_client = boto3.client(
+    "s3", config=Config(max_pool_connections=WORKERS * len(renditions("")))
+)
+upload_pool = ThreadPoolExecutor(WORKERS * len(renditions("")))
+
+
+def process_object(bucket, key):
+    try:
+        body = s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "NoSuchKey":  # retried after it was done
+            log.info("Skipping %s, it was already processed", key)
+            return
+        raise
+
+    def upload(image):
+        name, data, format = image
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=name.replace("/", "-processed/"),
+            Body=data,
+            ContentType=MEDIA_TYPES[format],
+        )
+
+    images = resize_image(BytesIO(body), renditions(key))
+    list(upload_pool.map(upload, images))  # raises the first failure
+    s3_client.delete_object(Bucket=bucket, Key=key)
+
+
+def s3_records(record):
+    # S3 notifications are received directly or through an SQS queue
+    if record.get("eventSource") == "aws:sqs":
+        return json.loads(record["body"]).get("Records", [])  # none in s3:TestEvent
+    return [record]
+
+
+def process_record(record):
+    for s3_record in s3_records(record):
+        bucket = s3_record["s3"]["bucket"]["name"]
+        key = unquote_plus(s3_record["s3"]["object"]["key"])
+        process_object(bucket, key)
+
+
+def lambda_handler(event, context):
+    records = event["Records"]
+    with ThreadPoolExecutor(WORKERS) as pool:
+        futures = [pool.submit(process_record, record) for record in records]
 
-        s3_client.download_file(bucket, key, download_path)
-        resize_image(download_path, upload_path)
+    failures = []
+    for record, future in zip(records, futures, strict=True):
+        if future.exception() is not None:
+            log.error("Failed to process %s: %r", record, future.exception())
+            failures.append(record)
 
-        s3_client.upload_file(upload_path, bucket, key.replace("/", "-processed/"))
-        s3_client.delete_object(Bucket=bucket, Key=key)
+    # only the failed messages of SQS are retried, see ReportBatchItemFailures
+    #   https://docs.aws.amazon.com/lambda/latest/dg/services-sqs-errorhandling.html
+    if any(record.get("eventSource") != "aws:sqs" for record in failures):
+        # direct invocations are retried as a whole, processed keys are skipped
+        raise RuntimeError(f"Failed to process {len(failures)} of {len(records)}")
+    return {
+        "batchItemFailures": [
+            {"itemIdentifier": record["messageId"]} for record in failures
+        ]
+    }
@@ -0,0 +1,18 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import src.auth.utils as auth_utils
+import src.user.async_dao as user_async_dao
+from src.shared.logs import log
+
+
+async def authenticate_user(db: AsyncSession, login: str, password: str):
+    user = await user_async_dao.get_user_by_login(db, login)
+    log.debug("Authenticating user %s", login)
+    if not user:
+        log.info("Was not able to find user %s", login)
+        return False
+    if not await auth_utils.verify_password_async(password, user.hashed_password):
+        log.info("Password verification for %s failed", login)
+        return False
+    log.debug("Authentication successed")
+    return user
@@ -7,12 +7,12 @@ from src.shared.logs import log
 
 def authenticate_user(db: Session, login: str, password: str):
     user = user_dao.get_user_by_login(db, login)
-    log.debug(f"Authenticating user {login}")
+    log.debug("Authenticating user %s", login)
     if not user:
-        log.info(f"Was not able to find user {login}")
+        log.info("Was not able to find user %s", login)
         return False
     if not auth_utils.verify_password(password, user.hashed_password):
-        log.info(f"Password verification for {login} failed")
+        log.info("Password verification for %s failed", login)
         return False
     log.debug("Authentication successed")
     return user
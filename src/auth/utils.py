@@ -1,5 +1,8 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Optional, Tuple
+from threading import BoundedSemaphore
+from typing import Any, Callable, Dict, Optional, Tuple
 
 from fastapi import HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
@@ -8,8 +11,15 @@ from passlib.context import CryptContext
 
 import src.auth.dto as auth_dto
 import src.auth.utils as auth_utils
+import src.shared.metrics as metrics
 import src.user.models as user_models
-from src.shared.config import ACCESS_TOKEN_EXPIRE_MINUTES, ALGORITHM, SECRET_KEY
+from src.shared.config import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    ALGORITHM,
+    PASSWORD_HASH_QUEUE_SIZE,
+    PASSWORD_HASH_WORKERS,
+    SECRET_KEY,
+)
 from src.shared.logs import log
 
 pwd_context = CryptContext(schemes=["bcrypt"])
@@ -68,13 +78,73 @@ oauth2_scheme = OAuth2PasswordCustomHeader(
 )
 
 
+class PasswordPool:
+    """Bounded pool for the password hashing, bcrypt releases the GIL while hashing.
+
+    Raises HTTPException 503 when all of the workers are busy and the queue is full,
+    so bursts of logins don't take the threads and the CPU from the rest of the API.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="password")
+        self._slots = BoundedSemaphore(workers + queue_size)
+
+    def submit(self, fn: Callable, *args: Any) -> Future:
+        if not self._slots.acquire(blocking=False):
+            metrics.PASSWORD_POOL_REJECTIONS.inc()
+            log.warning("Password hashing queue is full, rejecting the request")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests, try again later",
+                headers={"Retry-After": "1"},
+            )
+
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn: Callable, *args: Any) -> Any:
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn: Callable, *args: Any) -> Any:
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+
+password_pool = PasswordPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE)
+
+
+def _verify(plain_password, hashed_password):
+    with metrics.PASSWORD_HASH_DURATION.labels("verify").time():
+        return pwd_context.verify(plain_password, hashed_password)
+
+
+def _hash(password):
+    with metrics.PASSWORD_HASH_DURATION.labels("hash").time():
+        return pwd_context.hash(password)
+
+
 def verify_password(plain_password, hashed_password):
     log.debug("Verifying the password")
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_pool.run(_verify, plain_password, hashed_password)
 
 
 def get_password_hash(password):
-    hashed_password = pwd_context.hash(password)
+    hashed_password = password_pool.run(_hash, password)
+    log.debug("Hashing the password")
+    return hashed_password
+
+
+async def verify_password_async(plain_password, hashed_password):
+    log.debug("Verifying the password")
+    return await password_pool.run_async(_verify, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password):
+    hashed_password = await password_pool.run_async(_hash, password)
     log.debug("Hashing the password")
     return hashed_password
 
@@ -88,7 +158,7 @@ def create_access_token(data: dict[str, Any], expires_delta: timedelta | None =
 
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    log.debug(f"Created new token until {expire}")
+    log.debug("Created new token until %s", expire)
 
     return encoded_jwt
 
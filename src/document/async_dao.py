@@ -0,0 +1,152 @@
+from uuid import uuid4
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import src.document.models as document_models
+import src.project.async_dao as project_async_dao
+import src.project.models as project_models
+from src.shared.database import (
+    CountStrategy,
+    count_total_async,
+    keyset_page,
+    keyset_query,
+)
+
+
+async def get_document_by_id(
+    db: AsyncSession, document_id: str
+) -> document_models.Document | None:
+    return await db.get(document_models.Document, document_id)
+
+
+async def create_document(
+    db: AsyncSession,
+    project: project_models.Project,
+    filename: str | None,
+    id: str | None = None,
+    content_hash: str | None = None,
+    blob_id: str | None = None,
+) -> document_models.Document:
+    id = id or str(uuid4())
+    db_document = document_models.Document(
+        id=id,
+        name=filename or id,  # filename can be None, replaced with the ID
+        content_hash=content_hash,
+        blob_id=blob_id,
+        project_id=project.id,
+    )
+    db.add(db_document)
+    await db.commit()
+    await db.refresh(db_document)
+    return db_document
+
+
+async def update_document(
+    db: AsyncSession,
+    db_document: document_models.Document,
+    filename: str,
+    content_hash: str | None = None,
+    blob_id: str | None = None,
+) -> document_models.Document:
+    db_document.name = filename
+    if content_hash is not None:
+        db_document.content_hash = content_hash
+    if blob_id is not None:
+        db_document.blob_id = blob_id
+    await db.commit()
+    await db.refresh(db_document)
+    return db_document
+
+
+async def get_project_by_document_id(
+    db: AsyncSession, document_id: str
+) -> project_models.Project | None:
+    db_document = await get_document_by_id(db, document_id)
+    if not db_document:
+        return None
+    return await project_async_dao.get_project(db, db_document.project_id)
+
+
+async def get_available_documents(
+    db: AsyncSession,
+    project_id: int,
+    limit: int = 10,
+    offset: int = 0,
+) -> list[document_models.Document] | None:
+    db_project = await project_async_dao.get_project(db, project_id)
+
+    if not db_project:
+        return None
+
+    return list(
+        await db.scalars(
+            select(document_models.Document)
+            .filter_by(project_id=project_id)
+            # same order as the keyset pages, so the pages do not overlap
+            .order_by(document_models.Document.created_at, document_models.Document.id)
+            .limit(limit)
+            .offset(offset)
+        )
+    )
+
+
+async def get_available_documents_page(
+    db: AsyncSession,
+    project_id: int,
+    limit: int = 10,
+    cursor: str | None = None,
+    count: CountStrategy = CountStrategy.none,
+) -> dict | None:
+    """Raises ValueError on invalid cursor."""
+    db_project = await project_async_dao.get_project(db, project_id)
+
+    if not db_project:
+        return None
+
+    created_at, id = document_models.Document.created_at, document_models.Document.id
+    query = select(document_models.Document).filter_by(project_id=project_id)
+    rows = (await db.scalars(keyset_query(query, created_at, id, limit, cursor))).all()
+    total = await count_total_async(db, query, count)
+    return keyset_page(rows, created_at, id, limit, total)
+
+
+async def delete_document(db: AsyncSession, document_id: str) -> None:
+    db_document = await get_document_by_id(db, document_id)
+    await db.delete(db_document)
+    await db.commit()
+
+
+async def acquire_blob(db: AsyncSession, content_hash: str) -> bool:
+    """Adds a reference to the blob, True if it is new and its file must be saved.
+
+    Blobs left without documents are new again, their files can be already deleted.
+    Not committed, the row stays locked until then, so the concurrent uploads of
+    the same content wait for the file to be saved.
+    """
+    ref_count = await db.scalar(
+        insert(document_models.Blob)
+        .values(id=content_hash, ref_count=1)
+        .on_conflict_do_update(
+            index_elements=[document_models.Blob.id],
+            set_={"ref_count": document_models.Blob.ref_count + 1},
+        )
+        .returning(document_models.Blob.ref_count)
+    )
+    return ref_count == 1
+
+
+async def release_blob(db: AsyncSession, blob_id: str) -> bool:
+    """Removes a reference to the blob, True if it is left without documents.
+
+    Such blobs are deleted with their files by delete_unreferenced_blobs.
+    Not committed.
+    """
+    ref_count = await db.scalar(
+        update(document_models.Blob)
+        .filter_by(id=blob_id)
+        .values(ref_count=document_models.Blob.ref_count - 1)
+        .returning(document_models.Blob.ref_count)
+    )
+    return ref_count is not None and ref_count <= 0
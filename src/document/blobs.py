@@ -0,0 +1,198 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, AsyncIterable, NamedTuple
+from uuid import uuid4
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+import src.document.dao as document_dao
+import src.document.models as document_models
+from src.services import file_service
+from src.services.deletion import deletions
+from src.services.utils import FileTooLargeError, hash_file
+from src.shared.config import BULK_UPLOAD_CONCURRENCY
+from src.shared.database import get_sessionmaker
+from src.shared.logs import log
+
+# Documents with the same content share a single file named by its SHA-256,
+#   see document_models.Blob. Changes of the references are committed together
+#   with the documents, files are saved while the rows are locked and deleted
+#   after the response by the deletion queue.
+
+
+def save_content(db: Session, in_file: IO, content_type: str | None = None) -> str:
+    """Returns SHA-256 of the content, saved only if no other document has it.
+
+    Raises FileTooLargeError.
+    """
+    content_hash = hash_file(in_file)
+    if document_dao.acquire_blob(db, content_hash):
+        try:
+            file_service.documents.save_file(in_file, content_hash, content_type)
+        except BaseException:
+            db.rollback()
+            raise
+    return content_hash
+
+
+async def save_content_stream(
+    db: Session, chunks: AsyncIterable[bytes], content_type: str | None = None
+) -> str:
+    """Same as save_content for the chunks of the request body.
+
+    The hash is known only at the end, so the content is saved under
+    a temporary id and renamed or deleted then.
+    """
+    upload_id = f".upload-{uuid4()}"
+    content_hash = await file_service.documents.save_stream(
+        chunks, upload_id, content_type
+    )
+
+    moved = False
+    try:
+        if await run_in_threadpool(document_dao.acquire_blob, db, content_hash):
+            await run_in_threadpool(
+                file_service.documents.move_file, upload_id, content_hash
+            )
+            moved = True
+    except BaseException:
+        await run_in_threadpool(db.rollback)
+        raise
+    finally:
+        if not moved:
+            await run_in_threadpool(file_service.documents.delete_file_by_id, upload_id)
+    return content_hash
+
+
+class Upload(NamedTuple):
+    filename: str | None
+    file: IO
+    content_type: str | None
+
+
+def _hash_upload(upload: Upload) -> str | Exception:
+    try:
+        return hash_file(upload.file)
+    except FileTooLargeError as e:
+        return e
+
+
+def save_documents(
+    db: Session,
+    project_id: int,
+    uploads: list[Upload],
+    concurrency: int = BULK_UPLOAD_CONCURRENCY,
+) -> list[document_models.Document | Exception]:
+    """Creates a document for each of the uploads in a single transaction.
+
+    Contents are hashed and the new ones saved by up to concurrency threads.
+    Returns the document or the error of each upload in the same order,
+    FileTooLargeError or the one raised by the file service.
+    """
+    failed: dict[str, Exception] = {}
+    try:
+        with ThreadPoolExecutor(max(1, min(concurrency, len(uploads)))) as pool:
+            hashes = list(pool.map(_hash_upload, uploads))
+            counts = Counter(h for h in hashes if isinstance(h, str))
+            new_blobs = document_dao.acquire_blobs(db, counts)
+
+            # new contents are saved once, while the blobs are locked
+            first_uploads = {
+                h: u for h, u in zip(hashes, uploads, strict=True) if isinstance(h, str)
+            }
+            saves = {
+                h: pool.submit(
+                    file_service.documents.save_file, u.file, h, u.content_type
+                )
+                for h, u in first_uploads.items()
+                if h in new_blobs
+            }
+            for content_hash, future in saves.items():
+                error = future.exception()
+                if isinstance(error, Exception):
+                    log.error("Failed to save the content %s: %s", content_hash, error)
+                    failed[content_hash] = error
+                elif error is not None:
+                    raise error
+
+        documents = [
+            {"name": u.filename, "content_hash": h, "blob_id": h}
+            for h, u in zip(hashes, uploads, strict=True)
+            if isinstance(h, str) and h not in failed
+        ]
+        # blobs of the failed contents are left without documents again
+        for content_hash in failed:
+            document_dao.release_blob(db, content_hash, counts[content_hash])
+        if documents:
+            created = iter(document_dao.create_documents(db, project_id, documents))
+        else:  # every upload failed, only the released blobs are committed
+            db.commit()
+            created = iter([])
+    except BaseException:
+        db.rollback()
+        raise
+
+    delete_blobs_later(list(failed))
+    return [
+        h if isinstance(h, Exception) else failed.get(h) or next(created)
+        for h in hashes
+    ]
+
+
+def collect_blobs(blob_ids: list[str]) -> None:
+    """Deletes the blobs left without documents with their files.
+
+    Run by the deletion queue, the ones missed are deleted by the reconciler.
+    """
+    with get_sessionmaker()() as db:
+        removed = document_dao.delete_unreferenced_blobs(db, blob_ids)
+        # deleted while the rows are locked, see document_dao.acquire_blob
+        file_service.documents.delete_files(removed)
+        db.commit()
+
+
+def delete_blobs_later(blob_ids: list[str]) -> None:
+    if blob_ids:
+        deletions.put(collect_blobs, blob_ids)
+
+
+def _delete_later(blob_id: str | None, document_id: str) -> None:
+    if blob_id is not None:
+        delete_blobs_later([blob_id])
+    else:  # stored under its id before the blobs
+        deletions.put(file_service.documents.delete_files, [document_id])
+
+
+def replace_content(
+    db: Session,
+    document: document_models.Document,
+    in_file: IO,
+    filename: str,
+    content_type: str | None = None,
+) -> document_models.Document:
+    """Raises FileTooLargeError, the document is not changed in that case."""
+    content_hash = save_content(db, in_file, content_type)
+    previous_blob_id = document.blob_id
+    released = previous_blob_id is None or document_dao.release_blob(
+        db, previous_blob_id
+    )
+
+    document.name = filename
+    document.content_hash = document.blob_id = content_hash
+    db.commit()
+    db.refresh(document)
+
+    if released:
+        _delete_later(previous_blob_id, document.id)
+    return document
+
+
+def delete_document(db: Session, document: document_models.Document) -> None:
+    blob_id, document_id = document.blob_id, document.id
+    released = blob_id is None or document_dao.release_blob(db, blob_id)
+    db.delete(document)
+    db.commit()
+
+    if released:
+        _delete_later(blob_id, document_id)
@@ -1,10 +1,19 @@
+from datetime import timedelta
 from uuid import uuid4
 
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
 import src.document.models as document_models
 import src.project.dao as project_dao
 import src.project.models as project_models
+from src.shared.database import (
+    CountStrategy,
+    count_total,
+    keyset_page,
+    keyset_query,
+)
 
 
 def get_document_by_id(
@@ -14,10 +23,20 @@ def get_document_by_id(
 
 
 def create_document(
-    db: Session, project: project_models.Project, filename: str | None
+    db: Session,
+    project: project_models.Project,
+    filename: str | None,
+    id: str | None = None,
+    content_hash: str | None = None,
+    blob_id: str | None = None,
 ) -> document_models.Document:
+    id = id or str(uuid4())
     db_document = document_models.Document(
-        id=str(uuid4()), name=filename, project=project
+        id=id,
+        name=filename or id,  # filename can be None, replaced with the ID
+        content_hash=content_hash,
+        blob_id=blob_id,
+        project=project,
     )
     db.add(db_document)
     db.commit()
@@ -25,10 +44,48 @@ def create_document(
     return db_document
 
 
+def create_documents(
+    db: Session, project_id: int, documents: list[dict]
+) -> list[document_models.Document]:
+    """Inserts all of the documents with a single executemany and commits.
+
+    Values are the columns of document_models.Document without project_id,
+    the id and name default to a new UUID. Returned in the order of the values.
+    """
+    if not documents:
+        return []
+    rows = []
+    for document in documents:
+        id = document.get("id") or str(uuid4())
+        name = document.get("name") or id
+        rows.append({**document, "id": id, "name": name, "project_id": project_id})
+    db_documents = list(
+        db.scalars(
+            insert(document_models.Document).returning(
+                document_models.Document, sort_by_parameter_order=True
+            ),
+            rows,
+        )
+    )
+    # detached before the commit, so they are not expired and loaded one by one
+    for db_document in db_documents:
+        db.expunge(db_document)
+    db.commit()
+    return db_documents
+
+
 def update_document(
-    db: Session, db_document: document_models.Document, filename: str
+    db: Session,
+    db_document: document_models.Document,
+    filename: str,
+    content_hash: str | None = None,
+    blob_id: str | None = None,
 ) -> document_models.Document:
     db_document.name = filename
+    if content_hash is not None:
+        db_document.content_hash = content_hash
+    if blob_id is not None:
+        db_document.blob_id = blob_id
     db.commit()
     db.refresh(db_document)
     return db_document
@@ -57,12 +114,108 @@ def get_available_documents(
     return list(
         db.query(document_models.Document)
         .filter_by(project_id=project_id)
+        # same order as the keyset pages, so the pages do not overlap
+        .order_by(document_models.Document.created_at, document_models.Document.id)
         .limit(limit)
         .offset(offset)
         .all()
     )
 
 
+def get_available_documents_page(
+    db: Session,
+    project_id: int,
+    limit: int = 10,
+    cursor: str | None = None,
+    count: CountStrategy = CountStrategy.none,
+) -> dict | None:
+    """Raises ValueError on invalid cursor."""
+    db_project = project_dao.get_project(db, project_id)
+
+    if not db_project:
+        return None
+
+    created_at, id = document_models.Document.created_at, document_models.Document.id
+    query = select(document_models.Document).filter_by(project_id=project_id)
+    rows = db.scalars(keyset_query(query, created_at, id, limit, cursor)).all()
+    return keyset_page(rows, created_at, id, limit, count_total(db, query, count))
+
+
 def delete_document(db: Session, document_id: str) -> None:
     db_document = get_document_by_id(db, document_id)
     db.delete(db_document)
+    db.commit()
+
+
+def acquire_blob(db: Session, content_hash: str) -> bool:
+    """Adds a reference to the blob, True if it is new and its file must be saved.
+
+    Blobs left without documents are new again, their files can be already deleted.
+    Not committed, the row stays locked until then, so the concurrent uploads of
+    the same content wait for the file to be saved.
+    """
+    ref_count = db.scalar(
+        insert(document_models.Blob)
+        .values(id=content_hash, ref_count=1)
+        .on_conflict_do_update(
+            index_elements=[document_models.Blob.id],
+            set_={"ref_count": document_models.Blob.ref_count + 1},
+        )
+        .returning(document_models.Blob.ref_count)
+    )
+    return ref_count == 1
+
+
+def acquire_blobs(db: Session, counts: dict[str, int]) -> set[str]:
+    """Same as acquire_blob for the number of references to each of the blobs.
+
+    Returns the new ones. Rows are locked in the order of the ids, so concurrent
+    uploads of the same contents do not deadlock.
+    """
+    if not counts:
+        return set()
+    query = insert(document_models.Blob).values(
+        [{"id": id, "ref_count": counts[id]} for id in sorted(counts)]
+    )
+    rows = db.execute(
+        query.on_conflict_do_update(
+            index_elements=[document_models.Blob.id],
+            set_={
+                "ref_count": document_models.Blob.ref_count + query.excluded.ref_count
+            },
+        ).returning(document_models.Blob.id, document_models.Blob.ref_count)
+    )
+    return {id for id, ref_count in rows if ref_count == counts[id]}
+
+
+def release_blob(db: Session, blob_id: str, count: int = 1) -> bool:
+    """Removes count references to the blob, True if it is left without documents.
+
+    Such blobs are deleted with their files by delete_unreferenced_blobs.
+    Not committed.
+    """
+    ref_count = db.scalar(
+        update(document_models.Blob)
+        .filter_by(id=blob_id)
+        .values(ref_count=document_models.Blob.ref_count - count)
+        .returning(document_models.Blob.ref_count)
+    )
+    return ref_count is not None and ref_count <= 0
+
+
+def delete_unreferenced_blobs(
+    db: Session,
+    blob_ids: list[str] | None = None,
+    older_than: timedelta | None = None,
+) -> list[str]:
+    """Deletes the blobs without documents, returns their ids.
+
+    Not committed, the rows stay locked until then, so their files can be deleted
+    before the blobs are acquired again.
+    """
+    query = delete(document_models.Blob).where(document_models.Blob.ref_count <= 0)
+    if blob_ids is not None:
+        query = query.where(document_models.Blob.id.in_(blob_ids))
+    if older_than is not None:
+        query = query.where(document_models.Blob.updated_at < func.now() - older_than)
+    return list(db.scalars(query.returning(document_models.Blob.id)))
@@ -1,8 +1,12 @@
-from fastapi import Depends, HTTPException, UploadFile, status
+from fastapi import Depends, HTTPException, Request, UploadFile, status
 from sqlalchemy.orm import Session
 
 import src.document.dao as document_dao
 import src.document.models as document_models
+import src.project.dependencies as project_deps
+import src.project.models as project_models
+import src.user.dependencies as user_deps
+import src.user.models as user_models
 from src.shared.config import (
     ALLOWED_DOCUMENT_EXTENCIONS,
     ALLOWED_DOCUMENT_MIME_TYPES,
@@ -23,6 +27,30 @@ def get_document_by_id(
     return db_document
 
 
+# role in the project of the document, resolved once per request and shared
+#   by the checks below through the dependency cache of FastAPI
+
+
+def document_project_role(
+    document: document_models.Document = Depends(get_document_by_id),
+    db: Session = Depends(get_db),
+    current_user: user_models.User = Depends(user_deps.get_current_user),
+) -> project_models.PermissionType:
+    return project_deps.project_role(document.project_id, db, current_user)
+
+
+def is_document_owner(
+    role: project_models.PermissionType = Depends(document_project_role),
+) -> bool:
+    return project_deps.is_project_owner(role)
+
+
+def is_document_participant(
+    role: project_models.PermissionType = Depends(document_project_role),
+) -> bool:
+    return project_deps.is_project_participant(role)
+
+
 # https://fastapi.tiangolo.com/advanced/advanced-dependencies/#create-an-instance
 
 
@@ -32,7 +60,10 @@ class MIMETypeChecker:
         self.allowed_extencions = allowed_extencions
 
     def __call__(self, file: UploadFile):
-        if file.content_type in self.allowed_mime:
+        return self.check(file.content_type)
+
+    def check(self, content_type: str | None):
+        if content_type in self.allowed_mime:
             return True
 
         raise HTTPException(
@@ -41,5 +72,16 @@ class MIMETypeChecker:
         )
 
 
+class BodyMIMETypeChecker:
+    # for the uploads sent as the raw request body instead of a form
+    def __init__(self, checker: MIMETypeChecker):
+        self.checker = checker
+
+    def __call__(self, request: Request):
+        content_type = request.headers.get("content-type", "")
+        return self.checker.check(content_type.partition(";")[0].strip())
+
+
 is_document = MIMETypeChecker(ALLOWED_DOCUMENT_MIME_TYPES, ALLOWED_DOCUMENT_EXTENCIONS)
+is_document_body = BodyMIMETypeChecker(is_document)
 is_logo = MIMETypeChecker(ALLOWED_LOGO_MIME_TYPES, ALLOWED_LOGO_EXTENCIONS)
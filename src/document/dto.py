@@ -15,6 +15,17 @@ class Document(DocumentCreate, BaseTimestamp):
     # replacement for pydantic 2, see documentation on ConfigDict
 
 
+class DocumentDetails(Document):
+    project_id: int
+
+
+class UploadResult(BaseModel):
+    # result of each of the files of a bulk upload, either document or error is set
+    filename: str | None
+    document: Document | None = None
+    error: str | None = None
+
+
 def document(db_document: document_models.Document) -> Document:
     return Document(
         id=db_document.id,
@@ -1,15 +1,35 @@
-from fastapi import APIRouter, Depends, Query, UploadFile, status
-from fastapi.responses import FileResponse
+from functools import partial
+from typing import Annotated
 
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse
+
+import src.document.blobs as document_blobs
 import src.document.dao as document_dao
 import src.document.dependencies as document_deps
 import src.document.dto as document_dto
 import src.document.models as document_models
 import src.project.dependencies as project_deps
-import src.user.dependencies as user_deps
-import src.user.models as user_models
 from src.services import file_service
-from src.shared.database import Session, get_db
+from src.services.responses import file_response, not_modified, released
+from src.services.utils import FileTooLargeError
+from src.shared.config import DOWNLOAD_REDIRECT, PRESIGNED_URL_EXPIRES
+from src.shared.database import CountStrategy, Session, get_db
+from src.shared.dto import (
+    COUNT_DESCRIPTION,
+    CURSOR_DESCRIPTION,
+    DownloadURL,
+    PaginatedResponse,
+)
 
 router = APIRouter(
     tags=["documents"],
@@ -20,14 +40,34 @@ router = APIRouter(
 @router.get(
     "/project/{project_id}/documents",
     dependencies=[Depends(project_deps.is_project_participant)],
-    response_model=list[document_dto.Document],
+    response_model=list[document_dto.Document]
+    | PaginatedResponse[document_dto.Document],
 )
 def get_available_documents(
     project_id: int,
     db: Session = Depends(get_db),
     limit: int = Query(default=10, ge=0),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None, description=CURSOR_DESCRIPTION),
+    count: Annotated[
+        CountStrategy, Query(description=COUNT_DESCRIPTION)
+    ] = CountStrategy.none,
 ):
+    if cursor is not None:
+        try:
+            page = document_dao.get_available_documents_page(
+                db, project_id, limit, cursor, count
+            )
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Invalid cursor",
+            ) from None
+        if page is None:
+            return {"count": 0, "items": [], "has_more": False}
+        page["items"] = list(map(document_dto.document, page["items"]))
+        return page
+
     documents = document_dao.get_available_documents(db, project_id, limit, offset)
     if documents is None:
         return []
@@ -48,69 +88,191 @@ def upload_document(
     db=Depends(get_db),
     project=Depends(project_deps.get_project_by_id),
 ):
+    # content is saved first, once for all of the documents with the same content
+    try:
+        content_hash = document_blobs.save_content(db, file.file, file.content_type)
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e)
+        ) from None
+
     # filename can be None, so replace with default value of document's ID
-    db_document = document_dao.create_document(db, project, file.filename)
-    file_service.documents.save_file(file.file, db_document.id, file.content_type)
+    return document_dao.create_document(
+        db, project, file.filename, content_hash=content_hash, blob_id=content_hash
+    )
+
+
+@router.post(
+    "/project/{project_id}/documents/bulk",
+    dependencies=[Depends(project_deps.is_project_participant)],
+    response_model=list[document_dto.UploadResult],
+    status_code=status.HTTP_201_CREATED,
+)
+def upload_documents(
+    files: list[UploadFile],
+    db: Session = Depends(get_db),
+    project=Depends(project_deps.get_project_by_id),
+):
+    # files are checked one by one, so a single bad file does not reject the others
+    errors: list[str | None] = []
+    for file in files:
+        try:
+            document_deps.is_document.check(file.content_type)
+            errors.append(None)
+        except HTTPException as e:
+            errors.append(e.detail)
+
+    saved = iter(
+        document_blobs.save_documents(
+            db,
+            project.id,
+            [
+                document_blobs.Upload(file.filename, file.file, file.content_type)
+                for file, error in zip(files, errors, strict=True)
+                if error is None
+            ],
+        )
+    )
+    return [
+        _upload_result(file.filename, error or next(saved))
+        for file, error in zip(files, errors, strict=True)
+    ]
+
 
-    return db_document
+def _upload_result(
+    filename: str | None, result: document_models.Document | Exception | str
+) -> document_dto.UploadResult:
+    if isinstance(result, document_models.Document):
+        document = document_dto.document(result)
+        return document_dto.UploadResult(filename=filename, document=document)
+    if isinstance(result, FileTooLargeError):
+        result = str(result)
+    elif isinstance(result, Exception):
+        result = "Could not save the file"
+    return document_dto.UploadResult(filename=filename, error=result)
+
+
+@router.post(
+    "/project/{project_id}/documents/stream",
+    dependencies=[
+        Depends(project_deps.is_project_participant),
+        Depends(document_deps.is_document_body),
+    ],
+    response_model=document_dto.Document,
+    status_code=status.HTTP_201_CREATED,
+)
+async def stream_document(
+    request: Request,
+    name: Annotated[
+        str | None,
+        # validated before the upload, the document is named by its ID without it
+        Query(max_length=200, description="Name of the document, its ID by default"),
+    ] = None,
+    db: Session = Depends(get_db),
+    project=Depends(project_deps.get_project_by_id),
+):
+    # the body is passed to the storage while it is received, e.g. with S3 as parts
+    #   of a multipart upload, so large files are never spooled to disk by the API
+    try:
+        content_hash = await document_blobs.save_content_stream(
+            db, request.stream(), request.headers.get("content-type")
+        )
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e)
+        ) from None
+
+    return await run_in_threadpool(
+        document_dao.create_document,
+        db,
+        project,
+        name,
+        content_hash=content_hash,
+        blob_id=content_hash,
+    )
 
 
 @router.get(
     "/document/{document_id}",
+    dependencies=[Depends(document_deps.is_document_participant)],
 )
 def download_document(
     document_id: str,
+    request: Request,
     document: document_models.Document = Depends(document_deps.get_document_by_id),
-    db: Session = Depends(get_db),
-    current_user: user_models.User = Depends(user_deps.get_current_user),
 ):
-    project_deps.is_project_participant(
-        project_deps.project_role(document.project_id, db, current_user)
-    )
-    return FileResponse(
-        file_service.documents.download_file(document.id), filename=document.name
+    etag, last_modified = document.content_hash, document.updated_at
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
+
+    if DOWNLOAD_REDIRECT:
+        url = file_service.documents.get_download_url(document.file_id, document.name)
+        if url is not None:
+            return RedirectResponse(url, status.HTTP_307_TEMPORARY_REDIRECT)
+
+    path = file_service.documents.download_file(document.file_id)
+    return released(
+        partial(file_service.documents.release_file, path),
+        lambda: file_response(request, path, document.name, etag, last_modified),
     )
 
 
+@router.get(
+    "/document/{document_id}/url",
+    dependencies=[Depends(document_deps.is_document_participant)],
+    response_model=DownloadURL,
+)
+def get_document_download_url(
+    document_id: str,
+    document: document_models.Document = Depends(document_deps.get_document_by_id),
+):
+    url = file_service.documents.get_download_url(document.file_id, document.name)
+    if url is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Direct download is not available",
+        )
+    return DownloadURL(url=url, expires_in=PRESIGNED_URL_EXPIRES)
+
+
 @router.put(
     "/document/{document_id}",
     dependencies=[
+        Depends(document_deps.is_document_participant),
         Depends(document_deps.is_document),
     ],
+    response_model=document_dto.DocumentDetails,
 )
 def reupload_document(
     document_id: str,
     file: UploadFile,
     document: document_models.Document = Depends(document_deps.get_document_by_id),
     db: Session = Depends(get_db),
-    current_user: user_models.User = Depends(user_deps.get_current_user),
 ):
-    project_deps.is_project_participant(
-        project_deps.project_role(document.project_id, db, current_user)
-    )
-
     file_name = file.filename
     if not file_name:
         file_name = document.name
 
-    db_document = document_dao.update_document(db, document, file_name)
-    file_service.documents.save_file(file.file, db_document.id, file.content_type)
-
-    return db_document
+    # content is saved first, so the document is not renamed if the upload is rejected
+    try:
+        return document_blobs.replace_content(
+            db, document, file.file, file_name, file.content_type
+        )
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e)
+        ) from None
 
 
 @router.delete(
     "/document/{document_id}",
+    dependencies=[Depends(document_deps.is_document_owner)],
     status_code=status.HTTP_204_NO_CONTENT,
 )
 def delete_document(
     document_id: str,
     document: document_models.Document = Depends(document_deps.get_document_by_id),
     db: Session = Depends(get_db),
-    current_user: user_models.User = Depends(user_deps.get_current_user),
 ):
-    project_deps.is_project_owner(
-        project_deps.project_role(document.project_id, db, current_user)
-    )
-    document_dao.delete_document(db, document_id)
-    file_service.documents.delete_file_by_id(document_id)
+    document_blobs.delete_document(db, document)
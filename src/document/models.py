@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey, Integer, String
+from sqlalchemy import ForeignKey, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 import src.project.models
@@ -9,11 +9,38 @@ from src.shared.models import BaseTimestamp
 # https://stackoverflow.com/questions/5748946/pythonic-way-to-resolve-circular-import-statements
 
 
+class Blob(Base, BaseTimestamp):
+    # content stored once for all of the documents with the same SHA-256,
+    #   the file is removed when the last document is deleted
+    __tablename__ = "blobs"
+
+    id: Mapped[str] = mapped_column(String(length=64), primary_key=True)  # SHA-256
+    ref_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    def __str__(self):
+        return f"BlobModel[{self.id}, {self.ref_count}]"
+
+    def __repr__(self):
+        return self.__str__()
+
+
 class Document(Base, BaseTimestamp):
     __tablename__ = "documents"
+    # used for keyset pagination of the project's documents
+    __table_args__ = (
+        Index(
+            "ix_documents_project_id_created_at_id", "project_id", "created_at", "id"
+        ),
+    )
 
     id: Mapped[str] = mapped_column(String(length=255), primary_key=True)
     name: Mapped[str] = mapped_column(String(length=255), index=True, nullable=False)
+    # SHA-256 of the stored file, used as the strong ETag of the downloads
+    content_hash: Mapped[str | None] = mapped_column(String(length=64), nullable=True)
+    # None for the documents stored under their own id, before the blobs
+    blob_id: Mapped[str | None] = mapped_column(
+        String(length=64), ForeignKey("blobs.id"), nullable=True
+    )
 
     project_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("projects.id"), nullable=False
@@ -23,6 +50,11 @@ class Document(Base, BaseTimestamp):
         back_populates="documents"
     )
 
+    @property
+    def file_id(self) -> str:
+        # id of the file in the file service
+        return self.blob_id or self.id
+
     def __str__(self):
         return f"DocumentModel[{self.id}, {self.name}]"
 
@@ -1,12 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, status
-from fastapi.responses import FileResponse
+from functools import partial
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, UploadFile, status
+from fastapi.responses import FileResponse, RedirectResponse
 
 import src.document.dependencies as document_deps
 import src.logo.dao as logo_dao
 import src.project.dependencies as project_deps
 import src.project.models as project_models
-from src.services.file_service import logos
+from src.services import file_service
+from src.services.renditions import (
+    EXTENSIONS,
+    MEDIA_TYPES,
+    Rendition,
+    choose_logo_rendition,
+    default_logo_rendition,
+)
+from src.services.responses import released
+from src.services.utils import FileTooLargeError
+from src.shared.config import DOWNLOAD_REDIRECT, PRESIGNED_URL_EXPIRES
 from src.shared.database import Session, get_db
+from src.shared.dto import DownloadURL
 from src.shared.logs import log
 
 router = APIRouter(
@@ -15,18 +29,101 @@ router = APIRouter(
 )
 
 
+SIZE_DESCRIPTION = """Size of the displayed logo in pixels, the smallest rendition
+not smaller than it is sent. Format is chosen by the Accept header, e.g. image/webp."""
+
+
+def _available_rendition(
+    logo_id: str, size: int | None, accept: str | None
+) -> Rendition:
+    """Chosen rendition, or the default one if the logo does not have it.
+
+    Logos processed before the renditions were added are stored only as the default.
+    """
+    rendition = choose_logo_rendition(logo_id, size, accept)
+    if rendition.name != logo_id and not file_service.logos.has_file(rendition.name):
+        return default_logo_rendition(logo_id)
+    return rendition
+
+
+def _download_logo(rendition: Rendition, logo_id: str) -> tuple[Rendition, str]:
+    try:
+        return rendition, file_service.logos.download_file(rendition.name)
+    except FileNotFoundError:
+        if rendition.name == logo_id:
+            raise
+    # checked only after the download failed, the newer logos have the renditions
+    rendition = default_logo_rendition(logo_id)
+    return rendition, file_service.logos.download_file(rendition.name)
+
+
 @router.get(
     "/project/{project_id}/logo",
     dependencies=[Depends(project_deps.is_project_participant)],
 )
 def download_project_logo(
     project: project_models.Project = Depends(project_deps.get_project_by_id),
+    size: Annotated[int | None, Query(gt=0, description=SIZE_DESCRIPTION)] = None,
+    accept: Annotated[str | None, Header()] = None,
 ):
     if not project.logo_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Project does not have a logo"
         )
-    return FileResponse(logos.download_file(project.logo_id), filename="logo.jpg")
+
+    headers = {"vary": "accept"}  # for the caches, as the format depends on it
+
+    if DOWNLOAD_REDIRECT:
+        rendition = _available_rendition(project.logo_id, size, accept)
+        filename = f"logo.{EXTENSIONS[rendition.format]}"
+        url = file_service.logos.get_download_url(rendition.name, filename)
+        if url is not None:
+            return RedirectResponse(
+                url, status.HTTP_307_TEMPORARY_REDIRECT, headers=headers
+            )
+
+    try:
+        rendition, path = _download_logo(
+            choose_logo_rendition(project.logo_id, size, accept), project.logo_id
+        )
+    except FileNotFoundError:
+        # e.g. the upload was not a valid image and could not be processed
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Logo is not available"
+        ) from None
+    filename = f"logo.{EXTENSIONS[rendition.format]}"
+    return released(
+        partial(file_service.logos.release_file, path),
+        lambda: FileResponse(
+            path,
+            media_type=MEDIA_TYPES[rendition.format],
+            filename=filename,
+            headers=headers,
+        ),
+    )
+
+
+@router.get(
+    "/project/{project_id}/logo/url",
+    dependencies=[Depends(project_deps.is_project_participant)],
+    response_model=DownloadURL,
+)
+def get_project_logo_url(
+    project: project_models.Project = Depends(project_deps.get_project_by_id),
+    size: Annotated[int | None, Query(gt=0, description=SIZE_DESCRIPTION)] = None,
+    accept: Annotated[str | None, Header()] = None,
+):
+    url = None
+    if project.logo_id:
+        rendition = _available_rendition(project.logo_id, size, accept)
+        filename = f"logo.{EXTENSIONS[rendition.format]}"
+        url = file_service.logos.get_download_url(rendition.name, filename)
+    if not url:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Direct download of the logo is not available",
+        )
+    return DownloadURL(url=url, expires_in=PRESIGNED_URL_EXPIRES)
 
 
 @router.put(
@@ -44,14 +141,19 @@ def upload_project_logo(
 ) -> None:
     if project.logo_id is not None:  # if exists, remove previous image
         try:
-            logos.delete_file_by_id(project.logo_id)
+            file_service.logos.delete_file_by_id(project.logo_id)
         except FileNotFoundError as e:
             log.error(f"Failed to delete file {project.logo_id}")
             log.error(e)
 
     try:
         file_id = logo_dao.create_logo(db, project)
-        logos.save_file(file.file, file_id, file.content_type)
+        file_service.logos.save_file(file.file, file_id, file.content_type)
+    except FileTooLargeError as e:
+        logo_dao.delete_logo(db, project)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e)
+        ) from None
     except Exception as e:
         logo_dao.delete_logo(db, project)
         log.error("Failed to update logo")
@@ -76,7 +178,7 @@ def delete_logo(
         return
 
     try:
-        logos.delete_file_by_id(project.logo_id)
+        file_service.logos.delete_file_by_id(project.logo_id)
         logo_dao.delete_logo(db, project)
     except FileNotFoundError as e:
         log.error(f"Failed to delete file {project.logo_id}")
@@ -1,28 +1,121 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from asgi_correlation_id import CorrelationIdMiddleware
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.concurrency import run_in_threadpool
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
+import src.document.dao as document_dao
 import src.document.endpoints as document_routes
 import src.logo.endpoints as logo_routes
+import src.project.async_dao as project_async_dao
+import src.project.async_endpoints as project_async_routes
+import src.project.dao as project_dao
 import src.project.endpoints as project_routes
+import src.user.async_dao as user_async_dao
+import src.user.async_endpoints as user_async_routes
+import src.user.dao as user_dao
 import src.user.endpoints as user_routes
-from src.shared.database import Base, engine
-from src.shared.logs import configure_logging
+from src.services.deletion import deletions
+from src.services.file_service import close_file_services, init_file_services
+from src.services.reconciler import reconciler
+from src.shared.access_log import AccessLogMiddleware
+from src.shared.config import DB_ASYNC, DB_CREATE_SCHEMA, DB_WARMUP_CONNECTIONS
+from src.shared.database import (
+    create_schema,
+    dispose_engines,
+    fill_async_pool,
+    fill_pool,
+    get_async_engine,
+    get_async_sessionmaker,
+    get_engine,
+    get_sessionmaker,
+)
+from src.shared.logs import configure_logging, log
+
+
+def warm_up_sync() -> None:
+    fill_pool(get_engine(), DB_WARMUP_CONNECTIONS)
+    # lookups of every request, compiled into the cache of the engine
+    with get_sessionmaker()() as db:
+        user_dao.get_user(db, 0)
+        user_dao.get_user_by_login(db, "")
+        project_dao.get_project(db, 0)
+        project_dao.get_project_role(db, 0, 0)
+        project_dao.get_accessible_projects(db, 0, 1, 0)
+        document_dao.get_document_by_id(db, "")
+
+
+async def warm_up() -> None:
+    """Opens the connections of the pool and compiles the frequent statements.
+
+    Run at startup, so the first requests of the worker do not wait for that.
+    """
+    await run_in_threadpool(warm_up_sync)
+    if DB_ASYNC:
+        await fill_async_pool(get_async_engine(), DB_WARMUP_CONNECTIONS)
+        async with get_async_sessionmaker()() as db:
+            await user_async_dao.get_user(db, 0)
+            await user_async_dao.get_user_by_login(db, "")
+            await project_async_dao.get_project(db, 0)
+            await project_async_dao.get_project_role(db, 0, 0)
+            await project_async_dao.get_accessible_projects(db, 0, 1, 0)
+
+
+async def warm_up_database() -> None:
+    if DB_CREATE_SCHEMA:
+        await run_in_threadpool(create_schema)
+    if DB_WARMUP_CONNECTIONS > 0:
+        try:
+            await warm_up()
+        except Exception as e:  # connections are opened again on demand
+            log.warning("Failed to warm up the database connections: %r", e)
 
-Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    configure_logging()
+    # e.g. boto3 resolves the credentials while the connections are opened
+    await asyncio.gather(run_in_threadpool(init_file_services), warm_up_database())
+    reconciler.start()
 
-app = FastAPI(on_startup=[configure_logging])
+    yield
 
+    reconciler.close()
+    deletions.close()
+    close_file_services()
+    await dispose_engines()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# status, latency and SQL statements of each request, inside the request ID
+app.add_middleware(AccessLogMiddleware)
 # https://medium.com/@sondrelg_12432/setting-up-request-id-logging-for-your-fastapi-application-4dc190aac0ea
 app.add_middleware(CorrelationIdMiddleware)
 # for request ID logging
 
 app.include_router(document_routes.router)
-app.include_router(project_routes.router)
-app.include_router(user_routes.router)
+
+# user and project routes are served either through AsyncSession or through
+#   the synchronous Session running in the threadpool
+if DB_ASYNC:
+    app.include_router(project_async_routes.router)
+    app.include_router(user_async_routes.router)
+else:
+    app.include_router(project_routes.router)
+    app.include_router(user_routes.router)
+
 app.include_router(logo_routes.router)
 
 
 @app.get("/test")
 async def run_test() -> str:
     return "Success"
+
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics() -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
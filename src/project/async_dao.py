@@ -0,0 +1,178 @@
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import src.document.models as document_models
+import src.project.dao as project_dao
+import src.project.dto as project_dto
+import src.project.models as project_models
+import src.project.permission_cache as permission_cache
+import src.user.models as user_models
+from src.shared.database import (
+    CountStrategy,
+    count_total_async,
+    keyset_page,
+    keyset_query,
+)
+from src.shared.logs import log
+
+# Relationships are never lazy loaded here, because AsyncSession can not emit IO
+#   on attribute access, so the associations are created through foreign keys.
+
+
+async def get_project(
+    db: AsyncSession, project_id: int
+) -> project_models.Project | None:
+    return await db.get(project_models.Project, project_id)
+
+
+async def get_accessible_projects(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = 10,
+    offset: int = 0,
+) -> list[tuple[project_models.Project, project_models.PermissionType]]:
+    log.debug("Finding accessible projects from user: id='%s'", user_id)
+    query = (
+        project_dao.accessible_projects_query(user_id)
+        .order_by(project_models.Project.created_at, project_models.Project.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    return list((await db.execute(query)).tuples())
+
+
+async def get_accessible_projects_page(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = 10,
+    cursor: str | None = None,
+    count: CountStrategy = CountStrategy.none,
+) -> dict:
+    """Raises ValueError on invalid cursor."""
+    log.debug("Finding accessible projects from user: id='%s', '%s'", user_id, cursor)
+    created_at, id = project_models.Project.created_at, project_models.Project.id
+    query = project_dao.accessible_projects_query(user_id)
+    rows = (await db.execute(keyset_query(query, created_at, id, limit, cursor))).all()
+    total = await count_total_async(db, query, count)
+    return keyset_page(rows, created_at, id, limit, total)
+
+
+async def create_project(
+    db: AsyncSession, project: project_dto.ProjectCreate, owner: user_models.User
+) -> project_models.Project:
+    log.debug(
+        "Creating a project with values: \
+name='%s', description='%s'",
+        project.name,
+        project.description,
+    )
+    db_project = project_models.Project(
+        **project.model_dump(
+            exclude_none=True, exclude_defaults=True, exclude_unset=True
+        )
+    )
+    db.add(db_project)
+    await db.flush()
+
+    log.debug(
+        "Adding the creator to the project: login='%s', id='%s'", owner.login, owner.id
+    )
+    db.add(
+        project_models.Permission(
+            type=project_models.PermissionType.owner,
+            user_id=owner.id,
+            project_id=db_project.id,
+        )
+    )
+    await db.commit()
+    await db.refresh(db_project)
+    return db_project
+
+
+async def update_project(
+    db: AsyncSession,
+    db_project: project_models.Project,
+    update_data: project_dto.ProjectUpdate,
+) -> project_models.Project | None:
+    if update_data.name is not None:
+        db_project.name = update_data.name
+
+    if update_data.description is not None:
+        db_project.description = update_data.description
+
+    await db.commit()
+    await db.refresh(db_project)
+    return db_project
+
+
+async def delete_project(db: AsyncSession, project_id: int) -> list[str]:
+    """Deletes the project with its documents.
+
+    Returns ids of the blobs left without documents, see document_dao.release_blob.
+    """
+    released = (
+        await db.execute(project_dao.release_project_blobs_query(project_id))
+    ).all()
+    await db.execute(
+        delete(project_models.Permission).where(
+            project_models.Permission.project_id == project_id
+        )
+    )
+    await db.execute(
+        delete(document_models.Document).where(
+            document_models.Document.project_id == project_id
+        )
+    )
+    await db.execute(
+        delete(project_models.Project).where(project_models.Project.id == project_id)
+    )
+    await db.commit()
+    permission_cache.invalidate(project_id)
+    return [blob_id for blob_id, ref_count in released if ref_count <= 0]
+
+
+async def get_project_role(
+    db: AsyncSession, project_id: int, user_id: int
+) -> project_models.Permission | None:
+    return await db.get(
+        project_models.Permission, {"user_id": user_id, "project_id": project_id}
+    )
+
+
+async def get_project_role_type(
+    db: AsyncSession, project_id: int, user_id: int
+) -> project_models.PermissionType | None:
+    role = permission_cache.get_role(project_id, user_id)
+    if role is None:
+        permission = await get_project_role(db, project_id, user_id)
+        if permission is None:
+            return None
+        role = permission.type
+        permission_cache.set_role(project_id, user_id, role)
+    return role
+
+
+async def grant_access_to_user(
+    db: AsyncSession, project: project_models.Project, user: user_models.User
+):
+    log.debug("Giving %s access to project [%s]", user.login, project.id)
+    if await get_project_role(db, project.id, user.id):
+        return None
+
+    try:
+        db.add(
+            project_models.Permission(
+                type=project_models.PermissionType.participant,
+                user_id=user.id,
+                project_id=project.id,
+            )
+        )
+        await db.commit()
+        permission_cache.invalidate(project.id, user.id)
+        await db.refresh(project)
+    except IntegrityError:
+        log.info("Failed to grant access to user %s, access already exists", user.login)
+        await db.rollback()
+        return None
+    return project
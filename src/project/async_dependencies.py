@@ -0,0 +1,62 @@
+from fastapi import Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import src.project.async_dao as project_async_dao
+import src.project.models as project_models
+import src.user.async_dependencies as user_async_deps
+import src.user.models as user_models
+from src.shared.database import get_async_db
+from src.shared.logs import log
+
+
+async def get_project_by_id(
+    project_id: int, db: AsyncSession = Depends(get_async_db)
+) -> project_models.Project:
+    db_project = await project_async_dao.get_project(db, project_id)
+    if not db_project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Project not found"
+        )
+    return db_project
+
+
+async def project_role(
+    project_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: user_models.User = Depends(user_async_deps.get_current_user),
+) -> project_models.PermissionType:
+    project_role = await project_async_dao.get_project_role_type(
+        db, project_id, current_user.id
+    )
+
+    if not project_role:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="You don't have access to the project",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return project_role
+
+
+async def is_project_owner(
+    project_role: project_models.PermissionType = Depends(project_role),
+) -> bool:
+    log.debug("User is trying to access owner-role action")
+
+    if project_role != project_models.PermissionType.owner:
+        log.info("User failed to access owner-role action")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="You are not the project owner",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return True
+
+
+# implemented for readability
+async def is_project_participant(
+    _project_role: project_models.PermissionType = Depends(project_role),
+) -> bool:
+    log.debug("User has access to project")
+    return True
@@ -0,0 +1,147 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import src.document.blobs as document_blobs
+import src.project.async_dao as project_async_dao
+import src.project.async_dependencies as project_async_deps
+import src.project.dto as project_dto
+import src.project.models as project_models
+import src.user.async_dependencies as user_async_deps
+import src.user.models as user_models
+from src.services.deletion import delete_logo_later
+from src.shared.database import CountStrategy, get_async_db
+from src.shared.dto import COUNT_DESCRIPTION, CURSOR_DESCRIPTION, PaginatedResponse
+
+# Same routes as src.project.endpoints, used when the application runs with DB_ASYNC
+
+router = APIRouter(
+    prefix="/project",
+    tags=["projects"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.post(
+    "/", response_model=project_dto.ProjectInfo, status_code=status.HTTP_201_CREATED
+)
+async def create_project(
+    project: project_dto.ProjectCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: user_models.User = Depends(user_async_deps.get_current_user),
+):
+    return await project_async_dao.create_project(db, project, current_user)
+
+
+@router.get(
+    "/",
+    response_model=list[project_dto.AccessibleProject]
+    | PaginatedResponse[project_dto.AccessibleProject],
+)
+async def get_accessible_projects(
+    db: AsyncSession = Depends(get_async_db),
+    user: user_models.User = Depends(user_async_deps.get_current_user),
+    limit: int = Query(default=100, ge=0),
+    offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None, description=CURSOR_DESCRIPTION),
+    count: Annotated[
+        CountStrategy, Query(description=COUNT_DESCRIPTION)
+    ] = CountStrategy.none,
+):
+    if cursor is not None:
+        try:
+            page = await project_async_dao.get_accessible_projects_page(
+                db, user.id, limit, cursor, count
+            )
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Invalid cursor",
+            ) from None
+        page["items"] = [
+            project_dto.accessible_project(project, role)
+            for project, role in page["items"]
+        ]
+        return page
+
+    accessible_projects = await project_async_dao.get_accessible_projects(
+        db, user.id, limit, offset
+    )
+    return [
+        project_dto.accessible_project(project, role)
+        for project, role in accessible_projects
+    ]
+
+
+@router.get(
+    "/{project_id}",
+    response_model=project_dto.Project,
+    dependencies=[Depends(project_async_deps.is_project_participant)],
+)
+async def read_project(
+    project_id: int,
+    db_project=Depends(project_async_deps.get_project_by_id),
+):
+    return project_dto.project(db_project)
+
+
+@router.put(
+    "/{project_id}",
+    response_model=project_dto.Project,
+    dependencies=[Depends(project_async_deps.is_project_participant)],
+)
+async def update_project(
+    project: project_dto.ProjectUpdate,
+    project_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    db_project=Depends(project_async_deps.get_project_by_id),
+):
+    updated = await project_async_dao.update_project(db, db_project, project)
+    if updated is None:
+        raise HTTPException(
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not update the project",
+        )
+
+    return project_dto.project(updated)
+
+
+@router.delete(
+    "/{project_id}",
+    dependencies=[Depends(project_async_deps.is_project_owner)],
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def delete_project(
+    project_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    project: project_models.Project = Depends(project_async_deps.get_project_by_id),
+):
+    logo_id = project.logo_id
+    released_blobs = await project_async_dao.delete_project(db, project_id)
+    # files are deleted after the response
+    document_blobs.delete_blobs_later(released_blobs)
+    if logo_id is not None:
+        delete_logo_later(logo_id)
+
+
+@router.post(
+    "/{project_id}/invite",
+    dependencies=[Depends(project_async_deps.is_project_owner)],
+    status_code=status.HTTP_201_CREATED,
+)
+async def grant_project_access(
+    login: Annotated[
+        str, Query()
+    ],  # used to define the value for dependency get_user_by_login
+    db: AsyncSession = Depends(get_async_db),
+    user: user_models.User = Depends(user_async_deps.get_user_by_login),
+    project: project_models.Project = Depends(project_async_deps.get_project_by_id),
+):
+    project = await project_async_dao.grant_access_to_user(db, project, user)
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Permission is already granted",
+        )
+    return {"message": f"Grated user '{user.login}' access to project '{project.name}'"}
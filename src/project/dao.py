@@ -1,10 +1,18 @@
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+import src.document.models as document_models
 import src.project.dto as project_dto
 import src.project.models as project_models
-import src.user.dao as user_dao
+import src.project.permission_cache as permission_cache
 import src.user.models as user_models
+from src.shared.database import (
+    CountStrategy,
+    count_total,
+    keyset_page,
+    keyset_query,
+)
 from src.shared.logs import log
 
 
@@ -12,34 +20,55 @@ def get_project(db: Session, project_id: int) -> project_models.Project | None:
     return db.get(project_models.Project, project_id)  # type: ignore
 
 
+def accessible_projects_query(user_id: int):
+    # caller's role is selected with the project in a single joined query,
+    #   so listing does not issue a query per permission
+    return (
+        select(project_models.Project, project_models.Permission.type)
+        .join(project_models.Permission)
+        .where(project_models.Permission.user_id == user_id)
+    )
+
+
 def get_accessible_projects(
     db: Session,
     user_id: int,
     limit: int = 10,
     offset: int = 0,
-) -> list[project_models.Project] | None:
-    log.debug(f"Finding accessible projects from user: id='{user_id}'")
-    user = user_dao.get_user(db, user_id)
-
-    if not user:
-        return None
-
-    return [
-        permission.project
-        for permission in db.query(project_models.Permission)
-        .filter_by(user_id=user_id)
+) -> list[tuple[project_models.Project, project_models.PermissionType]]:
+    log.debug("Finding accessible projects from user: id='%s'", user_id)
+    query = (
+        accessible_projects_query(user_id)
+        .order_by(project_models.Project.created_at, project_models.Project.id)
         .limit(limit)
         .offset(offset)
-        .all()
-    ]
+    )
+    return list(db.execute(query).tuples())
+
+
+def get_accessible_projects_page(
+    db: Session,
+    user_id: int,
+    limit: int = 10,
+    cursor: str | None = None,
+    count: CountStrategy = CountStrategy.none,
+) -> dict:
+    """Raises ValueError on invalid cursor."""
+    log.debug("Finding accessible projects from user: id='%s', '%s'", user_id, cursor)
+    created_at, id = project_models.Project.created_at, project_models.Project.id
+    query = accessible_projects_query(user_id)
+    rows = db.execute(keyset_query(query, created_at, id, limit, cursor)).all()
+    return keyset_page(rows, created_at, id, limit, count_total(db, query, count))
 
 
 def create_project(
     db: Session, project: project_dto.ProjectCreate, owner: user_models.User
 ) -> project_models.Project:
     log.debug(
-        f"Creating a project with values: \
-name='{project.name}', description='{project.description}'"
+        "Creating a project with values: \
+name='%s', description='%s'",
+        project.name,
+        project.description,
     )
     db_project = project_models.Project(
         **project.model_dump(
@@ -49,7 +78,7 @@ name='{project.name}', description='{project.description}'"
     db.add(db_project)
 
     log.debug(
-        f"Adding the creator to the project: login='{owner.login}', id='{owner.id}'"
+        "Adding the creator to the project: login='%s', id='%s'", owner.login, owner.id
     )
     a = project_models.Permission(type=project_models.PermissionType.owner)
     a.user = owner
@@ -76,9 +105,47 @@ def update_project(
     return db_project
 
 
-def delete_project(db: Session, project_id: int) -> None:
-    db_project = get_project(db, project_id)
-    db.delete(db_project)
+def release_project_blobs_query(project_id: int):
+    # a reference of every document of the project is removed from its blob
+    counts = (
+        select(document_models.Document.blob_id, func.count().label("documents"))
+        .where(
+            document_models.Document.project_id == project_id,
+            document_models.Document.blob_id.is_not(None),
+        )
+        .group_by(document_models.Document.blob_id)
+        .subquery()
+    )
+    return (
+        update(document_models.Blob)
+        .where(document_models.Blob.id == counts.c.blob_id)
+        .values(ref_count=document_models.Blob.ref_count - counts.c.documents)
+        .returning(document_models.Blob.id, document_models.Blob.ref_count)
+    )
+
+
+def delete_project(db: Session, project_id: int) -> list[str]:
+    """Deletes the project with its documents.
+
+    Returns ids of the blobs left without documents, see document_dao.release_blob.
+    """
+    released = db.execute(release_project_blobs_query(project_id)).all()
+    db.execute(
+        delete(project_models.Permission).where(
+            project_models.Permission.project_id == project_id
+        )
+    )
+    db.execute(
+        delete(document_models.Document).where(
+            document_models.Document.project_id == project_id
+        )
+    )
+    db.execute(
+        delete(project_models.Project).where(project_models.Project.id == project_id)
+    )
+    db.commit()
+    permission_cache.invalidate(project_id)
+    return [blob_id for blob_id, ref_count in released if ref_count <= 0]
 
 
 def get_project_role(
@@ -89,10 +156,23 @@ def get_project_role(
     )
 
 
+def get_project_role_type(
+    db: Session, project_id: int, user_id: int
+) -> project_models.PermissionType | None:
+    role = permission_cache.get_role(project_id, user_id)
+    if role is None:
+        permission = get_project_role(db, project_id, user_id)
+        if permission is None:
+            return None
+        role = permission.type
+        permission_cache.set_role(project_id, user_id, role)
+    return role
+
+
 def grant_access_to_user(
     db: Session, project: project_models.Project, user: user_models.User
 ):
-    log.debug(f"Giving {user.login} access to project [{project.id}]")
+    log.debug("Giving %s access to project [%s]", user.login, project.id)
     if get_project_role(db, project.id, user.id):
         return None
 
@@ -101,9 +181,10 @@ def grant_access_to_user(
         a.user = user
         project.users.append(a)
         db.commit()
+        permission_cache.invalidate(project.id, user.id)
         db.refresh(project)
     except IntegrityError:
-        log.info(f"Failed to grant access to user {user.login}, access already exists")
+        log.info("Failed to grant access to user %s, access already exists", user.login)
         db.rollback()
         db.commit()
         return None
@@ -28,8 +28,8 @@ def project_role(
     project_id: int,
     db: Session = Depends(get_db),
     current_user: user_models.User = Depends(user_deps.get_current_user),
-) -> project_models.Permission:
-    project_role = project_dao.get_project_role(db, project_id, current_user.id)
+) -> project_models.PermissionType:
+    project_role = project_dao.get_project_role_type(db, project_id, current_user.id)
 
     if not project_role:
         raise HTTPException(
@@ -42,11 +42,11 @@ def project_role(
 
 
 def is_project_owner(
-    project_role: project_models.Permission = Depends(project_role),
+    project_role: project_models.PermissionType = Depends(project_role),
 ) -> bool:
     log.debug("User is trying to access owner-role action")
 
-    if project_role.type != project_models.PermissionType.owner:
+    if project_role != project_models.PermissionType.owner:
         log.info("User failed to access owner-role action")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -18,6 +18,10 @@ class ProjectInfo(ProjectCreate):
     id: int
 
 
+class AccessibleProject(ProjectInfo):
+    role: project_models.PermissionType  # of the user listing the projects
+
+
 class Project(ProjectInfo, BaseTimestamp):
     model_config = ConfigDict(from_attributes=True)
 
@@ -46,3 +50,14 @@ def project_info(db_project: project_models.Project) -> ProjectInfo:
         name=db_project.name,
         description=db_project.description,
     )
+
+
+def accessible_project(
+    db_project: project_models.Project, role: project_models.PermissionType
+) -> AccessibleProject:
+    return AccessibleProject(
+        id=db_project.id,
+        name=db_project.name,
+        description=db_project.description,
+        role=role,
+    )
@@ -3,13 +3,16 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
+import src.document.blobs as document_blobs
 import src.project.dao as project_dao
 import src.project.dependencies as project_deps
 import src.project.dto as project_dto
 import src.project.models as project_models
 import src.user.dependencies as user_deps
 import src.user.models as user_models
-from src.shared.database import get_db
+from src.services.deletion import delete_logo_later
+from src.shared.database import CountStrategy, get_db
+from src.shared.dto import COUNT_DESCRIPTION, CURSOR_DESCRIPTION, PaginatedResponse
 
 router = APIRouter(
     prefix="/project",
@@ -21,7 +24,7 @@ router = APIRouter(
 @router.post(
     "/", response_model=project_dto.ProjectInfo, status_code=status.HTTP_201_CREATED
 )
-async def create_project(
+def create_project(
     project: project_dto.ProjectCreate,
     db: Session = Depends(get_db),
     current_user: user_models.User = Depends(user_deps.get_current_user),
@@ -29,22 +32,44 @@ async def create_project(
     return project_dao.create_project(db, project, current_user)
 
 
-@router.get("/", response_model=list[project_dto.ProjectInfo])
-async def get_accessible_projects(
+@router.get(
+    "/",
+    response_model=list[project_dto.AccessibleProject]
+    | PaginatedResponse[project_dto.AccessibleProject],
+)
+def get_accessible_projects(
     db: Session = Depends(get_db),
     user: user_models.User = Depends(user_deps.get_current_user),
     limit: int = Query(default=100, ge=0),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None, description=CURSOR_DESCRIPTION),
+    count: Annotated[
+        CountStrategy, Query(description=COUNT_DESCRIPTION)
+    ] = CountStrategy.none,
 ):
+    if cursor is not None:
+        try:
+            page = project_dao.get_accessible_projects_page(
+                db, user.id, limit, cursor, count
+            )
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Invalid cursor",
+            ) from None
+        page["items"] = [
+            project_dto.accessible_project(project, role)
+            for project, role in page["items"]
+        ]
+        return page
+
     accessible_projects = project_dao.get_accessible_projects(
         db, user.id, limit, offset
     )
-    if accessible_projects is None:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized"
-        )
-
-    return list(map(project_dto.project_info, accessible_projects))
+    return [
+        project_dto.accessible_project(project, role)
+        for project, role in accessible_projects
+    ]
 
 
 @router.get(
@@ -52,7 +77,7 @@ async def get_accessible_projects(
     response_model=project_dto.Project,
     dependencies=[Depends(project_deps.is_project_participant)],
 )
-async def read_project(
+def read_project(
     project_id: int,
     db_project=Depends(project_deps.get_project_by_id),
 ):
@@ -64,7 +89,7 @@ async def read_project(
     response_model=project_dto.Project,
     dependencies=[Depends(project_deps.is_project_participant)],
 )
-async def update_project(
+def update_project(
     project: project_dto.ProjectUpdate,
     project_id: int,
     db: Session = Depends(get_db),
@@ -82,14 +107,20 @@ async def update_project(
 
 @router.delete(
     "/{project_id}",
-    dependencies=[
-        Depends(project_deps.is_project_owner),
-        Depends(project_deps.get_project_by_id),
-    ],
+    dependencies=[Depends(project_deps.is_project_owner)],
     status_code=status.HTTP_204_NO_CONTENT,
 )
-async def delete_project(project_id: int, db: Session = Depends(get_db)):
-    project_dao.delete_project(db, project_id)
+def delete_project(
+    project_id: int,
+    db: Session = Depends(get_db),
+    project: project_models.Project = Depends(project_deps.get_project_by_id),
+):
+    logo_id = project.logo_id
+    released_blobs = project_dao.delete_project(db, project_id)
+    # files are deleted after the response
+    document_blobs.delete_blobs_later(released_blobs)
+    if logo_id is not None:
+        delete_logo_later(logo_id)
 
 
 @router.post(
@@ -97,7 +128,7 @@ async def delete_project(project_id: int, db: Session = Depends(get_db)):
     dependencies=[Depends(project_deps.is_project_owner)],
     status_code=status.HTTP_201_CREATED,
 )
-async def grant_project_access(
+def grant_project_access(
     login: Annotated[
         str, Query()
     ],  # used to define the value for dependency get_user_by_login
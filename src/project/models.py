@@ -1,6 +1,6 @@
 import enum
 
-from sqlalchemy import ForeignKey, Integer, String, Text
+from sqlalchemy import ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql.sqltypes import Enum
 
@@ -26,7 +26,7 @@ class Permission(Base, BaseTimestamp):
     user_id = mapped_column(Integer, ForeignKey("users.id"), primary_key=True)
     project_id = mapped_column(Integer, ForeignKey("projects.id"), primary_key=True)
 
-    type: Mapped[str] = mapped_column(Enum(PermissionType), nullable=False)
+    type: Mapped[PermissionType] = mapped_column(Enum(PermissionType), nullable=False)
 
     user: Mapped["src.user.models.User"] = relationship(back_populates="projects")
     project: Mapped["Project"] = relationship(back_populates="users")
@@ -41,6 +41,8 @@ user {self.user_id} is {self.type} of project {self.project_id}]"
 
 class Project(Base, BaseTimestamp):
     __tablename__ = "projects"
+    # used for keyset pagination of the project listings
+    __table_args__ = (Index("ix_projects_created_at_id", "created_at", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(length=255))
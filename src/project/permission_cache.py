@@ -0,0 +1,39 @@
+import src.project.models as project_models
+from src.shared.cache import make_cache
+from src.shared.config import PERMISSION_CACHE_SIZE, PERMISSION_CACHE_TTL
+
+# Roles of the users in the projects, so the authorization of project-scoped
+#   requests does not query permissions every time.
+# Every change of a permission must invalidate the cached role. With several workers
+#   and the memory backend other workers keep the role until PERMISSION_CACHE_TTL.
+
+PREFIX = "perm:"
+
+cache = make_cache(PERMISSION_CACHE_SIZE, PERMISSION_CACHE_TTL)
+
+
+def _key(project_id: int, user_id: int) -> str:
+    return f"{PREFIX}{project_id}:{user_id}"
+
+
+def get_role(project_id: int, user_id: int) -> project_models.PermissionType | None:
+    role = cache.get(_key(project_id, user_id))
+    return None if role is None else project_models.PermissionType(role)
+
+
+def set_role(
+    project_id: int, user_id: int, role: project_models.PermissionType
+) -> None:
+    cache.set(_key(project_id, user_id), role.value)
+
+
+def invalidate(project_id: int, user_id: int | None = None) -> None:
+    """Drops the role of the user, or of all users if user_id is None."""
+    if user_id is None:
+        cache.delete_prefix(f"{PREFIX}{project_id}:")
+    else:
+        cache.delete(_key(project_id, user_id))
+
+
+def clear() -> None:
+    cache.delete_prefix(PREFIX)
@@ -0,0 +1,148 @@
+import os
+import re
+from collections import OrderedDict
+from tempfile import NamedTemporaryFile
+from threading import Lock
+
+from botocore.exceptions import ClientError
+
+from src.shared.logs import log
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _error_code(error: ClientError) -> str:
+    return str(error.response.get("Error", {}).get("Code"))
+
+
+def is_not_found(error: ClientError) -> bool:
+    # HeadObject has no body, so only the status code is returned for it
+    return _error_code(error) in ("404", "NoSuchKey")
+
+
+class DownloadCache:
+    """Local disk cache of the S3 objects with LRU eviction over max_size bytes.
+
+    Files are named by the ETag of the object, so a changed object is fetched
+    again and equal objects under different keys are stored once.
+    Concurrent misses of the same object wait for a single download.
+    Files returned by get are not evicted until they are released.
+    """
+
+    def __init__(self, folder: str, max_size: int):
+        self.folder = folder
+        self.max_size = max_size
+        os.makedirs(folder, exist_ok=True)
+
+        self._lock = Lock()  # guards the fields below
+        self._entries: OrderedDict[str, int] = OrderedDict()  # name -> size
+        self._size = 0
+        self._download_locks: dict[str, Lock] = {}
+        self._pins: dict[str, int] = {}  # name -> number of readers
+
+        # files of the previous runs, least recently modified first
+        files = [e for e in os.scandir(folder) if e.is_file() and e.name[0] != "."]
+        for entry in sorted(files, key=lambda e: e.stat().st_mtime):
+            self._add(entry.name, entry.stat().st_size)
+
+    def get(self, s3, bucket: str, key: str) -> str:
+        """Path to the current version of the object, downloaded if not cached.
+
+        The file is kept until release is called with the path.
+        Raises FileNotFoundError if there is no such object.
+        """
+        try:
+            return self._get_current(s3, bucket, key)
+        except ClientError as e:
+            if _error_code(e) != "PreconditionFailed":
+                raise
+        # changed between HEAD and GET, so fetched again with the new ETag
+        log.debug("%s changed while it was downloaded, retrying", key)
+        return self._get_current(s3, bucket, key)
+
+    def _get_current(self, s3, bucket: str, key: str) -> str:
+        try:
+            etag = s3.head_object(Bucket=bucket, Key=key)["ETag"]
+            return self._get_version(s3, bucket, key, etag)
+        except ClientError as e:
+            if is_not_found(e):  # also deleted between HEAD and GET
+                raise FileNotFoundError(key) from None
+            raise
+
+    def _get_version(self, s3, bucket: str, key: str, etag: str) -> str:
+        name = re.sub(r"[^0-9A-Za-z-]", "", etag)
+        path = os.path.join(self.folder, name)
+
+        if self._hit(name):
+            log.debug("Serving %s from the download cache", key)
+            return path
+
+        with self._lock:
+            download_lock = self._download_locks.setdefault(name, Lock())
+
+        with download_lock:
+            try:
+                if not self._hit(name):  # unless downloaded while waiting for the lock
+                    size = self._download(s3, bucket, key, etag, path)
+                    with self._lock:
+                        self._add(name, size)
+                        self._pin(name)
+                        self._evict()
+            finally:
+                with self._lock:
+                    self._download_locks.pop(name, None)
+        return path
+
+    def release(self, path: str) -> None:
+        """The file returned by get is not read anymore, it can be evicted."""
+        name = os.path.basename(path)
+        with self._lock:
+            pins = self._pins.pop(name, 0) - 1
+            if pins > 0:
+                self._pins[name] = pins
+
+    def _hit(self, name: str) -> bool:
+        # pinned, so it is not evicted before the caller reads it
+        with self._lock:
+            if name not in self._entries:
+                return False
+            self._entries.move_to_end(name)
+            self._pin(name)
+            return True
+
+    def _pin(self, name: str) -> None:
+        self._pins[name] = self._pins.get(name, 0) + 1
+
+    def _download(self, s3, bucket: str, key: str, etag: str, path: str) -> int:
+        log.debug("Downloading %s into the download cache", key)
+        # IfMatch makes sure the content belongs to the ETag used as the name
+        body = s3.get_object(Bucket=bucket, Key=key, IfMatch=etag)["Body"]
+        size = 0
+        with NamedTemporaryFile("wb", dir=self.folder, prefix=".", delete=False) as f:
+            try:
+                for chunk in body.iter_chunks(CHUNK_SIZE):
+                    f.write(chunk)
+                    size += len(chunk)
+            except BaseException:
+                f.close()
+                os.remove(f.name)
+                raise
+        os.replace(f.name, path)
+        return size
+
+    def _add(self, name: str, size: int) -> None:
+        self._size += size - self._entries.pop(name, 0)
+        self._entries[name] = size
+
+    def _evict(self) -> None:
+        # pinned files are kept over max_size, evicted by a later miss
+        for name in list(self._entries):
+            if self._size <= self.max_size:
+                break
+            if name in self._pins:
+                continue
+            self._size -= self._entries.pop(name)
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except FileNotFoundError:
+                pass
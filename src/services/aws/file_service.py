@@ -1,26 +1,89 @@
+import asyncio
 import os
 from functools import cache
-from typing import IO
+from threading import Lock
+from typing import IO, AsyncIterable, Iterator
+from urllib.parse import quote
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from fastapi.concurrency import run_in_threadpool
 
-from src.shared.config import AWS_ID, AWS_REGION, AWS_SECRET, TMP_FOLDER
+import src.shared.metrics as metrics
+from src.services.aws.download_cache import DownloadCache, is_not_found
+from src.services.renditions import Renditions
+from src.services.utils import ContentCounter, LimitedReader, timed
+from src.shared.config import (
+    AWS_ID,
+    AWS_REGION,
+    AWS_SECRET,
+    DOWNLOAD_CACHE_FOLDER,
+    DOWNLOAD_CACHE_SIZE,
+    PRESIGNED_URL_EXPIRES,
+    S3_ENDPOINT_URL,
+    S3_MAX_CONCURRENCY,
+    S3_MAX_POOL_CONNECTIONS,
+    S3_MULTIPART_CHUNKSIZE,
+    S3_MULTIPART_THRESHOLD,
+)
 from src.shared.logs import log
 
+_lock = Lock()  # services are created in parallel, see init_file_services
+
+
+def get_s3():
+    with _lock:
+        return _get_s3()
+
 
 # Used cache to make it function as a singleton
 @cache
-def get_s3():
+def _get_s3():
     session = boto3.Session(
         aws_access_key_id=AWS_ID,
         aws_secret_access_key=AWS_SECRET,
         region_name=AWS_REGION,
     )
-    return session.client("s3")
+    return session.client(
+        "s3",
+        endpoint_url=S3_ENDPOINT_URL,
+        config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS),
+    )
+
+
+def get_transfer_config() -> TransferConfig:
+    return TransferConfig(
+        multipart_threshold=S3_MULTIPART_THRESHOLD,
+        multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+        max_concurrency=S3_MAX_CONCURRENCY,
+    )
+
+
+def get_download_cache() -> DownloadCache:
+    with _lock:
+        return _get_download_cache()
+
+
+@cache
+def _get_download_cache() -> DownloadCache:
+    return DownloadCache(DOWNLOAD_CACHE_FOLDER, DOWNLOAD_CACHE_SIZE)
 
 
 class AWSFileService:
-    def __init__(self, folder, bucket, source_folder: str | None = None):
+    metrics_label = "aws"
+
+    def __init__(
+        self,
+        folder,
+        bucket,
+        source_folder: str | None = None,
+        s3=None,
+        download_cache: DownloadCache | None = None,
+        transfer_config: TransferConfig | None = None,
+        renditions: Renditions | None = None,
+    ):
         self.folder = folder
 
         # bucket folder where the files will be actually stored after processing
@@ -31,37 +94,229 @@ class AWSFileService:
             self.source_folder = folder
 
         self.bucket = bucket
-        self.s3 = get_s3()
+        self.s3 = s3 if s3 is not None else get_s3()
+        self.download_cache = download_cache or get_download_cache()
+        self.transfer_config = transfer_config or get_transfer_config()
+        # processed files stored under several names, e.g. by the Lambda
+        self.renditions = renditions
 
-    def save_file(self, in_file: IO, id: str, content_type: str | None = None):
-        log.debug(f"Saving file {id} into {self.get_file_path(id)}")
+    @timed
+    def save_file(self, in_file: IO, id: str, content_type: str | None = None) -> str:
+        """Returns SHA-256 of the content.
 
-        args = (
-            {"ContentType": content_type, "ContentDisposition": content_type}
-            if content_type
-            else {}
-        )
+        Raises FileTooLargeError, boto3 aborts the upload in that case.
+        """
+        log.debug("Saving file %s into %s", id, self.get_file_path(id))
+
+        reader = LimitedReader(in_file)
         self.s3.upload_fileobj(
-            in_file, self.bucket, self.get_file_path(id), ExtraArgs=args
+            reader,
+            self.bucket,
+            self.get_file_path(id),
+            ExtraArgs=self._extra_args(content_type),
+            Config=self.transfer_config,
         )
+        metrics.FILE_OPERATION_BYTES.labels("aws", "save_file").inc(reader.counter.size)
+        return reader.hexdigest()
 
+    @timed
+    async def save_stream(
+        self,
+        chunks: AsyncIterable[bytes],
+        id: str,
+        content_type: str | None = None,
+    ) -> str:
+        """Uploads the chunks as they arrive, without spooling the file to disk.
+
+        Every multipart_chunksize bytes are sent as a part from the threadpool, with
+        up to max_concurrency parts in flight, so the memory stays bounded.
+        Returns SHA-256 of the content, raises FileTooLargeError.
+        """
+        key = self.get_file_path(id)
+        log.debug("Streaming file %s into %s", id, key)
+        part_size = self.transfer_config.multipart_chunksize
+        in_flight = asyncio.Semaphore(self.transfer_config.max_concurrency)
+        counter = ContentCounter()
+        buffer = bytearray()
+        upload_id: str | None = None
+        parts: list[asyncio.Task] = []
+
+        async def send_part(number: int, body: bytes) -> dict:
+            try:
+                response = await run_in_threadpool(
+                    self.s3.upload_part,
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=number,
+                    Body=body,
+                )
+                return {"PartNumber": number, "ETag": response["ETag"]}
+            finally:
+                in_flight.release()
+
+        try:
+            async for chunk in chunks:
+                counter.update(chunk)
+                buffer += chunk
+                while len(buffer) >= part_size:
+                    if upload_id is None:
+                        upload = await run_in_threadpool(
+                            self.s3.create_multipart_upload,
+                            Bucket=self.bucket,
+                            Key=key,
+                            **self._extra_args(content_type),
+                        )
+                        upload_id = upload["UploadId"]
+                    await in_flight.acquire()  # stops reading while parts are sent
+                    body, buffer = bytes(buffer[:part_size]), buffer[part_size:]
+                    parts.append(asyncio.create_task(send_part(len(parts) + 1, body)))
+
+            if upload_id is None:  # smaller than a single part
+                await run_in_threadpool(
+                    self.s3.put_object,
+                    Bucket=self.bucket,
+                    Key=key,
+                    Body=bytes(buffer),
+                    **self._extra_args(content_type),
+                )
+                metrics.FILE_OPERATION_BYTES.labels("aws", "save_stream").inc(
+                    counter.size
+                )
+                return counter.hexdigest()
+
+            if buffer:
+                await in_flight.acquire()
+                parts.append(
+                    asyncio.create_task(send_part(len(parts) + 1, bytes(buffer)))
+                )
+            uploaded = await asyncio.gather(*parts)
+            await run_in_threadpool(
+                self.s3.complete_multipart_upload,
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": uploaded},
+            )
+        except BaseException:
+            for part in parts:
+                part.cancel()
+            if upload_id is not None:
+                await run_in_threadpool(
+                    self.s3.abort_multipart_upload,
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                )
+            raise
+        metrics.FILE_OPERATION_BYTES.labels("aws", "save_stream").inc(counter.size)
+        return counter.hexdigest()
+
+    def _extra_args(self, content_type: str | None) -> dict[str, str]:
+        if not content_type:
+            return {}
+        return {"ContentType": content_type, "ContentDisposition": content_type}
+
+    @timed
+    def move_file(self, id: str, new_id: str) -> None:
+        # copied inside of the storage, in parts for the large files
+        source = {"Bucket": self.bucket, "Key": self.get_file_path(id)}
+        self.s3.copy(
+            source, self.bucket, self.get_file_path(new_id), Config=self.transfer_config
+        )
+        self.s3.delete_object(**source)
+
+    @timed
     def delete_file_by_id(self, id: str):
         log.debug(
-            f"Deleting file {id} from {self.get_file_path(id, self.source_folder)}"
+            "Deleting file %s from %s", id, self.get_file_path(id, self.source_folder)
         )
-        self.s3.delete_object(
-            Bucket=self.bucket, Key=self.get_file_path(id, self.source_folder)
+        if self.renditions is None:
+            self.s3.delete_object(
+                Bucket=self.bucket, Key=self.get_file_path(id, self.source_folder)
+            )
+            return
+
+        keys = [
+            self.get_file_path(r.name, self.source_folder) for r in self.renditions(id)
+        ]
+        self.s3.delete_objects(
+            Bucket=self.bucket,
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
         )
 
-    def download_file(self, id: str):
-        # Use couple characters of the UUID to achieve tmp storage to send back the file
-        # and avoid potential collisions
-        download_path = os.path.join(TMP_FOLDER, id[:2])
-        log.debug(f"Downloading file {id} to {download_path}")
-        self.s3.download_file(
-            self.bucket, self.get_file_path(id, self.source_folder), download_path
+    @timed
+    def delete_files(self, ids: list[str]) -> None:
+        for i in range(0, len(ids), 1000):  # limit of a DeleteObjects request
+            keys = [
+                self.get_file_path(id, self.source_folder) for id in ids[i : i + 1000]
+            ]
+            response = self.s3.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+            )
+            for error in response.get("Errors", []):
+                log.error("Failed to delete %s: %s", error["Key"], error["Message"])
+
+    def list_files(self) -> Iterator[tuple[str, float]]:
+        """Ids of the stored files with the time they were modified.
+
+        Hidden files are skipped, e.g. the uploads in progress.
+        """
+        prefix = self.get_file_path("", self.source_folder)
+        for page in self.s3.get_paginator("list_objects_v2").paginate(
+            Bucket=self.bucket, Prefix=prefix
+        ):
+            for item in page.get("Contents", []):
+                id = item["Key"][len(prefix) :]
+                if not id.startswith("."):
+                    yield id, item["LastModified"].timestamp()
+
+    @timed
+    def download_file(self, id: str) -> str:
+        """Path to the local copy of the file, shared with other requests.
+
+        Kept in the download cache until release_file is called with the path.
+        Raises FileNotFoundError.
+        """
+        key = self.get_file_path(id, self.source_folder)
+        path = self.download_cache.get(self.s3, self.bucket, key)
+        size = os.stat(path).st_size
+        metrics.FILE_OPERATION_BYTES.labels("aws", "download_file").inc(size)
+        return path
+
+    def release_file(self, path: str) -> None:
+        self.download_cache.release(path)
+
+    def has_file(self, id: str) -> bool:
+        key = self.get_file_path(id, self.source_folder)
+        try:
+            self.s3.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if is_not_found(e):
+                return False
+            raise
+        return True
+
+    def get_download_url(
+        self,
+        id: str,
+        filename: str | None = None,
+        expires_in: int = PRESIGNED_URL_EXPIRES,
+    ) -> str | None:
+        """Presigned GET URL of the file, valid for expires_in seconds."""
+        params = {
+            "Bucket": self.bucket,
+            "Key": self.get_file_path(id, self.source_folder),
+        }
+        if filename:
+            params[
+                "ResponseContentDisposition"
+            ] = f"attachment; filename*=utf-8''{quote(filename)}"
+        log.debug("Presigning download of file %s for %ss", id, expires_in)
+        return self.s3.generate_presigned_url(  # type: ignore
+            "get_object", Params=params, ExpiresIn=expires_in
         )
-        return download_path
 
     def get_file_path(self, id: str, folder=None) -> str:
         if folder is None:
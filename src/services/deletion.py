@@ -0,0 +1,79 @@
+from collections import defaultdict
+from queue import Empty, Queue
+from threading import Lock, Thread
+from typing import Callable, Iterable
+
+from src.services import file_service
+from src.services.renditions import logo_renditions
+from src.shared.config import DELETION_BATCH_SIZE
+from src.shared.logs import log
+
+# handler of a batch, e.g. file_service.documents.delete_files
+Handler = Callable[[list[str]], None]
+
+
+class DeletionQueue:
+    """Runs the deletions after the response, in batches per handler.
+
+    Deletions are not persisted, anything lost on a restart or a failure
+    is removed later by src.services.reconciler.
+    """
+
+    def __init__(self, batch_size: int = DELETION_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._queue: Queue[tuple[Handler, str] | None] = Queue()
+        self._lock = Lock()  # guards the thread
+        self._thread: Thread | None = None
+
+    def put(self, handler: Handler, ids: Iterable[str]) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="deletions", daemon=True)
+                self._thread.start()
+        for id in ids:
+            self._queue.put((handler, id))
+
+    def _run(self) -> None:
+        while (item := self._queue.get()) is not None:
+            items = [item]
+            while len(items) < self.batch_size:  # everything queued up to the size
+                try:
+                    item = self._queue.get_nowait()
+                except Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)  # stop after this batch
+                    self._queue.task_done()
+                    break
+                items.append(item)
+
+            batches: dict[Handler, list[str]] = defaultdict(list)
+            for handler, id in items:
+                batches[handler].append(id)
+            for handler, ids in batches.items():
+                try:
+                    handler(ids)
+                except Exception as e:
+                    log.error("Failed to delete %s items: %r", len(ids), e)
+            for _ in items:
+                self._queue.task_done()
+        self._queue.task_done()
+
+    def join(self) -> None:
+        """Waits until everything queued is deleted."""
+        self._queue.join()
+
+    def close(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+
+deletions = DeletionQueue()
+
+
+def delete_logo_later(logo_id: str) -> None:
+    names = [rendition.name for rendition in logo_renditions(logo_id)]
+    deletions.put(file_service.logos.delete_files, names)
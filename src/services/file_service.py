@@ -1,5 +1,8 @@
-import src.services.aws.file_service as aws
-import src.services.local.file_service as local
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import TYPE_CHECKING, Union
+
+from src.services.renditions import logo_renditions
 from src.shared.config import (
     DOCUMENT_FOLDER,
     FILE_FOLDER,
@@ -10,21 +13,35 @@ from src.shared.config import (
 )
 from src.shared.logs import log
 
+if TYPE_CHECKING:
+    import src.services.aws.file_service as aws
+    import src.services.local.file_service as local
+
+FileService = Union[
+    "local.LocalFileService", "local.LocalImageService", "aws.AWSFileService"
+]
+
+# Services are created on first use of file_service.documents or .logos, or all
+#   at once by init_file_services at startup, so importing the application does
+#   not import boto3 or resolve the AWS credentials
 
-def init_file_service(
-    folder: str, used_processing: bool = False
-) -> local.LocalFileService | aws.AWSFileService:
-    log.warning(
-        f"received RUN_LOCAL={RUN_LOCAL} \
-RUN_CONTAINER={RUN_CONTAINER} RUN_CLOUD={RUN_CLOUD}"
-    )
 
+def init_file_service(folder: str, used_processing: bool = False) -> FileService:
+    # backends are imported only when used, e.g. boto3 only with RUN_CLOUD
     if RUN_CLOUD:
+        import src.services.aws.file_service as aws
+
         if used_processing:
-            return aws.AWSFileService(folder, FILE_FOLDER, folder + "-processed")
+            return aws.AWSFileService(
+                folder, FILE_FOLDER, folder + "-processed", renditions=logo_renditions
+            )
         return aws.AWSFileService(folder, FILE_FOLDER)
 
     if RUN_LOCAL or RUN_CONTAINER:
+        import src.services.local.file_service as local
+
+        if used_processing:
+            return local.LocalImageService(folder, logo_renditions)
         return local.LocalFileService(folder)
 
     raise ValueError(
@@ -33,5 +50,51 @@ RUN_CONTAINER={RUN_CONTAINER} RUN_CLOUD={RUN_CLOUD}"
     )
 
 
-documents = init_file_service(DOCUMENT_FOLDER)
-logos = init_file_service(LOGO_FOLDER, True)
+# name -> arguments of init_file_service
+SERVICES: dict[str, tuple[str, bool]] = {
+    "documents": (DOCUMENT_FOLDER, False),
+    "logos": (LOGO_FOLDER, True),
+}
+
+_services: dict[str, FileService] = {}
+_locks = {name: Lock() for name in SERVICES}  # services are created only once
+
+
+def get_file_service(name: str) -> FileService:
+    service = _services.get(name)
+    if service is None:
+        with _locks[name]:
+            service = _services.get(name)
+            if service is None:
+                service = _services[name] = init_file_service(*SERVICES[name])
+                log.info(
+                    "Using %s for %s: received \
+RUN_LOCAL=%s RUN_CONTAINER=%s RUN_CLOUD=%s",
+                    type(service).__name__,
+                    name,
+                    RUN_LOCAL,
+                    RUN_CONTAINER,
+                    RUN_CLOUD,
+                )
+    return service
+
+
+def init_file_services() -> None:
+    """Creates all of the services in parallel, e.g. at startup."""
+    with ThreadPoolExecutor(len(SERVICES)) as executor:
+        list(executor.map(get_file_service, SERVICES))
+
+
+def __getattr__(name: str) -> FileService:
+    # file_service.documents and file_service.logos
+    if name in SERVICES:
+        return get_file_service(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def close_file_services() -> None:
+    # stops the worker processes of the local image processing
+    for service in list(_services.values()):
+        close = getattr(service, "close", None)
+        if close is not None:
+            close()
@@ -1,51 +1,242 @@
 import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import suppress
+from multiprocessing import get_context
 from pathlib import Path
-from typing import IO
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from typing import IO, AsyncIterable, Iterator
 
-# from PIL import Image
-# https://note.nkmk.me/en/python-pillow-square-circle-thumbnail/
-# def crop_center(pil_img: Image.Image, crop_width, crop_height):
-#     img_width, img_height = pil_img.size
+from fastapi.concurrency import run_in_threadpool
 
-#     return pil_img.crop(
-#         (
-#             (img_width - crop_width) // 2,
-#             (img_height - crop_height) // 2,
-#             (img_width + crop_width) // 2,
-#             (img_height + crop_height) // 2,
-#         )
-#     )
-
-
-# def crop_max_square(pil_img):
-#     return crop_center(pil_img, min(pil_img.size), min(pil_img.size))
-
-
-# def resize_image(file: IO, filename: Path):
-#     with Image.open(file) as im:
-#         im = crop_max_square(im)
-#         im.thumbnail((LOGO_SIZE, LOGO_SIZE))
-#         im.save(filename, "JPEG")
+import src.shared.metrics as metrics
+from src.services.local.images import resize_image
+from src.services.renditions import Rendition, Renditions, logo_renditions
+from src.services.utils import ContentCounter, copy_file, timed
+from src.shared.config import (
+    IMAGE_RESAMPLE,
+    LOGO_PROCESS_WORKERS,
+    LOGO_PROCESSING_TIMEOUT,
+    MAX_IMAGE_PIXELS,
+)
+from src.shared.logs import log
 
 
 class LocalFileService:
+    metrics_label = "local"
+
     def __init__(self, folder):
         self.folder = folder
 
-    def save_file(self, in_file: IO, id: str, content_type: str | None = None):
+    @timed
+    def save_file(self, in_file: IO, id: str, content_type: str | None = None) -> str:
+        """Returns SHA-256 of the content.
+
+        Raises FileTooLargeError, the previous file is kept in that case.
+        """
         path_to_file = Path(self.get_file_path(id))
 
-        # TODO: change to aiofile for asynchronous download
-        with open(path_to_file, "wb") as f:
-            f.write(in_file.read())
+        # written next to the target and renamed, so readers never see a partial file
+        with NamedTemporaryFile(
+            "wb", dir=self.folder, prefix=f".{id}.", delete=False
+        ) as f:
+            try:
+                content_hash = copy_file(in_file, f)
+            except BaseException:
+                f.close()
+                os.remove(f.name)
+                raise
+            metrics.FILE_OPERATION_BYTES.labels("local", "save_file").inc(f.tell())
+        os.replace(f.name, path_to_file)
+
+        return content_hash
 
-        return path_to_file
+    @timed
+    async def save_stream(
+        self,
+        chunks: AsyncIterable[bytes],
+        id: str,
+        content_type: str | None = None,
+    ) -> str:
+        """Same as save_file for the chunks of the request body."""
+        counter = ContentCounter()
+        f = await run_in_threadpool(
+            NamedTemporaryFile, "wb", dir=self.folder, prefix=f".{id}.", delete=False
+        )
+        try:
+            async for chunk in chunks:
+                counter.update(chunk)
+                await run_in_threadpool(f.write, chunk)
+            f.close()
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+        os.replace(f.name, self.get_file_path(id))
 
+        metrics.FILE_OPERATION_BYTES.labels("local", "save_stream").inc(counter.size)
+        return counter.hexdigest()
+
+    @timed
     def download_file(self, id: str):
-        return self.get_file_path(id)
+        path = self.get_file_path(id)
+        with suppress(FileNotFoundError):
+            size = os.stat(path).st_size
+            metrics.FILE_OPERATION_BYTES.labels("local", "download_file").inc(size)
+        return path
+
+    def release_file(self, path: str) -> None:
+        pass  # served from the storage itself, see AWSFileService.release_file
 
+    def has_file(self, id: str) -> bool:
+        return os.path.exists(self.get_file_path(id))
+
+    def get_download_url(
+        self, id: str, filename: str | None = None, expires_in: int = 0
+    ) -> str | None:
+        return None  # files are served by the API itself
+
+    @timed
+    def move_file(self, id: str, new_id: str) -> None:
+        os.replace(self.get_file_path(id), self.get_file_path(new_id))
+
+    @timed
     def delete_file_by_id(self, id: str):
         os.remove(self.get_file_path(id))
 
+    @timed
+    def delete_files(self, ids: list[str]) -> None:
+        for id in ids:
+            with suppress(FileNotFoundError):
+                os.remove(self.get_file_path(id))
+
+    def list_files(self) -> Iterator[tuple[str, float]]:
+        """Ids of the stored files with the time they were modified.
+
+        Hidden files are skipped, e.g. the uploads in progress.
+        """
+        for entry in os.scandir(self.folder):
+            if entry.is_file() and not entry.name.startswith("."):
+                yield entry.name, entry.stat().st_mtime
+
     def get_file_path(self, id: str):
         return os.path.join(self.folder, id)
+
+
+class LocalImageService(LocalFileService):
+    """Stores the images as square renditions, like the Lambda in the cloud.
+
+    save_file keeps the upload and returns at once, the renditions are made
+    by a pool of worker processes, so PIL does not block the API.
+    Downloads of an image being processed wait for it to be ready.
+    """
+
+    def __init__(
+        self,
+        folder,
+        renditions: Renditions = logo_renditions,
+        workers: int = LOGO_PROCESS_WORKERS,
+    ):
+        super().__init__(folder)
+        self.renditions = renditions
+        self.workers = workers
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = Lock()  # guards the fields above and below
+        self._pending: dict[str, Future] = {}  # rendition name -> processing
+        metrics.LOGO_PROCESSING_PENDING.set_function(self.pending_count)
+
+    @timed
+    def save_file(self, in_file: IO, id: str, content_type: str | None = None) -> str:
+        source = self.get_source_path(id)
+        with open(source, "wb") as f:
+            try:
+                content_hash = copy_file(in_file, f)
+            except BaseException:
+                f.close()
+                os.remove(source)
+                raise
+            metrics.FILE_OPERATION_BYTES.labels("local", "save_file").inc(f.tell())
+
+        renditions = self.renditions(id)
+        targets = [(self.get_file_path(r.name), r.size, r.format) for r in renditions]
+        with self._lock:
+            if self._executor is None:
+                # spawned workers do not inherit the connections and threads of the API
+                self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=get_context("spawn")
+                )
+            future = self._executor.submit(
+                resize_image, source, targets, IMAGE_RESAMPLE, MAX_IMAGE_PIXELS
+            )
+            for rendition in renditions:
+                self._pending[rendition.name] = future
+        future.add_done_callback(lambda f: self._processed(renditions, f))
+
+        return content_hash
+
+    def _processed(self, renditions: list[Rendition], future: Future) -> None:
+        with self._lock:
+            for rendition in renditions:
+                if self._pending.get(rendition.name) is future:
+                    del self._pending[rendition.name]
+        if not future.cancelled() and (e := future.exception()) is not None:
+            log.error("Failed to process image %s: %s", renditions[0].name, e)
+
+    def pending_count(self) -> int:
+        """Number of images waiting for or being processed by the workers."""
+        with self._lock:
+            return len(set(self._pending.values()))
+
+    def wait(self, id: str, timeout: float | None = LOGO_PROCESSING_TIMEOUT) -> None:
+        """Waits until the image or its rendition is processed, if it is pending."""
+        with self._lock:
+            future = self._pending.get(id)
+        if future is None:
+            return
+        with suppress(Exception):  # failures are logged by _processed, or timed out
+            future.result(timeout)
+
+    @timed
+    def download_file(self, id: str):
+        self.wait(id)
+        path = self.get_file_path(id)
+        size = os.stat(path).st_size  # raises FileNotFoundError
+        metrics.FILE_OPERATION_BYTES.labels("local", "download_file").inc(size)
+        return path
+
+    def has_file(self, id: str) -> bool:
+        self.wait(id)
+        return super().has_file(id)
+
+    @timed
+    def delete_file_by_id(self, id: str):
+        renditions = self.renditions(id)
+        with self._lock:
+            futures = {
+                future
+                for r in renditions
+                if (future := self._pending.pop(r.name, None)) is not None
+            }
+        for future in futures:
+            if not future.cancel():
+                with suppress(Exception):
+                    future.result()
+            with suppress(FileNotFoundError):  # the upload of a cancelled task
+                os.remove(self.get_source_path(id))
+
+        removed = False
+        for rendition in renditions:
+            with suppress(FileNotFoundError):  # e.g. the logos stored before renditions
+                os.remove(self.get_file_path(rendition.name))
+                removed = True
+        if not (removed or futures):
+            raise FileNotFoundError(self.get_file_path(id))
+
+    def get_source_path(self, id: str):
+        return os.path.join(self.folder, f".{id}.source")
+
+    def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
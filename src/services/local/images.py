@@ -0,0 +1,94 @@
+import os
+from tempfile import NamedTemporaryFile
+
+from PIL import Image
+
+# Runs in the worker processes of LocalImageService, so keep the imports light
+
+
+# https://note.nkmk.me/en/python-pillow-square-circle-thumbnail/
+def crop_center(pil_img: Image.Image, crop_width: int, crop_height: int) -> Image.Image:
+    img_width, img_height = pil_img.size
+
+    return pil_img.crop(
+        (
+            (img_width - crop_width) // 2,
+            (img_height - crop_height) // 2,
+            (img_width + crop_width) // 2,
+            (img_height + crop_height) // 2,
+        )
+    )
+
+
+def crop_max_square(pil_img: Image.Image) -> Image.Image:
+    return crop_center(pil_img, min(pil_img.size), min(pil_img.size))
+
+
+def resize_image(
+    source: str,
+    targets: list[tuple[str, int, str]],
+    resample: str = "lanczos",
+    max_pixels: int | None = None,
+) -> None:
+    """Saves the source as "size x size" square images and removes it.
+
+    targets are the paths with the size and the format of every image.
+    Raises DecompressionBombError for images over max_pixels.
+    """
+    try:
+        with Image.open(source) as im:  # only the header is read here
+            _check_pixels(im, max_pixels)
+            largest = max(size for _, size, _ in targets)
+
+            # JPEG is decoded at 1/2, 1/4 or 1/8 of the size right away,
+            #   as long as the square stays larger than the largest image
+            width, height = im.size
+            side = min(width, height)
+            im.draft("RGB", (largest * width // side, largest * height // side))
+
+            image = _reduce(crop_max_square(im), largest).convert("RGBA")
+
+        filter = Image.Resampling[resample.upper()]
+        # each image is resized from the previous larger one
+        for target, size, format in sorted(targets, key=lambda t: -t[1]):
+            image = image.copy()
+            image.thumbnail((size, size), filter)
+            _save(image if format == "webp" else _opaque(image), target, format)
+    finally:
+        os.remove(source)
+
+
+def _check_pixels(im: Image.Image, max_pixels: int | None) -> None:
+    # PIL itself only raises over twice the MAX_IMAGE_PIXELS
+    limit = Image.MAX_IMAGE_PIXELS if max_pixels is None else max_pixels
+    if limit is not None and im.width * im.height > limit:
+        raise Image.DecompressionBombError(
+            f"Image size ({im.width * im.height} pixels) exceeds limit of {limit}"
+        )
+
+
+def _reduce(im: Image.Image, size: int) -> Image.Image:
+    # integer downscaling by averaging is much cheaper than resampling,
+    #   the image is kept at least twice the size for the final filter
+    factor = min(im.size) // (size * 2)
+    return im.reduce(factor) if factor > 1 else im
+
+
+def _opaque(image: Image.Image) -> Image.Image:
+    # JPEG has no alpha, transparent pixels would be black without the background
+    background = Image.new("RGB", image.size, "white")
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+
+def _save(image: Image.Image, target: str, format: str) -> None:
+    # renamed when complete, so readers never see a partial image
+    folder = os.path.dirname(target)
+    with NamedTemporaryFile("wb", dir=folder, prefix=".", delete=False) as f:
+        try:
+            image.save(f, format.upper())
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    os.replace(f.name, target)
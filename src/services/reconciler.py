@@ -0,0 +1,102 @@
+from datetime import timedelta
+from threading import Event, Thread
+from time import time
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+import src.document.dao as document_dao
+import src.document.models as document_models
+import src.project.models as project_models
+from src.services import file_service
+from src.services.renditions import logo_renditions
+from src.shared.config import RECONCILE_GRACE, RECONCILE_INTERVAL
+from src.shared.database import get_sessionmaker
+from src.shared.logs import log
+
+# Removes the files left behind by the lost deletions, failed uploads and
+#   the deletions of the projects, by comparing the storage with the database
+
+LOCK_ID = 4_918_276  # advisory lock, so only one of the workers reconciles at once
+
+
+def reconcile(db: Session, grace: float = RECONCILE_GRACE) -> int:
+    """Deletes the files without documents or projects, returns their number.
+
+    Files modified in the last grace seconds are kept, they can belong
+    to the uploads in progress.
+    """
+    if not db.scalar(select(func.pg_try_advisory_xact_lock(LOCK_ID))):
+        return 0
+
+    removed = document_dao.delete_unreferenced_blobs(
+        db, older_than=timedelta(seconds=grace)
+    )
+    file_service.documents.delete_files(removed)
+
+    blob_ids = db.scalars(select(document_models.Blob.id))
+    stored_by_id = db.scalars(
+        select(document_models.Document.id).where(
+            document_models.Document.blob_id.is_(None)
+        )
+    )
+    count = len(removed) + _delete_orphans(
+        file_service.documents, {*blob_ids, *stored_by_id}, grace
+    )
+
+    logo_ids = db.scalars(
+        select(project_models.Project.logo_id).where(
+            project_models.Project.logo_id.is_not(None)
+        )
+    )
+    renditions = {r.name for id in logo_ids if id for r in logo_renditions(id)}
+    count += _delete_orphans(file_service.logos, renditions, grace)
+
+    db.commit()  # releases the lock
+    return count
+
+
+def _delete_orphans(service, known: set[str], grace: float) -> int:
+    modified_before = time() - grace
+    orphans = [
+        id
+        for id, modified in service.list_files()
+        if id not in known and modified < modified_before
+    ]
+    if orphans:
+        log.info("Deleting %s orphaned files", len(orphans))
+        service.delete_files(orphans)
+    return len(orphans)
+
+
+class Reconciler:
+    """Runs reconcile every interval seconds in a background thread."""
+
+    def __init__(self, interval: float = RECONCILE_INTERVAL):
+        self.interval = interval
+        self._stop = Event()
+        self._thread: Thread | None = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="reconciler", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                with get_sessionmaker()() as db:
+                    reconcile(db)
+            except Exception as e:
+                log.error("Failed to reconcile the files: %r", e)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+reconciler = Reconciler()
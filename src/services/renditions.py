@@ -0,0 +1,73 @@
+from typing import Callable, NamedTuple
+
+from src.shared.config import LOGO_FORMATS, LOGO_SIZE, LOGO_SIZES
+
+# Processed logos are stored as "<id>", the LOGO_SIZE JPEG served by default,
+#   and as the renditions "<id>_<size>.<format>" for LOGO_SIZES and LOGO_FORMATS
+
+MEDIA_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp"}
+EXTENSIONS = {"jpeg": "jpg", "webp": "webp"}
+
+
+class Rendition(NamedTuple):
+    name: str  # id of the file in the file service
+    size: int
+    format: str
+
+
+Renditions = Callable[[str], list[Rendition]]
+
+
+def rendition_name(id: str, size: int, format: str) -> str:
+    return f"{id}_{size}.{format}"
+
+
+def default_logo_rendition(id: str) -> Rendition:
+    # the only one of the logos processed before the renditions were added
+    return Rendition(id, LOGO_SIZE, "jpeg")
+
+
+def logo_renditions(id: str) -> list[Rendition]:
+    return [default_logo_rendition(id)] + [
+        Rendition(rendition_name(id, size, format), size, format)
+        for size in LOGO_SIZES
+        for format in LOGO_FORMATS
+    ]
+
+
+def _accepted(accept: str | None) -> dict[str, float]:
+    # media types listed explicitly in the Accept header with their quality
+    accepted = {}
+    for item in (accept or "").split(","):
+        media_type, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[media_type.lower()] = quality
+    return accepted
+
+
+def choose_logo_rendition(id: str, size: int | None, accept: str | None) -> Rendition:
+    """Smallest rendition not smaller than size, in the preferred accepted format.
+
+    JPEG is used unless another format is listed in Accept, as every client
+    supports it. Without size and in JPEG the default logo is chosen.
+    """
+    accepted = _accepted(accept)
+    formats = [f for f in LOGO_FORMATS if accepted.get(MEDIA_TYPES.get(f, ""), 0) > 0]
+    # stable sort keeps the order of LOGO_FORMATS for the same quality
+    formats.sort(key=lambda f: accepted[MEDIA_TYPES[f]], reverse=True)
+    format = formats[0] if formats else "jpeg"
+
+    if format not in LOGO_FORMATS or (size is None and format == "jpeg"):
+        return default_logo_rendition(id)
+
+    sizes = sorted(LOGO_SIZES)
+    target = LOGO_SIZE if size is None else size
+    chosen = next((s for s in sizes if s >= target), sizes[-1])
+    return Rendition(rendition_name(id, chosen, format), chosen, format)
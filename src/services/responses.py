@@ -0,0 +1,173 @@
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Iterator
+
+from fastapi import Request, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+# Conditional and partial downloads of the stored files
+# https://developer.mozilla.org/en-US/docs/Web/HTTP/Conditional_requests
+# https://developer.mozilla.org/en-US/docs/Web/HTTP/Range_requests
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _utc(value: datetime) -> datetime:
+    # timestamps of the models are stored without timezone in UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def validator_headers(
+    etag: str | None, last_modified: datetime | None
+) -> dict[str, str]:
+    headers = {"accept-ranges": "bytes"}
+    if etag:
+        headers["etag"] = f'"{etag}"'
+    if last_modified:
+        headers["last-modified"] = format_datetime(_utc(last_modified), usegmt=True)
+    return headers
+
+
+def not_modified(
+    request: Request, etag: str | None, last_modified: datetime | None
+) -> Response | None:
+    """Response 304 if the client has the current version, None otherwise.
+
+    Checked before the file is fetched, so the storage is not accessed at all.
+    """
+    headers = validator_headers(etag, last_modified)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:  # takes precedence over If-Modified-Since
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or headers.get("etag") in tags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return None
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = _utc(parsedate_to_datetime(if_modified_since))
+        except (TypeError, ValueError):
+            return None
+        if _utc(last_modified).replace(microsecond=0) <= since:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return None
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """First and last byte of a single byte range, None to send the whole file.
+
+    Raises ValueError if the range can not be satisfied.
+    """
+    unit, _, byte_range = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in byte_range:
+        return None  # multiple ranges are answered with the whole file
+
+    first, _, last = byte_range.strip().partition("-")
+    if not (first or last) or not all(v.isdigit() for v in (first, last) if v):
+        return None  # malformed ranges are ignored
+
+    if not first:  # suffix range, last N bytes
+        if int(last) == 0 or size == 0:
+            raise ValueError(f"Range '{header}' is not satisfiable")
+        return max(size - int(last), 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(f"Range '{header}' is not satisfiable")
+    return start, end
+
+
+def _read_range(path: str, first: int, last: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(first)
+        remaining = last - first + 1
+        while remaining > 0 and (chunk := f.read(min(CHUNK_SIZE, remaining))):
+            remaining -= len(chunk)
+            yield chunk
+
+
+class ReleasingResponse(Response):
+    """Sends the response, then calls release, also if the sending failed.
+
+    e.g. for the files of the download cache, which are kept until released.
+    Background tasks of a response do not run if the client disconnected.
+    """
+
+    def __init__(self, response: Response, release: Callable[[], None]):
+        # attributes read by FastAPI and the middleware, the body is not used
+        self.response = response
+        self.release = release
+        self.status_code = response.status_code
+        self.raw_headers = response.raw_headers
+        self.background = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.response(scope, receive, send)
+        finally:
+            self.release()
+        if self.background is not None:
+            await self.background()
+
+
+def released(release: Callable[[], None], create: Callable[[], Response]) -> Response:
+    """ReleasingResponse of create(), release is called if create fails as well."""
+    try:
+        return ReleasingResponse(create(), release)
+    except BaseException:
+        release()
+        raise
+
+
+def file_response(
+    request: Request,
+    path: str,
+    filename: str,
+    etag: str | None = None,
+    last_modified: datetime | None = None,
+) -> Response:
+    """FileResponse with validators, answers Range requests with 206 or 416."""
+    headers = validator_headers(etag, last_modified)
+    response = FileResponse(path, filename=filename, headers=headers)
+
+    range_header = request.headers.get("range")
+    if range_header is None:
+        return response
+
+    # range is applied only to the version the client already has
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range not in (
+        headers.get("etag"),
+        headers.get("last-modified"),
+    ):
+        return response
+
+    size = os.stat(path).st_size
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={**headers, "content-range": f"bytes */{size}"},
+        )
+    if byte_range is None:
+        return response
+
+    first, last = byte_range
+    headers["content-range"] = f"bytes {first}-{last}/{size}"
+    headers["content-length"] = str(last - first + 1)
+    headers["content-disposition"] = response.headers["content-disposition"]
+    return StreamingResponse(
+        _read_range(path, first, last),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=response.media_type,
+        headers=headers,
+    )
@@ -0,0 +1,119 @@
+import hashlib
+import inspect
+from functools import wraps
+from time import perf_counter
+from typing import IO, Any, Callable, TypeVar
+
+import src.shared.metrics as metrics
+from src.shared.config import MAX_UPLOAD_SIZE, UPLOAD_CHUNK_SIZE
+
+Method = TypeVar("Method", bound=Callable[..., Any])
+
+
+class FileTooLargeError(ValueError):
+    def __init__(self, max_size: int):
+        super().__init__(f"File is larger than {max_size} bytes")
+        self.max_size = max_size
+
+
+class ContentCounter:
+    """Counts and hashes the content, raising FileTooLargeError over max_size bytes."""
+
+    def __init__(self, max_size: int | None = None):
+        self.max_size = MAX_UPLOAD_SIZE if max_size is None else max_size
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+
+    def update(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise FileTooLargeError(self.max_size)
+        self._sha256.update(chunk)
+
+    def hexdigest(self) -> str:
+        return self._sha256.hexdigest()
+
+
+class LimitedReader:
+    """File-like wrapper raising FileTooLargeError after max_size bytes were read.
+
+    Hashes the content on the way, see hexdigest().
+    """
+
+    def __init__(self, in_file: IO, max_size: int | None = None):
+        self.in_file = in_file
+        self.counter = ContentCounter(max_size)
+
+    def read(self, size: int = -1) -> bytes:
+        chunk: bytes = self.in_file.read(size)
+        self.counter.update(chunk)
+        return chunk
+
+    def hexdigest(self) -> str:
+        return self.counter.hexdigest()
+
+
+def copy_file(
+    in_file: IO,
+    out_file: IO,
+    max_size: int | None = None,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> str:
+    """Copies in chunks, so the memory used does not depend on the size of the file.
+
+    Returns SHA-256 of the content.
+    Raises FileTooLargeError as soon as more than max_size bytes were read.
+    """
+    reader = LimitedReader(in_file, max_size)
+    while chunk := reader.read(chunk_size):
+        out_file.write(chunk)
+    return reader.hexdigest()
+
+
+def hash_file(
+    in_file: IO, max_size: int | None = None, chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> str:
+    """SHA-256 of the content, the file is rewound to where it was after reading.
+
+    Raises FileTooLargeError as soon as more than max_size bytes were read.
+    """
+    position = in_file.tell()
+    reader = LimitedReader(in_file, max_size)
+    while reader.read(chunk_size):
+        pass
+    in_file.seek(position)
+    return reader.hexdigest()
+
+
+def timed(method: Method) -> Method:
+    """Records the latency of a method of the file services, labeled by its name.
+
+    The backend is the metrics_label of the service, e.g. "local" or "aws".
+    """
+    operation = method.__name__
+
+    if inspect.iscoroutinefunction(method):
+
+        @wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            start = perf_counter()
+            try:
+                return await method(self, *args, **kwargs)
+            finally:
+                metrics.FILE_OPERATION_DURATION.labels(
+                    self.metrics_label, operation
+                ).observe(perf_counter() - start)
+
+        return async_wrapper  # type: ignore
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        start = perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            metrics.FILE_OPERATION_DURATION.labels(
+                self.metrics_label, operation
+            ).observe(perf_counter() - start)
+
+    return wrapper  # type: ignore
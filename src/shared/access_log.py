@@ -0,0 +1,71 @@
+import logging
+from time import perf_counter
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import src.shared.metrics as metrics
+from src.shared.database import QueryStats, query_stats
+
+access_log = logging.getLogger("app.access")
+
+
+def route_template(scope: Scope) -> str | None:
+    # e.g. "/project/{project_id}", so the requests can be aggregated by route
+    path = getattr(scope.get("route"), "path", None)
+    return path if isinstance(path, str) else None
+
+
+class AccessLogMiddleware:
+    """Logs each request with its status, latency and the SQL statements executed.
+
+    Added inside CorrelationIdMiddleware, so the records have the request ID.
+    The latency is also recorded into metrics.HTTP_REQUEST_DURATION.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = query_stats.set(stats)
+        status = 500  # unless the response is started
+        started = perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            query_stats.reset(token)
+            duration = perf_counter() - started
+            template = route_template(scope)
+            # paths of the unmatched requests are not used as labels, unbounded
+            metrics.HTTP_REQUEST_DURATION.labels(
+                scope["method"], template or "unmatched", status
+            ).observe(duration)
+            route = template or scope["path"]
+            access_log.info(
+                "%s %s %s %.1fms db=%s/%.1fms",
+                scope["method"],
+                route,
+                status,
+                duration * 1000,
+                stats.count,
+                stats.duration * 1000,
+                extra={
+                    "method": scope["method"],
+                    "route": route,
+                    "status": status,
+                    "duration_ms": round(duration * 1000, 3),
+                    "db_queries": stats.count,
+                    "db_duration_ms": round(stats.duration * 1000, 3),
+                },
+            )
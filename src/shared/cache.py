@@ -0,0 +1,105 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Any, Hashable
+
+from src.shared.config import CACHE_BACKEND, REDIS_URL
+from src.shared.logs import log
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache, entries expire after ttl seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [k for k in self._data if str(k).startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisCache:
+    """TTLCache interface on top of a Redis compatible server, values are strings.
+
+    Failures of the server are logged and treated as cache misses.
+    """
+
+    def __init__(self, url: str, ttl: float):
+        import redis  # only required with the redis backend
+
+        self.ttl = ttl
+        self._errors = redis.RedisError
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            value = self._client.get(key)
+        except self._errors as e:
+            log.warning("Cache is not available: %s", e)
+            return default
+        return default if value is None else value
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        ttl_ms = int((self.ttl if ttl is None else ttl) * 1000)
+        try:
+            self._client.set(key, value, px=max(ttl_ms, 1))
+        except self._errors as e:
+            log.warning("Cache is not available: %s", e)
+
+    def delete(self, key: str) -> None:
+        try:
+            self._client.delete(key)
+        except self._errors as e:
+            log.error("Failed to invalidate '%s': %s", key, e)
+
+    def delete_prefix(self, prefix: str) -> None:
+        try:
+            keys = list(self._client.scan_iter(match=f"{prefix}*"))
+            if keys:
+                self._client.delete(*keys)
+        except self._errors as e:
+            log.error("Failed to invalidate '%s*': %s", prefix, e)
+
+
+def make_cache(maxsize: int, ttl: float) -> TTLCache | RedisCache:
+    """Cache of the configured CACHE_BACKEND, maxsize applies only to memory."""
+    if CACHE_BACKEND == "redis":
+        return RedisCache(REDIS_URL, ttl)
+    return TTLCache(maxsize, ttl)
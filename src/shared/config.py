@@ -15,8 +15,21 @@ RUN_LOCAL = os.environ.get("RUN_LOCAL", False)
 RUN_CONTAINER = os.environ.get("RUN_CONTAINER", False)  # run in the container
 RUN_CLOUD = os.environ.get("RUN_CLOUD", False)  # run in the container
 
+# Logging
+
+# level of the "app" logger, e.g. INFO in production
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "DEBUG").upper()
+# "console" for reading, "json" for aggregation of the fields, e.g. of the access log
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "console")
+# records are written by a background thread, over LOG_QUEUE_SIZE queued records
+#   new ones are dropped, 0 to write them synchronously
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+
 # Database
 
+# use AsyncSession with the asyncpg driver instead of the synchronous psycopg2 one
+DB_ASYNC = bool(os.environ.get("DB_ASYNC", False))
+
 # used direct access, so in case env variable is not available, throw an error
 __postgres_user = os.environ["POSTGRES_USER"]
 __postgres_password = os.environ["POSTGRES_PASSWORD"]
@@ -28,12 +41,62 @@ __postgres_db = os.environ["POSTGRES_DB"]
 SQLALCHEMY_DATABASE_URL: str = f"postgresql+psycopg2://{__postgres_user}:{__postgres_password}\
 @{__postgres_host}:{__postgres_port}/{__postgres_db}"
 
+# "postgresql+asyncpg://<USERNAME>:<PASSWORD>@<IP_ADDRESS>:<PORT>/<DATABASE_NAME>"
+SQLALCHEMY_ASYNC_DATABASE_URL: str = f"postgresql+asyncpg://{__postgres_user}:\
+{__postgres_password}@{__postgres_host}:{__postgres_port}/{__postgres_db}"
+
+# Connection pool, applied to both synchronous and asynchronous engines
+# https://docs.sqlalchemy.org/en/20/core/pooling.html
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))  # seconds
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", -1))  # seconds, -1 to disable
+DB_POOL_PRE_PING = bool(os.environ.get("DB_POOL_PRE_PING", False))
+DB_POOL_USE_LIFO = bool(os.environ.get("DB_POOL_USE_LIFO", False))
+
+# the schema is managed by alembic (see entrypoint.sh), create_all at startup
+#   only with DB_CREATE_SCHEMA, e.g. for local development
+DB_CREATE_SCHEMA = bool(os.environ.get("DB_CREATE_SCHEMA", False))
+# connections opened at startup before serving requests, 0 to disable the warm-up
+DB_WARMUP_CONNECTIONS = min(
+    int(os.environ.get("DB_WARMUP_CONNECTIONS", DB_POOL_SIZE)), DB_POOL_SIZE
+)
+
+# totals of the listings with count=cached, see src.shared.database.CountStrategy
+# Kept in the memory of each worker and dropped only by the inserts and deletes
+#   executed by the same worker through SQLAlchemy Core, so the totals can be stale
+#   for up to COUNT_CACHE_TTL after the writes of other workers or raw SQL
+COUNT_CACHE_TTL = float(os.environ.get("COUNT_CACHE_TTL", 30))  # seconds
+COUNT_CACHE_SIZE = int(os.environ.get("COUNT_CACHE_SIZE", 1024))
+
+# Caches
+
+# "memory" keeps the entries in every worker, "redis" shares them through REDIS_URL
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+
+# roles of the users in the projects, see src.project.permission_cache
+PERMISSION_CACHE_TTL = float(os.environ.get("PERMISSION_CACHE_TTL", 60))  # seconds
+PERMISSION_CACHE_SIZE = int(os.environ.get("PERMISSION_CACHE_SIZE", 10000))
+
 # Auth
 
 SECRET_KEY = os.environ["SECRET_KEY"]
 ALGORITHM = os.environ["ALGORITHM"]
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+# bcrypt runs in a dedicated pool, requests over the queue limit are rejected with 503
+PASSWORD_HASH_WORKERS = int(
+    os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 1)
+)
+PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get("PASSWORD_HASH_QUEUE_SIZE", 64))
+
+# verified tokens are cached until they expire, users for a short time,
+#   see src.user.identity_cache
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", 10000))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 30))  # seconds
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 10000))
+
 
 # Files
 
@@ -43,9 +106,35 @@ TMP_FOLDER = ""
 DOCUMENT_FOLDER = ""
 LOGO_FOLDER = ""
 
+# uploads are streamed in chunks and rejected once they grow over the limit
+MAX_UPLOAD_SIZE = int(os.environ.get("MAX_UPLOAD_SIZE", 100 * 1024 * 1024))  # bytes
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", 1024 * 1024))  # bytes
+# files of a bulk upload are hashed and saved by up to BULK_UPLOAD_CONCURRENCY threads
+BULK_UPLOAD_CONCURRENCY = int(os.environ.get("BULK_UPLOAD_CONCURRENCY", 8))
+
 AWS_ID = os.environ.get("aws_access_key_id", None)
 AWS_SECRET = os.environ.get("aws_secret_access_key", None)
 AWS_REGION = os.environ.get("aws_region", None)
+# e.g. address of MinIO or another S3 compatible storage
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL", None)
+
+# transfers of the files over S3_MULTIPART_THRESHOLD are split into parts
+#   of S3_MULTIPART_CHUNKSIZE, up to S3_MAX_CONCURRENCY parts are sent at once
+# https://boto3.amazonaws.com/v1/documentation/api/latest/reference/customizations/s3.html
+S3_MULTIPART_THRESHOLD = int(
+    os.environ.get("S3_MULTIPART_THRESHOLD", 8 * 1024 * 1024)
+)  # bytes
+S3_MULTIPART_CHUNKSIZE = int(
+    os.environ.get("S3_MULTIPART_CHUNKSIZE", 8 * 1024 * 1024)
+)  # bytes, at least 5 MiB
+S3_MAX_CONCURRENCY = int(os.environ.get("S3_MAX_CONCURRENCY", 10))
+# shared by all of the transfers of the worker, so keep it over S3_MAX_CONCURRENCY
+S3_MAX_POOL_CONNECTIONS = int(os.environ.get("S3_MAX_POOL_CONNECTIONS", 50))
+
+# with RUN_CLOUD downloads are redirected to presigned URLs of the storage,
+#   so the files are not passed through the API
+DOWNLOAD_REDIRECT = bool(os.environ.get("DOWNLOAD_REDIRECT", False))
+PRESIGNED_URL_EXPIRES = int(os.environ.get("PRESIGNED_URL_EXPIRES", 300))  # seconds
 
 if RUN_CLOUD:
     FILE_FOLDER = os.environ["S3_BUCKET"]
@@ -70,6 +159,19 @@ elif RUN_CONTAINER:
     DOCUMENT_FOLDER = os.path.join(FILE_FOLDER, "documents")
     LOGO_FOLDER = os.path.join(FILE_FOLDER, "logos")
 
+# downloads from S3 are kept on local disk, least recently used files over the size
+#   limit are removed
+DOWNLOAD_CACHE_FOLDER = os.environ.get(
+    "DOWNLOAD_CACHE_FOLDER", os.path.join(TMP_FOLDER, "download-cache")
+)
+DOWNLOAD_CACHE_SIZE = int(os.environ.get("DOWNLOAD_CACHE_SIZE", 1024**3))  # bytes
+
+# files are deleted after the response in batches, see src.services.deletion
+DELETION_BATCH_SIZE = int(os.environ.get("DELETION_BATCH_SIZE", 1000))
+# files without documents or projects are removed every RECONCILE_INTERVAL seconds
+#   (0 to disable), unless modified in the last RECONCILE_GRACE seconds
+RECONCILE_INTERVAL = float(os.environ.get("RECONCILE_INTERVAL", 3600))
+RECONCILE_GRACE = float(os.environ.get("RECONCILE_GRACE", 3600))
 
 # File processing
 
@@ -88,5 +190,24 @@ ALLOWED_LOGO_MIME_TYPES = [
 
 ALLOWED_LOGO_EXTENCIONS = [".png", ".jpg", ".jpeg"]
 
-# later change all incoming logos to "size x size" square JPG images to save space
+# all incoming logos are changed to "size x size" square JPG images to save space
 LOGO_SIZE = 200
+
+# smaller and larger renditions of the logos, chosen by ?size= and Accept of
+#   the download, see src.services.renditions
+LOGO_SIZES = [
+    int(size) for size in os.environ.get("LOGO_SIZES", "32,64,200,400").split(",")
+]
+LOGO_FORMATS = os.environ.get("LOGO_FORMATS", "webp,jpeg").split(",")
+
+# filter of the final resize, one of PIL.Image.Resampling, e.g. lanczos or bicubic
+IMAGE_RESAMPLE = os.environ.get("IMAGE_RESAMPLE", "lanczos")
+# larger images are rejected before decoding, against decompression bombs
+MAX_IMAGE_PIXELS = int(os.environ.get("MAX_IMAGE_PIXELS", 50_000_000))
+
+# with RUN_LOCAL or RUN_CONTAINER logos are processed by the worker processes,
+#   downloads of a logo being processed wait for it up to the timeout
+LOGO_PROCESS_WORKERS = int(os.environ.get("LOGO_PROCESS_WORKERS", 1))
+LOGO_PROCESSING_TIMEOUT = float(
+    os.environ.get("LOGO_PROCESSING_TIMEOUT", 30)
+)  # seconds
@@ -1,20 +1,167 @@
-from typing import Generator
+import asyncio
+import base64
+import enum
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from datetime import datetime
+from functools import cache
+from itertools import count as counter
+from time import perf_counter
+from typing import Any, AsyncGenerator, Generator, Sequence
 
-from sqlalchemy import Select, create_engine, func, select
-from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy import (
+    Delete,
+    Engine,
+    Insert,
+    Select,
+    create_engine,
+    event,
+    func,
+    literal,
+    select,
+    tuple_,
+)
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import (
+    InstrumentedAttribute,
+    Session,
+    declarative_base,
+    sessionmaker,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from sqlalchemy.sql.util import find_tables
 
-from src.shared.config import SQLALCHEMY_DATABASE_URL
+import src.shared.metrics as metrics
+from src.shared.cache import TTLCache
+from src.shared.config import (
+    COUNT_CACHE_SIZE,
+    COUNT_CACHE_TTL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_POOL_USE_LIFO,
+    SQLALCHEMY_ASYNC_DATABASE_URL,
+    SQLALCHEMY_DATABASE_URL,
+)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+POOL_OPTIONS: dict[str, Any] = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+    "pool_use_lifo": DB_POOL_USE_LIFO,
+}
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool recording the time spent on checkout into the metrics."""
+
+    metrics_label = "sync"
+
+    def connect(self):
+        start = perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            metrics.DB_POOL_CHECKOUT_TIMEOUTS.labels(self.metrics_label).inc()
+            raise
+        finally:
+            metrics.DB_POOL_CHECKOUT_WAIT.labels(self.metrics_label).observe(
+                perf_counter() - start
+            )
+
+
+class TimedAsyncAdaptedQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+def instrument_pool(engine: Engine, label: str) -> None:
+    def pool() -> QueuePool:
+        # resolved on every scrape, because engine.dispose() replaces the pool
+        return engine.pool  # type: ignore
+
+    capacity = DB_POOL_SIZE + max(DB_MAX_OVERFLOW, 0)
+    metrics.DB_POOL_SIZE.labels(label).set_function(lambda: pool().size())
+    metrics.DB_POOL_CHECKED_OUT.labels(label).set_function(lambda: pool().checkedout())
+    metrics.DB_POOL_OVERFLOW.labels(label).set_function(lambda: pool().overflow())
+    metrics.DB_POOL_SATURATION.labels(label).set_function(
+        lambda: pool().checkedout() / capacity
+    )
+
+
+# Statements executed while handling a request, for the access log,
+#   see src.shared.access_log. Sync endpoints run in the threadpool and
+#   the asyncpg driver in greenlets, both with a copy of the request's context,
+#   so they share the same QueryStats object. All of the statements are timed
+#   into metrics.DB_QUERY_DURATION
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0  # seconds
+
+
+query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None:
+        context._query_started = perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    duration = perf_counter() - started
+    label = getattr(conn.engine.pool, "metrics_label", "other")
+    metrics.DB_QUERY_DURATION.labels(label).observe(duration)
+
+    stats = query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += duration
+
+
+# Engines are created on first use, so importing the application does not touch
+#   the database, the pool is filled at startup by warm_up in src.main
+@cache
+def get_engine() -> Engine:
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL, poolclass=TimedQueuePool, **POOL_OPTIONS
+    )
+    instrument_pool(engine, TimedQueuePool.metrics_label)
+    return engine
+
+
+@cache
+def get_sessionmaker() -> sessionmaker[Session]:
+    # instance will be the session
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-# instance will be the session
 
 Base = declarative_base()  # will be used to make models
 
 
 def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()  # a "proxy" of a SQLAlchemy Session
+    db = get_sessionmaker()()  # a "proxy" of a SQLAlchemy Session
     try:
         yield db
     finally:
@@ -22,8 +169,227 @@ def get_db() -> Generator[Session, None, None]:
     # This way we make sure the database session is always closed after the request.
 
 
-def paginate(session: Session, query: Select, limit: int, offset: int) -> dict:
+# asyncpg is only required with DB_ASYNC
+@cache
+def get_async_engine() -> AsyncEngine:
+    async_engine = create_async_engine(
+        SQLALCHEMY_ASYNC_DATABASE_URL,
+        poolclass=TimedAsyncAdaptedQueuePool,
+        **POOL_OPTIONS,
+    )
+    instrument_pool(async_engine.sync_engine, TimedAsyncAdaptedQueuePool.metrics_label)
+    return async_engine
+
+
+@cache
+def get_async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    # objects are not expired on commit, because lazy loading of the expired
+    #   attributes is not possible outside of the greenlet context
+    return async_sessionmaker(
+        bind=get_async_engine(), autoflush=False, expire_on_commit=False
+    )
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+def create_schema() -> None:
+    # without migrations, e.g. for local development, see DB_CREATE_SCHEMA
+    Base.metadata.create_all(bind=get_engine())
+
+
+def fill_pool(engine: Engine, connections: int) -> None:
+    """Opens the connections at once, they are kept by the pool for the requests."""
+    with ThreadPoolExecutor(connections) as executor:
+        futures = [executor.submit(engine.connect) for _ in range(connections)]
+    try:
+        for future in futures:
+            future.result()
+    finally:
+        for future in futures:
+            if future.exception() is None:
+                future.result().close()
+
+
+async def fill_async_pool(engine: AsyncEngine, connections: int) -> None:
+    results = await asyncio.gather(
+        *(engine.connect().start() for _ in range(connections)),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, AsyncConnection):
+            await result.close()
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+async def dispose_engines() -> None:
+    # only the ones already created
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+
+
+class CountStrategy(str, enum.Enum):
+    """How the total number of rows of a listing is computed."""
+
+    exact = "exact"  # SELECT count(*), scans all of the matching rows
+    none = "none"  # no total, clients rely on has_more
+    estimate = (
+        "estimate"  # planner's estimate from EXPLAIN, based on pg_class.reltuples
+    )
+    cached = "cached"  # exact, cached for COUNT_CACHE_TTL until an insert or delete
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler, **kw) -> str:
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kw)}"
+
+
+count_cache = TTLCache(COUNT_CACHE_SIZE, COUNT_CACHE_TTL)
+
+# every insert or delete moves the version of the table forward,
+#   so the cached totals of the queries reading from it are not used anymore.
+#   Versions are local to the worker, see COUNT_CACHE_TTL
+_versions = counter(1)
+_table_versions: dict[str, int] = {}
+
+
+@event.listens_for(Engine, "after_execute")
+def _bump_table_version(conn, clauseelement, *args) -> None:
+    if isinstance(clauseelement, (Insert, Delete)):
+        _table_versions[clauseelement.table.name] = next(_versions)  # type: ignore
+
+
+def _count_cache_key(query: Select) -> tuple:
+    compiled = query.compile()
+    params = tuple(sorted((k, repr(v)) for k, v in compiled.params.items()))
+    versions = tuple(
+        _table_versions.get(table.name, 0)
+        for table in find_tables(query, include_joins=True)
+    )
+    return str(compiled), params, versions
+
+
+def _count_statement(query: Select, strategy: CountStrategy) -> Executable:
+    if strategy is CountStrategy.estimate:
+        return Explain(query)
+    return select(func.count()).select_from(query.order_by(None).subquery())
+
+
+def _count_result(value: Any, strategy: CountStrategy) -> int:
+    if strategy is CountStrategy.estimate:
+        # asyncpg returns json columns as text
+        plan = json.loads(value) if isinstance(value, str) else value
+        return int(plan[0]["Plan"]["Plan Rows"])
+    return int(value)
+
+
+def count_total(session: Session, query: Select, strategy: CountStrategy) -> int | None:
+    if strategy is CountStrategy.none:
+        return None
+
+    key = _count_cache_key(query) if strategy is CountStrategy.cached else None
+    if key is not None and (total := count_cache.get(key)) is not None:
+        return total  # type: ignore
+
+    total = _count_result(session.scalar(_count_statement(query, strategy)), strategy)
+    if key is not None:
+        count_cache.set(key, total)
+    return total
+
+
+async def count_total_async(
+    session: AsyncSession, query: Select, strategy: CountStrategy
+) -> int | None:
+    if strategy is CountStrategy.none:
+        return None
+
+    key = _count_cache_key(query) if strategy is CountStrategy.cached else None
+    if key is not None and (total := count_cache.get(key)) is not None:
+        return total  # type: ignore
+
+    value = await session.scalar(_count_statement(query, strategy))
+    total = _count_result(value, strategy)
+    if key is not None:
+        count_cache.set(key, total)
+    return total
+
+
+# Keyset (cursor) pagination on (created_at, id), so every page is an index range
+#   scan instead of skipping all of the previous rows with OFFSET
+# https://use-the-index-luke.com/no-offset
+
+
+def encode_cursor(created_at: datetime, id: int | str) -> str:
+    raw = json.dumps([created_at.isoformat(), id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(
+    cursor: str, id_type: type[int] | type[str]
+) -> tuple[datetime, int | str]:
+    """Raises ValueError if the cursor was not produced by encode_cursor.
+
+    The id must be of id_type, otherwise the query would fail in the database.
+    """
+    try:
+        created_at, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        # bool is a subclass of int, but not a valid id
+        if not isinstance(id, id_type) or isinstance(id, bool):
+            raise TypeError(f"Expected id of type {id_type.__name__}")
+        return datetime.fromisoformat(created_at), id
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor '{cursor}'") from e
+
+
+def keyset_query(
+    query: Select,
+    created_at: InstrumentedAttribute,
+    id: InstrumentedAttribute,
+    limit: int,
+    cursor: str | None = None,
+) -> Select:
+    if cursor:
+        last_created_at, last_id = decode_cursor(cursor, id.type.python_type)
+        query = query.where(
+            tuple_(created_at, id) > tuple_(literal(last_created_at), literal(last_id))
+        )
+    # one more row is fetched to know whether the next page exists
+    return query.order_by(created_at, id).limit(limit + 1)
+
+
+def keyset_page(
+    rows: Sequence[Any],
+    created_at: InstrumentedAttribute,
+    id: InstrumentedAttribute,
+    limit: int,
+    total: int | None = None,
+) -> dict:
+    items = list(rows[:limit])
+    next_cursor = None
+    if len(rows) > limit and items:
+        last = items[-1]
+        if isinstance(last, Row):  # e.g. the project with the role of the user
+            last = last[0]
+        next_cursor = encode_cursor(
+            getattr(last, created_at.key), getattr(last, id.key)
+        )
     return {
-        "count": session.scalar(select(func.count()).select_from(query.subquery())),
-        "items": list(session.scalars(query.limit(limit).offset(offset))),
+        "count": len(items),
+        "items": items,
+        "next_cursor": next_cursor,
+        "has_more": len(rows) > limit,
+        "total": total,
     }
@@ -12,9 +12,32 @@ class BaseTimestamp(BaseModel):
 
 M = TypeVar("M")
 
+CURSOR_DESCRIPTION = "Switches to cursor pagination, pass 'next_cursor' of the \
+previous page or an empty value for the first page. 'offset' is ignored."
+
+COUNT_DESCRIPTION = "How 'total' of a cursor page is computed: 'exact', 'estimate' \
+from the query planner, 'cached' exact value refreshed after a while, or 'none' \
+to skip it."
+
+
+class DownloadURL(BaseModel):
+    url: str = Field(description="Presigned URL of the file in the storage")
+    expires_in: int = Field(description="Number of seconds the URL is valid for")
+
 
 class PaginatedResponse(GenericModel, Generic[M]):
     count: int = Field(description="Number of items returned in the response")
     items: List[M] = Field(
         description="List of items returned in the response following given criteria"
     )
+    next_cursor: str | None = Field(
+        default=None,
+        description="Opaque cursor of the next page, None if it is the last page",
+    )
+    has_more: bool | None = Field(
+        default=None, description="Whether there are more items after this page"
+    )
+    total: int | None = Field(
+        default=None,
+        description="Total number of items following given criteria, None if skipped",
+    )
@@ -1,12 +1,81 @@
+import atexit
+import json
 import logging
+from datetime import datetime, timezone
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+from queue import Full, Queue
 
 from asgi_correlation_id import CorrelationIdFilter
 
+import src.shared.metrics as metrics
+from src.shared.config import LOG_FORMAT, LOG_LEVEL, LOG_QUEUE_SIZE
+
 log = logging.getLogger("app")
 
+LOGGERS = {
+    # project
+    "app": {"handlers": ["console"], "level": LOG_LEVEL, "propagate": True},
+    # third-party packages
+    "httpx": {"handlers": ["console"], "level": "INFO"},
+    "databases": {"handlers": ["console"], "level": "WARNING"},
+    "asgi_correlation_id": {"handlers": ["console"], "level": "WARNING"},
+}
+
+
+# attributes of every record, the other ones were passed with extra=
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {
+    "message",
+    "asctime",
+    "correlation_id",
+}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, with the fields passed with extra=.
+
+    e.g. the access log of src.shared.access_log, for aggregation by the fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "correlation_id": getattr(record, "correlation_id", None),
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queues the records for a QueueListener, drops them once the queue is full.
+
+    Logging does not block the requests when the output can not keep up.
+    """
+
+    def __init__(self, maxsize: int):
+        super().__init__(Queue(maxsize))
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            metrics.LOG_RECORDS_DROPPED.inc()
+
+
+_listener: QueueListener | None = None
+
 
 def configure_logging() -> None:
+    stop_logging()
     dictConfig(
         {
             "version": 1,
@@ -21,21 +90,50 @@ def configure_logging() -> None:
                     "format": "%(levelname)s: %(asctime)s \
 %(name)s:%(lineno)d [%(correlation_id)s] %(message)s",
                 },
+                "json": {"()": JSONFormatter},
             },
             "handlers": {
                 "console": {
                     "class": "logging.StreamHandler",
                     "filters": ["correlation_id"],
-                    "formatter": "console",
+                    "formatter": LOG_FORMAT,
                 },
             },
-            "loggers": {
-                # project
-                "app": {"handlers": ["console"], "level": "DEBUG", "propagate": True},
-                # third-party packages
-                "httpx": {"handlers": ["console"], "level": "INFO"},
-                "databases": {"handlers": ["console"], "level": "WARNING"},
-                "asgi_correlation_id": {"handlers": ["console"], "level": "WARNING"},
-            },
+            "loggers": LOGGERS,
         }
     )
+    if LOG_QUEUE_SIZE > 0:
+        _start_listener()
+
+
+def _start_listener() -> None:
+    # records are written to the console by the thread of the listener
+    global _listener
+    loggers = [logging.getLogger(name) for name in LOGGERS]
+    handlers = list(dict.fromkeys(h for logger in loggers for h in logger.handlers))
+
+    queue_handler = DroppingQueueHandler(LOG_QUEUE_SIZE)
+    for handler in handlers:
+        # filters read the context of the request, e.g. the correlation ID,
+        #   so they are applied before the record is queued
+        for log_filter in handler.filters:
+            queue_handler.addFilter(log_filter)
+        handler.filters.clear()
+    for logger in loggers:
+        logger.handlers = [queue_handler]
+
+    _listener = QueueListener(
+        queue_handler.queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Writes the queued records and stops the listener."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
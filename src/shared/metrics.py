@@ -0,0 +1,84 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Metrics are collected into the default prometheus_client registry
+#   and exposed by the /metrics endpoint
+
+# Requests, labeled by the route template, see src.shared.access_log
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle the request, until the whole response is sent",
+    ["method", "route", "status"],
+)
+
+# Logging, see src.shared.logs
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped",
+    "Number of log records dropped because the queue was full",
+)
+
+# Password hashing pool of src.auth.utils
+
+PASSWORD_POOL_REJECTIONS = Counter(
+    "password_pool_rejections",
+    "Number of password hashing tasks rejected because the queue was full",
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent by bcrypt, without waiting in the queue",
+    ["operation"],  # "verify" or "hash"
+)
+
+# Database connection pool, labeled by engine: "sync" or "async"
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool, including new connections",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts",
+    "Number of checkouts which failed after waiting for DB_POOL_TIMEOUT",
+    ["engine"],
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size", "Number of persistent connections in the pool", ["engine"]
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Number of connections currently in use", ["engine"]
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Number of overflow connections, negative while the pool is not filled",
+    ["engine"],
+)
+DB_POOL_SATURATION = Gauge(
+    "db_pool_saturation",
+    "Connections in use relative to pool size with maximum overflow",
+    ["engine"],
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Time to execute a SQL statement, without fetching the rows",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+
+# File services, labeled by backend: "local" or "aws"
+
+FILE_OPERATION_DURATION = Histogram(
+    "file_operation_duration_seconds",
+    "Time of the operations of the file services, e.g. save_file",
+    ["backend", "operation"],
+)
+FILE_OPERATION_BYTES = Counter(
+    "file_operation_bytes",
+    "Size of the files saved and downloaded by the file services",
+    ["backend", "operation"],
+)
+LOGO_PROCESSING_PENDING = Gauge(
+    "logo_processing_pending",
+    "Number of logos waiting for or being processed by the local workers",
+)
@@ -0,0 +1,31 @@
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import src.user.dto as user_dto
+import src.user.models as user_models
+
+
+async def get_user(db: AsyncSession, user_id: int) -> user_models.User | None:
+    return await db.get(user_models.User, user_id)
+
+
+async def get_user_by_login(db: AsyncSession, login: str) -> user_models.User | None:
+    return await db.scalar(  # type: ignore
+        select(user_models.User).where(user_models.User.login == login)
+    )
+
+
+async def create_user(
+    db: AsyncSession, user: user_dto.UserDB
+) -> user_models.User | None:
+    db_user = user_models.User(login=user.login, hashed_password=user.hashed_password)
+    db.add(db_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return None
+
+    await db.refresh(db_user)
+    return db_user
@@ -0,0 +1,49 @@
+from typing import Annotated
+
+from fastapi import Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import src.user.async_dao as user_async_dao
+import src.user.identity_cache as identity_cache
+import src.user.models as user_models
+from src.auth.utils import oauth2_scheme
+from src.shared.database import get_async_db
+from src.shared.logs import log
+
+
+async def get_user_by_login(
+    login: str, db: AsyncSession = Depends(get_async_db)
+) -> user_models.User:
+    db_user = await user_async_dao.get_user_by_login(db, login)
+    if not db_user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+    return db_user
+
+
+async def get_current_user(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    db: AsyncSession = Depends(get_async_db),
+) -> user_models.User:
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    log.debug("Trying to process a token")
+    user_id = identity_cache.verified_user_id(token)
+    if user_id is None:
+        raise credentials_exception
+
+    cached_user = identity_cache.get_user(user_id)
+    if cached_user is not None:
+        return await db.merge(cached_user, load=False)
+
+    user = await user_async_dao.get_user(db, user_id)
+    if user is None:
+        raise credentials_exception
+
+    identity_cache.set_user(user)
+    return user
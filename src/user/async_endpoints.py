@@ -0,0 +1,74 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import src.auth.async_dao as auth_async_dao
+import src.auth.dto as auth_dto
+import src.auth.utils as auth_utils
+import src.user.async_dao as user_async_dao
+import src.user.dto as user_dto
+from src.shared.database import get_async_db
+
+# Same routes as src.user.endpoints, used when the application runs with DB_ASYNC
+
+router = APIRouter(
+    tags=["users"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.post("/login_form")
+async def login_for_access_token_form(
+    sign_in: Annotated[OAuth2PasswordRequestForm, Depends()],
+    db: AsyncSession = Depends(get_async_db),
+) -> auth_dto.Token:
+    user = await auth_async_dao.authenticate_user(
+        db, sign_in.username, sign_in.password
+    )
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return auth_utils.login_user(user)
+
+
+@router.post("/login")
+async def login_for_access_token(
+    sign_in: user_dto.UserCreate,
+    db: AsyncSession = Depends(get_async_db),
+) -> auth_dto.Token:
+    user = await auth_async_dao.authenticate_user(db, sign_in.login, sign_in.password)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return auth_utils.login_user(user)
+
+
+@router.post("/auth", response_model=user_dto.User, status_code=status.HTTP_201_CREATED)
+async def create_user(
+    user: user_dto.UserCreate, db: AsyncSession = Depends(get_async_db)
+) -> user_dto.User:
+    db_user = await user_async_dao.create_user(
+        db,
+        user_dto.UserDB(
+            login=user.login,
+            hashed_password=await auth_utils.get_password_hash_async(user.password),
+        ),
+    )
+
+    if not db_user:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return db_user
@@ -1,14 +1,12 @@
 from typing import Annotated
 
 from fastapi import Depends, HTTPException, status
-from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
-import src.auth.dto as auth_dto
 import src.user.dao as user_dao
+import src.user.identity_cache as identity_cache
 import src.user.models as user_models
 from src.auth.utils import oauth2_scheme
-from src.shared.config import ALGORITHM, SECRET_KEY
 from src.shared.database import get_db
 from src.shared.logs import log
 
@@ -31,25 +29,18 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        log.debug("Trying to process a token")
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        log.debug(f"Received payload '{payload}' from the token")
-
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
+    log.debug("Trying to process a token")
+    user_id = identity_cache.verified_user_id(token)
+    if user_id is None:
+        raise credentials_exception
 
-        token_data = auth_dto.TokenData(user_id=user_id)
-    except JWTError:  # default error handling for checking the JWT
-        raise credentials_exception from None
-        # B904 raise exceptions with `raise ... from None`
-        # to distinguish them from errors in exception handlin
+    cached_user = identity_cache.get_user(user_id)
+    if cached_user is not None:
+        return db.merge(cached_user, load=False)
 
-    user = user_dao.get_user(
-        db, int(token_data.user_id)
-    )  # because bcrypt requires string subject
+    user = user_dao.get_user(db, user_id)
     if user is None:
         raise credentials_exception
 
+    identity_cache.set_user(user)
     return user
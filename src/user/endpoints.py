@@ -18,7 +18,7 @@ router = APIRouter(
 
 
 @router.post("/login_form")
-async def login_for_access_token_form(
+def login_for_access_token_form(
     sign_in: Annotated[OAuth2PasswordRequestForm, Depends()],
     db: Session = Depends(get_db),
 ) -> auth_dto.Token:
@@ -34,7 +34,7 @@ async def login_for_access_token_form(
 
 
 @router.post("/login")
-async def login_for_access_token(
+def login_for_access_token(
     sign_in: user_dto.UserCreate,
     db: Session = Depends(get_db),
 ) -> auth_dto.Token:
@@ -50,7 +50,7 @@ async def login_for_access_token(
 
 
 @router.post("/auth", response_model=user_dto.User, status_code=status.HTTP_201_CREATED)
-async def create_user(
+def create_user(
     user: user_dto.UserCreate, db: Session = Depends(get_db)
 ) -> user_dto.User:
     db_user = user_dao.create_user(
@@ -0,0 +1,83 @@
+import hashlib
+from time import time
+
+from jose import JWTError, jwt
+from pydantic import ValidationError
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+import src.auth.dto as auth_dto
+import src.user.models as user_models
+from src.shared.cache import TTLCache
+from src.shared.config import (
+    ALGORITHM,
+    SECRET_KEY,
+    TOKEN_CACHE_SIZE,
+    USER_CACHE_SIZE,
+    USER_CACHE_TTL,
+)
+from src.shared.logs import log
+
+# Authentication of the repeated requests without verifying the signature of the
+#   token and without loading the user from the database.
+# Entries are kept in the memory of the worker, other workers see changes
+#   of the users after USER_CACHE_TTL.
+
+# a token stays valid after the user changes, like without the cache, deleted
+#   users are rejected by get_current_user when the user is not found
+tokens = TTLCache(TOKEN_CACHE_SIZE, ttl=0)  # every entry has TTL of its token
+users = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+
+def _digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def verified_user_id(token: str) -> int | None:
+    """ID of the user from a valid token, None if the token is not valid."""
+    key = _digest(token)
+    cached = tokens.get(key)
+    if cached is not None:
+        return cached  # type: ignore
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        log.debug("Received payload '%s' from the token", payload)
+        token_data = auth_dto.TokenData(user_id=payload.get("sub"))
+        user_id = int(token_data.user_id)  # subject of JWT is a string
+    except (JWTError, ValidationError, ValueError):
+        return None
+
+    tokens.set(key, user_id, ttl=payload.get("exp", 0) - time())
+    return user_id
+
+
+def get_user(user_id: int) -> user_models.User | None:
+    """Detached copy of the cached user, merge it into the session before use."""
+    snapshot = users.get(user_id)
+    if snapshot is None:
+        return None
+    user = user_models.User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+
+def set_user(user: user_models.User) -> None:
+    columns = inspect(user_models.User).column_attrs
+    users.set(user.id, {c.key: getattr(user, c.key) for c in columns})
+
+
+def invalidate_user(user_id: int) -> None:
+    """Call after the user is deleted or the credentials change."""
+    users.delete(user_id)
+
+
+def clear() -> None:
+    tokens.clear()
+    users.clear()
+
+
+@event.listens_for(user_models.User, "after_update")
+@event.listens_for(user_models.User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target: user_models.User) -> None:
+    invalidate_user(target.id)
@@ -1,11 +1,12 @@
 import os
+from contextlib import contextmanager
 from io import BytesIO
-from typing import Callable, Generator
+from typing import Callable, ContextManager, Generator
 
 import pytest
 from fastapi import UploadFile
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy import text as sa_text
 from sqlalchemy.orm import Session, sessionmaker
 
@@ -17,19 +18,24 @@ import src.logo.dao as logo_dao
 import src.project.dao as project_dao
 import src.project.dto as project_dto
 import src.project.models as project_models
+import src.project.permission_cache as permission_cache
 import src.services.file_service as file_service
 import src.user.dao as user_dao
 import src.user.dto as user_dto
+import src.user.identity_cache as identity_cache
 import src.user.models as user_models
 from src.main import app
 from src.shared.config import SQLALCHEMY_DATABASE_URL
-from src.shared.database import get_db
+from src.shared.database import Base, count_cache, get_db
 from src.shared.logs import log
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 TestSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # instance will be the session
 
+# the application does not create the tables on import or startup, see DB_CREATE_SCHEMA
+Base.metadata.create_all(bind=engine)
+
 # https://fastapi.tiangolo.com/advanced/testing-dependencies/
 # https://testdriven.io/blog/fastapi-crud/
 
@@ -68,11 +74,32 @@ def db() -> Generator[Session, None, None]:
         session.close()
 
 
+@contextmanager
+def record_queries() -> Generator[list[str], None, None]:
+    statements: list[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture(scope="function")
+def count_queries() -> Callable[[], ContextManager[list[str]]]:
+    """Records SQL statements executed through the test engine."""
+    return record_queries
+
+
 table_names = [
     "users",
     "projects",
     "documents",
     "permissions",
+    "blobs",
 ]
 
 
@@ -81,6 +108,9 @@ def truncate_table(db: Session) -> None:
     for table_name in table_names:
         db.execute(sa_text(f"""TRUNCATE TABLE {table_name} CASCADE"""))
     db.commit()
+    count_cache.clear()  # TRUNCATE does not invalidate the cached totals
+    permission_cache.clear()
+    identity_cache.clear()
 
 
 # Authentication configuration
@@ -294,7 +324,8 @@ def document_data(
     document_name = "some Data 123.pdf"
 
     db_document = document_dao.create_document(db, project_data, document_name)
-    file_service.documents.save_file(document, db_document.id)
+    content_hash = file_service.documents.save_file(document, db_document.id)
+    document_dao.update_document(db, db_document, document_name, content_hash)
 
     yield db_document
 
@@ -0,0 +1,91 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import src.document.async_dao as document_async_dao
+import src.project.async_dao as project_async_dao
+import src.project.dto as project_dto
+import src.project.models
+import src.user.async_dao as user_async_dao
+import src.user.dto as user_dto
+import src.user.models
+from src.shared.config import SQLALCHEMY_ASYNC_DATABASE_URL
+
+# every test runs in its own event loop, so connections are not pooled between them
+engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL, poolclass=NullPool)
+AsyncTestSession = async_sessionmaker(
+    bind=engine, autoflush=False, expire_on_commit=False
+)
+
+
+def test_async_accessible_projects(
+    main_user: src.user.models.User,
+    project_data_list: list[src.project.models.Project],
+):
+    async def run():
+        async with AsyncTestSession() as db:
+            user = await user_async_dao.get_user_by_login(db, main_user.login)
+            return await project_async_dao.get_accessible_projects(db, user.id)
+
+    projects = asyncio.run(run())
+
+    assert [(p.id, role) for p, role in projects] == [
+        (p.id, src.project.models.PermissionType.owner) for p in project_data_list
+    ]
+
+
+def test_async_accessible_projects_page(
+    main_user: src.user.models.User,
+    project_data_list: list[src.project.models.Project],
+):
+    async def run():
+        async with AsyncTestSession() as db:
+            first = await project_async_dao.get_accessible_projects_page(
+                db, main_user.id, 2, ""
+            )
+            second = await project_async_dao.get_accessible_projects_page(
+                db, main_user.id, 2, first["next_cursor"]
+            )
+            return first["items"] + second["items"]
+
+    projects = asyncio.run(run())
+
+    assert [(p.id, role) for p, role in projects] == [
+        (p.id, src.project.models.PermissionType.owner) for p in project_data_list
+    ]
+
+
+def test_async_create_project_and_document(main_user: src.user.models.User):
+    async def run():
+        async with AsyncTestSession() as db:
+            user = await user_async_dao.get_user(db, main_user.id)
+            project = await project_async_dao.create_project(
+                db, project_dto.ProjectCreate(name="Async Project"), user
+            )
+            role = await project_async_dao.get_project_role(db, project.id, user.id)
+            document = await document_async_dao.create_document(
+                db, project, "async.pdf"
+            )
+            documents = await document_async_dao.get_available_documents(db, project.id)
+            return role, document, documents
+
+    role, document, documents = asyncio.run(run())
+
+    assert role.type == src.project.models.PermissionType.owner
+    assert [d.id for d in documents] == [document.id]
+
+
+def test_async_create_user_twice():
+    async def run():
+        async with AsyncTestSession() as db:
+            user = user_dto.UserDB(login="async_user", hashed_password="hash")
+            return (
+                await user_async_dao.create_user(db, user),
+                await user_async_dao.create_user(db, user),
+            )
+
+    created, duplicate = asyncio.run(run())
+
+    assert created is not None
+    assert duplicate is None
@@ -0,0 +1,338 @@
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Generator
+from unittest.mock import patch
+
+import boto3
+import pytest
+import requests
+from boto3.s3.transfer import TransferConfig
+from fastapi.testclient import TestClient
+from moto import mock_aws
+from sqlalchemy.orm import Session
+
+import src.document.models
+import src.logo.dao as logo_dao
+import src.project.models
+import src.services.aws.file_service as aws
+from src.services.aws.download_cache import DownloadCache
+from src.services.renditions import logo_renditions
+from src.services.responses import file_response
+from src.services.utils import FileTooLargeError
+
+BUCKET = "test-bucket"
+
+
+@pytest.fixture(scope="function")
+def aws_documents(tmp_path: Path) -> Generator[aws.AWSFileService, None, None]:
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=BUCKET)
+        yield aws.AWSFileService(
+            "documents", BUCKET, s3=s3, download_cache=DownloadCache(str(tmp_path), 100)
+        )
+
+
+def test_download_url(aws_documents: aws.AWSFileService):
+    aws_documents.save_file(BytesIO(b"Testing Document (1)"), "some-id")
+
+    url = aws_documents.get_download_url("some-id", "some Data 123.pdf")
+    res = requests.get(url)  # type: ignore
+
+    assert res.status_code == 200
+    assert res.content == b"Testing Document (1)"
+    assert res.headers["Content-Disposition"] == (
+        "attachment; filename*=utf-8''some%20Data%20123.pdf"
+    )
+
+
+def test_download_document_redirect(
+    client: TestClient,
+    aws_documents: aws.AWSFileService,
+    document_data: src.document.models.Document,
+    main_user_token_header: dict[str, str],
+):
+    aws_documents.save_file(BytesIO(b"Testing Document (1)"), document_data.id)
+
+    with patch("src.document.endpoints.file_service.documents", aws_documents), patch(
+        "src.document.endpoints.DOWNLOAD_REDIRECT", True
+    ):
+        res = client.get(
+            f"/document/{document_data.id}",
+            headers=main_user_token_header,
+            follow_redirects=False,
+        )
+        url_res = client.get(
+            f"/document/{document_data.id}/url", headers=main_user_token_header
+        )
+
+    assert res.status_code == 307
+    assert requests.get(res.headers["Location"]).content == b"Testing Document (1)"
+    assert url_res.status_code == 200
+    assert url_res.json()["url"].startswith(
+        f"https://{BUCKET}.s3.amazonaws.com/documents/{document_data.id}?"
+    )
+
+
+def test_download_url_not_available_locally(
+    client: TestClient,
+    document_data: src.document.models.Document,
+    main_user_token_header: dict[str, str],
+):
+    res = client.get(
+        f"/document/{document_data.id}/url", headers=main_user_token_header
+    )
+
+    assert res.status_code == 404
+
+
+def test_download_file_cached(aws_documents: aws.AWSFileService):
+    aws_documents.save_file(BytesIO(b"Testing Document (1)"), "some-id")
+
+    with patch.object(
+        aws_documents.s3, "get_object", wraps=aws_documents.s3.get_object
+    ) as get_object:
+        paths = [aws_documents.download_file("some-id") for _ in range(3)]
+
+    assert get_object.call_count == 1
+    assert Path(paths[0]).read_bytes() == b"Testing Document (1)"
+    assert len(set(paths)) == 1
+
+
+def test_download_file_changed(aws_documents: aws.AWSFileService):
+    aws_documents.save_file(BytesIO(b"Testing Document (1)"), "some-id")
+    first = aws_documents.download_file("some-id")
+    aws_documents.save_file(BytesIO(b"Testing Document (2)"), "some-id")
+    second = aws_documents.download_file("some-id")
+
+    assert first != second
+    assert Path(second).read_bytes() == b"Testing Document (2)"
+
+
+def test_download_file_concurrent_misses(aws_documents: aws.AWSFileService):
+    aws_documents.save_file(BytesIO(b"Testing Document (1)"), "some-id")
+
+    with patch.object(
+        aws_documents.s3, "get_object", wraps=aws_documents.s3.get_object
+    ) as get_object, ThreadPoolExecutor(8) as pool:
+        paths = set(pool.map(aws_documents.download_file, ["some-id"] * 8))
+
+    assert get_object.call_count == 1
+    assert len(paths) == 1
+
+
+def test_download_file_changed_while_downloaded(aws_documents: aws.AWSFileService):
+    aws_documents.save_file(BytesIO(b"Testing Document (1)"), "some-id")
+    get_object = aws_documents.s3.get_object
+    calls: list[dict] = []
+
+    def changing_get_object(**kwargs):
+        if not calls:  # after the HEAD of the first version
+            aws_documents.save_file(BytesIO(b"Testing Document (2)"), "some-id")
+        calls.append(kwargs)
+        return get_object(**kwargs)
+
+    with patch.object(aws_documents.s3, "get_object", changing_get_object):
+        path = aws_documents.download_file("some-id")
+
+    assert len(calls) == 2  # the first one failed with 412 Precondition Failed
+    assert Path(path).read_bytes() == b"Testing Document (2)"
+    assert [p.name for p in Path(aws_documents.download_cache.folder).iterdir()] == [
+        Path(path).name
+    ]
+
+
+def test_download_file_deleted_while_downloaded(aws_documents: aws.AWSFileService):
+    aws_documents.save_file(BytesIO(b"Testing Document (1)"), "some-id")
+    get_object = aws_documents.s3.get_object
+
+    def deleting_get_object(**kwargs):
+        aws_documents.delete_files(["some-id"])
+        return get_object(**kwargs)
+
+    with patch.object(aws_documents.s3, "get_object", deleting_get_object):
+        with pytest.raises(FileNotFoundError):
+            aws_documents.download_file("some-id")
+    assert list(Path(aws_documents.download_cache.folder).iterdir()) == []
+
+
+def test_download_cache_evicts_least_recently_used(
+    aws_documents: aws.AWSFileService,
+):
+    # cache of the fixture holds up to 100 bytes
+    for i in range(3):
+        aws_documents.save_file(BytesIO(bytes([i]) * 40), f"id-{i}")
+
+    def download(id: str) -> str:
+        path = aws_documents.download_file(id)
+        aws_documents.release_file(path)
+        return path
+
+    first = download("id-0")
+    second = download("id-1")
+    download("id-0")
+    download("id-2")
+
+    assert Path(first).exists()
+    assert not Path(second).exists()
+
+
+def test_download_cache_keeps_files_being_served(
+    aws_documents: aws.AWSFileService,
+):
+    for i in range(4):
+        aws_documents.save_file(BytesIO(bytes([i]) * 40), f"id-{i}")
+
+    served = aws_documents.download_file("id-0")  # not released yet
+    for id in ("id-1", "id-2"):
+        aws_documents.release_file(aws_documents.download_file(id))
+    assert Path(served).read_bytes() == bytes([0]) * 40
+
+    aws_documents.release_file(served)
+    aws_documents.release_file(aws_documents.download_file("id-3"))
+    assert not Path(served).exists()
+
+
+def test_download_document_evicted_while_served(
+    client: TestClient,
+    aws_documents: aws.AWSFileService,
+    document_data: src.document.models.Document,
+    main_user_token_header: dict[str, str],
+):
+    aws_documents.save_file(BytesIO(b"A" * 40), document_data.id)
+    for i in range(3):
+        aws_documents.save_file(BytesIO(bytes([i]) * 40), f"id-{i}")
+
+    def evicting_file_response(request, path, *args):
+        # other requests fill the cache after the file was downloaded
+        for i in range(3):
+            aws_documents.release_file(aws_documents.download_file(f"id-{i}"))
+        return file_response(request, path, *args)
+
+    with patch("src.document.endpoints.file_service.documents", aws_documents), patch(
+        "src.document.endpoints.file_response", evicting_file_response
+    ):
+        res = client.get(
+            f"/document/{document_data.id}", headers=main_user_token_header
+        )
+        ranged = client.get(
+            f"/document/{document_data.id}",
+            headers={**main_user_token_header, "Range": "bytes=10-19"},
+        )
+
+    assert res.status_code == 200
+    assert res.content == b"A" * 40
+    assert ranged.status_code == 206
+    assert ranged.content == b"A" * 10
+    # released once the responses were sent
+    assert aws_documents.download_cache._pins == {}
+
+
+async def _chunks(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+def test_save_stream_multipart(aws_documents: aws.AWSFileService):
+    # smallest part size allowed by S3, so the content is sent in 3 parts
+    aws_documents.transfer_config = TransferConfig(
+        multipart_chunksize=5 * 1024 * 1024, max_concurrency=2
+    )
+    data = bytes(range(256)) * 44_000
+
+    with patch.object(
+        aws_documents.s3, "upload_part", wraps=aws_documents.s3.upload_part
+    ) as upload_part:
+        content_hash = asyncio.run(
+            aws_documents.save_stream(_chunks(data, 64 * 1024), "some-id")
+        )
+
+    assert upload_part.call_count == 3
+    assert content_hash == hashlib.sha256(data).hexdigest()
+    assert Path(aws_documents.download_file("some-id")).read_bytes() == data
+
+
+def test_save_stream_too_large_aborted(aws_documents: aws.AWSFileService):
+    aws_documents.transfer_config = TransferConfig(multipart_chunksize=5 * 1024 * 1024)
+    data = b"0" * 11 * 1024 * 1024
+
+    with patch("src.services.utils.MAX_UPLOAD_SIZE", 6 * 1024 * 1024), pytest.raises(
+        FileTooLargeError
+    ):
+        asyncio.run(aws_documents.save_stream(_chunks(data, 1024 * 1024), "some-id"))
+
+    uploads = aws_documents.s3.list_multipart_uploads(Bucket=BUCKET)
+    assert uploads.get("Uploads", []) == []
+
+
+def test_move_file(aws_documents: aws.AWSFileService):
+    aws_documents.save_file(BytesIO(b"Testing Document (1)"), "upload-id")
+
+    aws_documents.move_file("upload-id", "content-hash")
+
+    keys = aws_documents.s3.list_objects_v2(Bucket=BUCKET)["Contents"]
+    assert [key["Key"] for key in keys] == ["documents/content-hash"]
+    path = aws_documents.download_file("content-hash")
+    assert Path(path).read_bytes() == b"Testing Document (1)"
+
+
+def test_list_and_delete_files(aws_documents: aws.AWSFileService):
+    for i in range(3):
+        aws_documents.save_file(BytesIO(b"Testing Document (1)"), f"id-{i}")
+    # hidden, e.g. a streamed upload in progress
+    aws_documents.save_file(BytesIO(b"Testing Document (1)"), ".upload-id")
+
+    assert sorted(id for id, _ in aws_documents.list_files()) == [
+        "id-0",
+        "id-1",
+        "id-2",
+    ]
+
+    aws_documents.delete_files(["id-0", "id-2", "missing-id"])
+
+    assert [id for id, _ in aws_documents.list_files()] == ["id-1"]
+
+
+def test_download_file_missing(aws_documents: aws.AWSFileService):
+    with pytest.raises(FileNotFoundError):
+        aws_documents.download_file("missing-id")
+    assert not aws_documents.has_file("missing-id")
+
+
+def test_download_logo_without_renditions(
+    client: TestClient,
+    tmp_path: Path,
+    db: Session,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+):
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=BUCKET)
+        logos = aws.AWSFileService(
+            "logos",
+            BUCKET,
+            "logos-processed",
+            s3=s3,
+            download_cache=DownloadCache(str(tmp_path), 100),
+            renditions=logo_renditions,
+        )
+        # processed before the renditions were added, stored only as "<id>"
+        logo_id = logo_dao.create_logo(db, project_data)
+        s3.put_object(Bucket=BUCKET, Key=f"logos-processed/{logo_id}", Body=b"Logo")
+
+        url = f"/project/{project_data.id}/logo"
+        headers = {**main_user_token_header, "Accept": "image/webp,*/*"}
+        with patch("src.logo.endpoints.file_service.logos", logos):
+            res = client.get(url, params={"size": 20}, headers=headers)
+            with patch("src.logo.endpoints.DOWNLOAD_REDIRECT", True):
+                redirect = client.get(url, headers=headers, follow_redirects=False)
+
+        assert res.status_code == 200
+        assert res.content == b"Logo"
+        assert res.headers["content-type"] == "image/jpeg"
+        assert redirect.status_code == 307
+        assert requests.get(redirect.headers["Location"]).content == b"Logo"
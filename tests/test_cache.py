@@ -0,0 +1,36 @@
+from unittest.mock import patch
+
+from src.shared.cache import TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=10, ttl=60)
+    with patch("src.shared.cache.monotonic", return_value=0):
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=120)
+    with patch("src.shared.cache.monotonic", return_value=90):
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+
+
+def test_ttl_cache_delete_prefix():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("perm:1:1", "OWNER")
+    cache.set("perm:1:2", "PARTICIPANT")
+    cache.set("perm:11:1", "OWNER")
+    cache.delete_prefix("perm:1:")
+
+    assert len(cache) == 1
+    assert cache.get("perm:11:1") == "OWNER"
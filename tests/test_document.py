@@ -1,9 +1,18 @@
+import hashlib
+import os
+from unittest.mock import patch
+
+import pytest
 from fastapi import UploadFile
 from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
 
+import src.document.dao as document_dao
 import src.document.models
 import src.project.models
 import src.user.models
+from src.services import file_service
+from src.services.deletion import deletions
 
 
 def test_read_documents_authorized(
@@ -25,6 +34,84 @@ def test_read_documents_authorized(
         ]
 
 
+def test_read_documents_cursor_pagination(
+    client: TestClient,
+    db: Session,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+):
+    documents = [
+        document_dao.create_document(db, project_data, f"document {i}.pdf")
+        for i in range(5)
+    ]
+
+    received, cursor = [], ""
+    while cursor is not None:
+        res = client.get(
+            f"/project/{project_data.id}/documents",
+            headers=main_user_token_header,
+            params={"cursor": cursor, "limit": 2},
+        )
+        assert res.status_code == 200
+        assert res.json()["count"] <= 2
+        received += res.json()["items"]
+        cursor = res.json()["next_cursor"]
+
+    assert [d["id"] for d in received] == [d.id for d in documents]
+
+
+def test_read_documents_offset_pagination(
+    client: TestClient,
+    db: Session,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+):
+    documents = [
+        document_dao.create_document(db, project_data, f"document {i}.pdf")
+        for i in range(5)
+    ]
+    # rows are moved on disk, so they are not returned in the order of insertion
+    document_dao.update_document(db, documents[0], "renamed.pdf")
+
+    received = []
+    for offset in range(0, 5, 2):
+        res = client.get(
+            f"/project/{project_data.id}/documents",
+            headers=main_user_token_header,
+            params={"offset": offset, "limit": 2},
+        )
+        received += res.json()
+
+    assert [d["id"] for d in received] == [d.id for d in documents]
+
+
+def test_read_documents_cursor_pagination_total(
+    client: TestClient,
+    db: Session,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+):
+    for i in range(3):
+        document_dao.create_document(db, project_data, f"document {i}.pdf")
+
+    def total(count: str):
+        res = client.get(
+            f"/project/{project_data.id}/documents",
+            headers=main_user_token_header,
+            params={"cursor": "", "limit": 1, "count": count},
+        )
+        assert res.status_code == 200
+        return res.json()["total"]
+
+    assert total("none") is None
+    assert total("exact") == 3
+    assert total("cached") == 3
+    assert total("estimate") >= 0
+
+    document_dao.create_document(db, project_data, "document 3.pdf")
+    assert total("cached") == 4  # inserts invalidate the cached total
+
+
 def test_read_documents_unauthorized(
     client: TestClient,
     document_data: src.document.models.Document,
@@ -224,6 +311,76 @@ def test_get_document_authorized(
         assert res.status_code == 200
 
 
+def test_get_document_not_modified(
+    client: TestClient,
+    document_data: src.document.models.Document,
+    main_user_token_header: dict[str, str],
+):
+    url = f"/document/{document_data.id}"
+    res = client.get(url, headers=main_user_token_header)
+    etag = res.headers["ETag"]
+    assert etag == f'"{hashlib.sha256(b"Testing Document (1)").hexdigest()}"'
+
+    res = client.get(url, headers={**main_user_token_header, "If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.content == b""
+
+    last_modified = res.headers["Last-Modified"]
+    res = client.get(
+        url, headers={**main_user_token_header, "If-Modified-Since": last_modified}
+    )
+    assert res.status_code == 304
+
+    res = client.get(url, headers={**main_user_token_header, "If-None-Match": '"x"'})
+    assert res.status_code == 200
+
+
+@pytest.mark.parametrize(
+    "range_header, content_range, content",
+    [
+        ("bytes=0-6", "bytes 0-6/20", b"Testing"),
+        ("bytes=17-", "bytes 17-19/20", b"(1)"),
+        ("bytes=-3", "bytes 17-19/20", b"(1)"),
+        ("bytes=8-100", "bytes 8-19/20", b"Document (1)"),
+    ],
+)
+def test_get_document_range(
+    range_header: str,
+    content_range: str,
+    content: bytes,
+    client: TestClient,
+    document_data: src.document.models.Document,
+    main_user_token_header: dict[str, str],
+):
+    res = client.get(
+        f"/document/{document_data.id}",
+        headers={**main_user_token_header, "Range": range_header},
+    )
+
+    assert res.status_code == 206
+    assert res.headers["Content-Range"] == content_range
+    assert res.content == content
+
+
+def test_get_document_range_not_satisfiable(
+    client: TestClient,
+    document_data: src.document.models.Document,
+    main_user_token_header: dict[str, str],
+):
+    url = f"/document/{document_data.id}"
+    res = client.get(url, headers={**main_user_token_header, "Range": "bytes=20-"})
+    assert res.status_code == 416
+    assert res.headers["Content-Range"] == "bytes */20"
+
+    # range of a different version is ignored
+    res = client.get(
+        url,
+        headers={**main_user_token_header, "Range": "bytes=0-6", "If-Range": '"x"'},
+    )
+    assert res.status_code == 200
+    assert res.content == b"Testing Document (1)"
+
+
 def test_delete_document_unauthorized(
     client: TestClient,
     document_data: src.document.models.Document,
@@ -262,3 +419,331 @@ def test_delete_document_owner(
 ):
     res = client.delete(f"/document/{document_data.id}", headers=main_user_token_header)
     assert res.status_code == 204
+
+
+def test_create_document_too_large(
+    client: TestClient,
+    db: Session,
+    good_upload_file: UploadFile,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+):
+    data = {
+        "file": (
+            good_upload_file.filename,
+            good_upload_file.file,
+            good_upload_file.content_type,
+        )
+    }
+
+    with patch("src.services.utils.MAX_UPLOAD_SIZE", 4):
+        res = client.post(
+            f"/project/{project_data.id}/documents",
+            headers=main_user_token_header,
+            files=data,
+        )
+
+    assert res.status_code == 413
+    assert document_dao.get_available_documents(db, project_data.id) == []
+
+
+def test_update_document_too_large_keeps_file(
+    client: TestClient,
+    good_upload_file_2: UploadFile,
+    document_data: src.document.models.Document,
+    main_user_token_header: dict[str, str],
+):
+    data = {
+        "file": (
+            good_upload_file_2.filename,
+            good_upload_file_2.file,
+            good_upload_file_2.content_type,
+        )
+    }
+
+    with patch("src.services.utils.MAX_UPLOAD_SIZE", 4):
+        res = client.put(
+            f"/document/{document_data.id}",
+            headers=main_user_token_header,
+            files=data,
+        )
+    assert res.status_code == 413
+
+    res = client.get(f"/document/{document_data.id}", headers=main_user_token_header)
+    assert res.content == b"Testing Document (1)"
+
+
+def test_stream_document(
+    client: TestClient,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+):
+    res = client.post(
+        f"/project/{project_data.id}/documents/stream",
+        params={"name": "streamed.pdf"},
+        headers={**main_user_token_header, "Content-Type": "application/pdf"},
+        content=b"Streamed Document",
+    )
+    assert res.status_code == 201
+    assert res.json()["name"] == "streamed.pdf"
+
+    res = client.get(f"/document/{res.json()['id']}", headers=main_user_token_header)
+    assert res.content == b"Streamed Document"
+
+
+def test_stream_document_failed(
+    client: TestClient,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+):
+    res = client.post(
+        f"/project/{project_data.id}/documents/stream",
+        headers={**main_user_token_header, "Content-Type": "text/plain"},
+        content=b"Streamed Document",
+    )
+    assert res.status_code == 422
+
+    with patch("src.services.utils.MAX_UPLOAD_SIZE", 4):
+        res = client.post(
+            f"/project/{project_data.id}/documents/stream",
+            headers={**main_user_token_header, "Content-Type": "application/pdf"},
+            content=b"Streamed Document",
+        )
+    assert res.status_code == 413
+
+    with patch.object(file_service.documents, "save_stream") as save_stream:
+        res = client.post(
+            f"/project/{project_data.id}/documents/stream",
+            params={"name": "a" * 201},
+            headers={**main_user_token_header, "Content-Type": "application/pdf"},
+            content=b"Streamed Document",
+        )
+    assert res.status_code == 422
+    assert save_stream.call_count == 0
+
+
+def test_stream_document_without_name(
+    client: TestClient,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+):
+    res = client.post(
+        f"/project/{project_data.id}/documents/stream",
+        headers={**main_user_token_header, "Content-Type": "application/pdf"},
+        content=b"Streamed Document",
+    )
+    assert res.status_code == 201
+    assert res.json()["name"] == res.json()["id"]
+
+
+def test_documents_share_content(
+    client: TestClient,
+    db: Session,
+    project_data_list: list[src.project.models.Project],
+    main_user_token_header: dict[str, str],
+):
+    content = b"Shared Document"
+    content_hash = hashlib.sha256(content).hexdigest()
+    path = file_service.documents.get_file_path(content_hash)
+
+    ids = []
+    for project in project_data_list[:2]:
+        with patch.object(
+            file_service.documents, "save_file", wraps=file_service.documents.save_file
+        ) as save_file:
+            res = client.post(
+                f"/project/{project.id}/documents",
+                headers=main_user_token_header,
+                files={"file": ("shared.pdf", content, "application/pdf")},
+            )
+        assert res.status_code == 201
+        ids.append(res.json()["id"])
+    res = client.post(
+        f"/project/{project_data_list[0].id}/documents/stream",
+        headers={**main_user_token_header, "Content-Type": "application/pdf"},
+        content=content,
+    )
+    ids.append(res.json()["id"])
+
+    assert save_file.call_count == 0  # stored by the first upload only
+    assert db.get(src.document.models.Blob, content_hash).ref_count == 3  # type: ignore
+    for document_id in ids:
+        res = client.get(f"/document/{document_id}", headers=main_user_token_header)
+        assert res.content == content
+
+    for document_id in ids[:2]:
+        client.delete(f"/document/{document_id}", headers=main_user_token_header)
+    deletions.join()
+    assert os.path.exists(path)
+
+    client.delete(f"/document/{ids[2]}", headers=main_user_token_header)
+    deletions.join()  # files are deleted after the response
+    assert not os.path.exists(path)
+    db.expire_all()
+    assert db.get(src.document.models.Blob, content_hash) is None
+
+
+def test_update_document_releases_content(
+    client: TestClient,
+    db: Session,
+    good_upload_file: UploadFile,
+    good_upload_file_2: UploadFile,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+):
+    upload = good_upload_file
+    res = client.post(
+        f"/project/{project_data.id}/documents",
+        headers=main_user_token_header,
+        files={"file": (upload.filename, upload.file, "application/pdf")},
+    )
+    document_id = res.json()["id"]
+    first_path = file_service.documents.get_file_path(
+        hashlib.sha256(b"Testing Document (1)").hexdigest()
+    )
+    assert os.path.exists(first_path)
+
+    upload = good_upload_file_2
+    res = client.put(
+        f"/document/{document_id}",
+        headers=main_user_token_header,
+        files={"file": (upload.filename, upload.file, "application/pdf")},
+    )
+
+    assert res.status_code == 200
+    deletions.join()
+    assert not os.path.exists(first_path)
+    res = client.get(f"/document/{document_id}", headers=main_user_token_header)
+    assert res.content == b"Testing Document (2)"
+
+
+def test_upload_documents(
+    client: TestClient,
+    db: Session,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+):
+    content = b"Bulk Document"
+    files = [
+        ("files", ("first.pdf", content, "application/pdf")),
+        ("files", ("notes.txt", b"Some notes", "text/plain")),
+        ("files", ("second.pdf", content, "application/pdf")),
+        ("files", ("third.pdf", b"Another Document", "application/pdf")),
+    ]
+    with patch.object(
+        file_service.documents, "save_file", wraps=file_service.documents.save_file
+    ) as save_file:
+        res = client.post(
+            f"/project/{project_data.id}/documents/bulk",
+            headers=main_user_token_header,
+            files=files,
+        )
+    assert res.status_code == 201
+    assert save_file.call_count == 2  # same content is stored once
+
+    results = res.json()
+    assert [r["filename"] for r in results] == [f[1][0] for f in files]
+    assert results[1]["document"] is None and results[1]["error"]
+    for result, (_, (name, data, _)) in zip(results, files, strict=True):
+        if result["document"] is None:
+            continue
+        assert result["document"]["name"] == name
+        document_id = result["document"]["id"]
+        res = client.get(f"/document/{document_id}", headers=main_user_token_header)
+        assert res.content == data
+
+    content_hash = hashlib.sha256(content).hexdigest()
+    assert db.get(src.document.models.Blob, content_hash).ref_count == 2  # type: ignore
+
+
+def test_upload_documents_failed(
+    client: TestClient,
+    db: Session,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+    unauthorized_user_token_header: dict[str, str],
+):
+    files = [
+        ("files", ("large.pdf", b"Large Bulk Document", "application/pdf")),
+        ("files", ("failed.pdf", b"Failed", "application/pdf")),
+        ("files", ("small.pdf", b"Small", "application/pdf")),
+    ]
+    res = client.post(
+        f"/project/{project_data.id}/documents/bulk",
+        headers=unauthorized_user_token_header,
+        files=files,
+    )
+    assert res.status_code == 401
+
+    save_file = file_service.documents.save_file
+
+    def fail_save(in_file, id, content_type=None):
+        if in_file.read(6) == b"Failed":
+            raise OSError("Storage is not available")
+        in_file.seek(0)
+        return save_file(in_file, id, content_type)
+
+    with (
+        patch("src.services.utils.MAX_UPLOAD_SIZE", 10),
+        patch.object(file_service.documents, "save_file", fail_save),
+    ):
+        res = client.post(
+            f"/project/{project_data.id}/documents/bulk",
+            headers=main_user_token_header,
+            files=files,
+        )
+    assert res.status_code == 201
+
+    large, failed, small = res.json()
+    assert large["document"] is None and "larger" in large["error"]
+    assert failed == {
+        "filename": "failed.pdf",
+        "document": None,
+        "error": "Could not save the file",
+    }
+    assert small["document"]["name"] == "small.pdf"
+
+    deletions.join()  # blob of the failed file is removed after the response
+    failed_hash = hashlib.sha256(b"Failed").hexdigest()
+    assert db.get(src.document.models.Blob, failed_hash) is None
+    res = client.get(
+        f"/project/{project_data.id}/documents", headers=main_user_token_header
+    )
+    assert [d["name"] for d in res.json()] == ["small.pdf"]
+
+
+def test_upload_documents_all_rejected(
+    client: TestClient,
+    db: Session,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+):
+    files = [
+        ("files", ("notes.txt", b"Some notes", "text/plain")),
+        ("files", ("large.pdf", b"Large Bulk Document", "application/pdf")),
+        ("files", ("failed.pdf", b"Failed", "application/pdf")),
+    ]
+
+    def fail_save(in_file, id, content_type=None):
+        raise OSError("Storage is not available")
+
+    with (
+        patch("src.services.utils.MAX_UPLOAD_SIZE", 10),
+        patch.object(file_service.documents, "save_file", fail_save),
+    ):
+        res = client.post(
+            f"/project/{project_data.id}/documents/bulk",
+            headers=main_user_token_header,
+            files=files,
+        )
+    assert res.status_code == 201
+    assert [r["document"] for r in res.json()] == [None, None, None]
+    assert all(r["error"] for r in res.json())
+
+    deletions.join()
+    failed_hash = hashlib.sha256(b"Failed").hexdigest()
+    assert db.get(src.document.models.Blob, failed_hash) is None
+    res = client.get(
+        f"/project/{project_data.id}/documents", headers=main_user_token_header
+    )
+    assert res.json() == []
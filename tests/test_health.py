@@ -1,3 +1,17 @@
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+import src.services.file_service as file_service
+from src.main import app
+from src.shared.config import DB_WARMUP_CONNECTIONS
+from src.shared.database import get_engine
+
+
 def test_health_code(client):
     response = client.get("/test")
     assert response.status_code == 200
@@ -6,3 +20,51 @@ def test_health_code(client):
 def test_health_response(client):
     response = client.get("/test")
     assert response.json() == "Success"
+
+
+def test_startup_warm_up():
+    engine = get_engine()
+    engine.dispose()
+    engine._compiled_cache.clear()  # type: ignore
+    with TestClient(app) as client:  # runs the lifespan
+        assert engine.pool.checkedin() == DB_WARMUP_CONNECTIONS  # type: ignore
+        assert len(engine._compiled_cache) > 0  # type: ignore
+        assert client.get("/test").status_code == 200
+        assert set(file_service._services) == set(file_service.SERVICES)
+    assert engine.pool.checkedin() == 0  # type: ignore
+
+
+# imported by a new process, modules and resources only needed by the requests
+#   must not be loaded by the import, see src.main.lifespan
+IMPORT_CHECK = """
+import sys
+import src.main
+import src.services.file_service as file_service
+from src.shared.database import get_engine, get_async_engine
+
+assert "boto3" not in sys.modules and "PIL" not in sys.modules
+assert not file_service._services
+assert not get_engine.cache_info().currsize
+assert not get_async_engine.cache_info().currsize
+"""
+
+# seconds, cumulative import time of src.main, generous for slow machines
+IMPORT_TIME_BUDGET = float(os.environ.get("IMPORT_TIME_BUDGET", 5))
+
+
+@pytest.mark.parametrize(
+    "env", [{}, {"RUN_CLOUD": "1", "S3_BUCKET": "bucket"}], ids=["local", "cloud"]
+)
+def test_import_time(env: dict[str, str]):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_CHECK],
+        env={**os.environ, "TEST": "1", **env},
+        cwd=os.path.join(os.path.dirname(__file__), ".."),
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    match = re.search(r"\|\s*(\d+) \| src\.main$", result.stderr, re.MULTILINE)
+    assert match is not None
+    assert int(match.group(1)) / 1e6 < IMPORT_TIME_BUDGET  # reported in us
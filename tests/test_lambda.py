@@ -0,0 +1,123 @@
+import importlib.util
+import json
+import os
+from io import BytesIO
+from types import ModuleType
+from typing import Generator
+
+import boto3
+import pytest
+from moto import mock_aws
+from PIL import Image
+
+BUCKET = "test-bucket"
+LAMBDA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "lambda",
+    "update_image",
+    "lambda_function.py",
+)
+
+
+@pytest.fixture(scope="function")
+def update_image(monkeypatch: pytest.MonkeyPatch) -> Generator[ModuleType, None, None]:
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_aws():
+        boto3.client("s3").create_bucket(Bucket=BUCKET)
+        # the client of S3 is created on import, so it is loaded inside of the mock
+        spec = importlib.util.spec_from_file_location("lambda_function", LAMBDA_PATH)
+        module = importlib.util.module_from_spec(spec)  # type: ignore
+        spec.loader.exec_module(module)  # type: ignore
+        yield module
+
+
+def _put_image(module: ModuleType, key: str) -> None:
+    image = BytesIO()
+    Image.new("RGB", (600, 300), (255, 0, 0)).save(image, "JPEG")
+    module.s3_client.put_object(Bucket=BUCKET, Key=key, Body=image.getvalue())
+
+
+def _s3_record(key: str) -> dict:
+    return {"s3": {"bucket": {"name": BUCKET}, "object": {"key": key}}}
+
+
+def _sqs_record(message_id: str, key: str) -> dict:
+    return {
+        "eventSource": "aws:sqs",
+        "messageId": message_id,
+        "body": json.dumps({"Records": [_s3_record(key)]}),
+    }
+
+
+def _keys(module: ModuleType) -> set[str]:
+    objects = module.s3_client.list_objects_v2(Bucket=BUCKET).get("Contents", [])
+    return {item["Key"] for item in objects}
+
+
+def _processed(module: ModuleType, id: str) -> set[str]:
+    return {name.replace("/", "-processed/") for name, _, _ in module.renditions(id)}
+
+
+def test_sqs_batch_reports_only_failed_messages(update_image: ModuleType):
+    _put_image(update_image, "logos/first")
+    update_image.s3_client.put_object(
+        Bucket=BUCKET, Key="logos/broken", Body=b"not an image"
+    )
+    _put_image(update_image, "logos/second")
+
+    response = update_image.lambda_handler(
+        {
+            "Records": [
+                _sqs_record("first-message", "logos/first"),
+                _sqs_record("broken-message", "logos/broken"),
+                _sqs_record("second-message", "logos/second"),
+            ]
+        },
+        None,
+    )
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "broken-message"}]}
+    keys = _keys(update_image)
+    assert _processed(update_image, "logos/first") <= keys
+    assert _processed(update_image, "logos/second") <= keys
+    # processed uploads are deleted, the failed one is kept for the retry
+    assert "logos/first" not in keys and "logos/second" not in keys
+    assert "logos/broken" in keys
+
+    body = update_image.s3_client.get_object(
+        Bucket=BUCKET, Key="logos-processed/first_64.webp"
+    )["Body"].read()
+    with Image.open(BytesIO(body)) as logo:
+        assert (logo.format, logo.size) == ("WEBP", (64, 64))
+
+
+def test_direct_invocation_raises_if_a_record_failed(update_image: ModuleType):
+    _put_image(update_image, "logos/first")
+    update_image.s3_client.put_object(
+        Bucket=BUCKET, Key="logos/broken", Body=b"not an image"
+    )
+
+    with pytest.raises(RuntimeError, match="1 of 2"):
+        update_image.lambda_handler(
+            {"Records": [_s3_record("logos/first"), _s3_record("logos/broken")]},
+            None,
+        )
+
+    # the retry of the whole event skips the processed ones
+    assert _processed(update_image, "logos/first") <= _keys(update_image)
+    update_image.process_object(BUCKET, "logos/first")
+
+
+def test_transparent_logo_on_white(update_image: ModuleType):
+    image = BytesIO()
+    Image.new("RGBA", (400, 400), (255, 0, 0, 0)).save(image, "PNG")
+
+    images = update_image.resize_image(
+        image, [("logo", 32, "jpeg"), ("logo.webp", 32, "webp")]
+    )
+
+    encoded = {name: data for name, data, _ in images}
+    with Image.open(BytesIO(encoded["logo"])) as logo:
+        assert min(logo.getpixel((16, 16))) > 250  # white instead of black
+    with Image.open(BytesIO(encoded["logo.webp"])) as logo:
+        assert logo.getpixel((16, 16))[3] == 0
@@ -1,11 +1,21 @@
 import os
+import shutil
+from io import BytesIO
 
+import pytest
 from fastapi import UploadFile
 from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy.orm import Session
 
 import src.document.models
+import src.logo.dao as logo_dao
 import src.project.models
 import src.user.models
+from src.services import file_service
+from src.services.local.images import resize_image
+from src.services.renditions import choose_logo_rendition
+from src.shared.config import LOGO_SIZE
 
 image_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample.jpg")
 
@@ -266,3 +276,143 @@ def test_delete_logo_failed(
         f"/project/{project_data.id}/logo", headers=main_user_token_header
     )
     assert res.status_code == 204
+
+
+def test_update_logo_processed(
+    client: TestClient,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+):
+    image = BytesIO()
+    Image.new("RGBA", (600, 300), (255, 0, 0, 128)).save(image, "PNG")
+    data = {"file": ("logo.png", image.getvalue(), "image/png")}
+
+    res = client.put(
+        f"/project/{project_data.id}/logo", headers=main_user_token_header, files=data
+    )
+    assert res.status_code == 201
+
+    # waits for the image to be processed
+    res = client.get(f"/project/{project_data.id}/logo", headers=main_user_token_header)
+    assert res.status_code == 200
+    with Image.open(BytesIO(res.content)) as logo:
+        assert logo.format == "JPEG"
+        assert logo.size == (LOGO_SIZE, LOGO_SIZE)
+
+
+def test_update_logo_not_an_image(
+    client: TestClient,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+):
+    data = {"file": ("logo.png", b"not an image", "image/png")}
+
+    res = client.put(
+        f"/project/{project_data.id}/logo", headers=main_user_token_header, files=data
+    )
+    assert res.status_code == 201
+
+    res = client.get(f"/project/{project_data.id}/logo", headers=main_user_token_header)
+    assert res.status_code == 404
+
+
+def test_get_logo_renditions(
+    client: TestClient,
+    logo_file: str,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+):
+    url = f"/project/{project_data.id}/logo"
+    cases = [
+        ({}, {}, "JPEG", LOGO_SIZE),
+        ({"size": 20}, {}, "JPEG", 32),
+        ({"size": 50}, {"Accept": "image/avif,image/webp,*/*"}, "WEBP", 64),
+        ({}, {"Accept": "image/webp;q=0.5,image/jpeg"}, "JPEG", LOGO_SIZE),
+        ({"size": 1000}, {"Accept": "image/webp"}, "WEBP", 400),
+    ]
+    for params, headers, format, size in cases:
+        res = client.get(
+            url, params=params, headers={**main_user_token_header, **headers}
+        )
+
+        assert res.status_code == 200
+        assert res.headers["vary"] == "accept"
+        with Image.open(BytesIO(res.content)) as logo:
+            assert (logo.format, logo.size[0]) == (format, min(size, 200))
+            assert res.headers["content-type"] == f"image/{format.lower()}"
+
+
+def test_choose_logo_rendition():
+    assert choose_logo_rendition("id", None, None) == ("id", LOGO_SIZE, "jpeg")
+    assert choose_logo_rendition("id", 64, "*/*") == ("id_64.jpeg", 64, "jpeg")
+    assert choose_logo_rendition("id", 33, "image/webp") == ("id_64.webp", 64, "webp")
+    assert choose_logo_rendition("id", None, "image/webp;q=0") == (
+        "id",
+        LOGO_SIZE,
+        "jpeg",
+    )
+
+
+def test_resize_image(tmp_path):
+    source = tmp_path / "source"
+    Image.new("RGB", (6000, 4000), "red").save(source, "JPEG")
+    targets = [(str(tmp_path / f"logo_{size}"), size, "jpeg") for size in (32, 400)]
+
+    resize_image(str(source), targets)
+
+    assert not source.exists()
+    for path, size, _ in targets:
+        with Image.open(path) as logo:
+            assert logo.size == (size, size)
+            assert logo.getpixel((size // 2, size // 2))[0] > 250
+
+
+def test_resize_image_transparent(tmp_path):
+    source = tmp_path / "source"
+    Image.new("RGBA", (400, 400), (255, 0, 0, 0)).save(source, "PNG")
+    targets = [(str(tmp_path / f"logo.{f}"), 32, f) for f in ("jpeg", "webp")]
+
+    resize_image(str(source), targets)
+
+    with Image.open(tmp_path / "logo.jpeg") as logo:
+        assert min(logo.getpixel((16, 16))) > 250  # white instead of black
+    with Image.open(tmp_path / "logo.webp") as logo:
+        assert logo.mode == "RGBA"
+        assert logo.getpixel((16, 16))[3] == 0
+
+
+def test_resize_image_too_large(tmp_path):
+    source = tmp_path / "source"
+    Image.new("RGB", (2000, 1000)).save(source, "PNG")
+
+    with pytest.raises(Image.DecompressionBombError):
+        resize_image(
+            str(source), [(str(tmp_path / "logo"), 32, "jpeg")], max_pixels=10**6
+        )
+
+    assert not source.exists()
+    assert not (tmp_path / "logo").exists()
+
+
+def test_get_logo_without_renditions(
+    client: TestClient,
+    db: Session,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+):
+    # processed before the renditions were added, stored only as "<id>"
+    logo_id = logo_dao.create_logo(db, project_data)
+    shutil.copy(image_path, file_service.logos.get_file_path(logo_id))
+
+    url = f"/project/{project_data.id}/logo"
+    for params in ({}, {"size": 20}):
+        res = client.get(
+            url,
+            params=params,
+            headers={**main_user_token_header, "Accept": "image/webp,*/*"},
+        )
+
+        assert res.status_code == 200
+        assert res.headers["content-type"] == "image/jpeg"
+        assert res.content == open(image_path, "rb").read()
+    file_service.logos.delete_file_by_id(logo_id)
@@ -0,0 +1,91 @@
+import json
+import logging
+from typing import Generator
+
+import pytest
+from asgi_correlation_id import correlation_id
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+import src.project.models
+from src.shared.logs import (
+    LOGGERS,
+    DroppingQueueHandler,
+    JSONFormatter,
+    configure_logging,
+    log,
+    stop_logging,
+)
+
+
+@pytest.fixture(scope="function")
+def reset_logging() -> Generator[None, None, None]:
+    yield
+    stop_logging()
+    for name in LOGGERS:  # handlers write to the stream captured by the test
+        logging.getLogger(name).handlers.clear()
+
+
+def test_queued_logging(reset_logging: None, capsys: pytest.CaptureFixture[str]):
+    configure_logging()  # console writes to the stream captured by capsys
+    token = correlation_id.set("request-1")
+    try:
+        log.warning("Queued %s", "record")
+    finally:
+        correlation_id.reset(token)
+
+    stop_logging()  # writes the queued records
+    output = capsys.readouterr().err
+    assert "[request-1] Queued record" in output
+
+
+def test_queue_handler_drops_records():
+    def dropped() -> float:
+        return REGISTRY.get_sample_value("log_records_dropped_total") or 0
+
+    handler = DroppingQueueHandler(1)
+    before = dropped()
+    handler.handle(logging.makeLogRecord({"msg": "first %s", "args": ("record",)}))
+    handler.handle(logging.makeLogRecord({"msg": "second"}))
+
+    assert dropped() == before + 1
+    assert handler.queue.get_nowait().getMessage() == "first record"
+    assert handler.queue.empty()
+
+
+def test_json_formatter():
+    record = logging.makeLogRecord(
+        {
+            "name": "app.access",
+            "levelname": "INFO",
+            "msg": "GET %s",
+            "args": ("/test",),
+            "correlation_id": "request-1",
+            "status": 200,
+        }
+    )
+    entry = json.loads(JSONFormatter().format(record))
+
+    assert entry["message"] == "GET /test"
+    assert entry["logger"] == "app.access"
+    assert entry["correlation_id"] == "request-1"
+    assert entry["status"] == 200
+    assert "msg" not in entry and "args" not in entry
+
+
+def test_access_log(
+    client: TestClient,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+    caplog: pytest.LogCaptureFixture,
+):
+    with caplog.at_level(logging.INFO, logger="app.access"):
+        res = client.get(f"/project/{project_data.id}", headers=main_user_token_header)
+    assert res.status_code == 200
+
+    (record,) = [r for r in caplog.records if r.name == "app.access"]
+    assert record.route == "/project/{project_id}"  # type: ignore
+    assert record.status == 200  # type: ignore
+    assert record.db_queries > 0  # type: ignore
+    assert 0 < record.db_duration_ms <= record.duration_ms  # type: ignore
+    assert record.getMessage().startswith("GET /project/{project_id} 200 ")
@@ -0,0 +1,76 @@
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+import src.project.models
+from src.services import file_service
+from src.shared.database import get_engine
+
+
+def test_metrics_pool_gauges(client: TestClient):
+    get_engine()  # gauges are registered with the engine, created on first use
+    res = client.get("/metrics")
+
+    assert res.status_code == 200
+    assert 'db_pool_size{engine="sync"}' in res.text
+    assert 'db_pool_saturation{engine="sync"}' in res.text
+
+
+def test_metrics_pool_checkout_wait(client: TestClient):
+    with get_engine().connect():
+        res = client.get("/metrics")
+
+    assert 'db_pool_checked_out{engine="sync"} 1.0' in res.text
+    assert 'db_pool_checkout_wait_seconds_count{engine="sync"}' in res.text
+
+
+def sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_metrics_requests_and_queries(
+    client: TestClient,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+):
+    route = {"method": "GET", "route": "/project/{project_id}", "status": "200"}
+    requests = sample("http_request_duration_seconds_count", **route)
+    queries = sample("db_query_duration_seconds_count", engine="other")
+
+    client.get(f"/project/{project_data.id}", headers=main_user_token_header)
+
+    assert sample("http_request_duration_seconds_count", **route) == requests + 1
+    # the tests use their own engine, without the labeled pool
+    assert sample("db_query_duration_seconds_count", engine="other") > queries
+    assert sample("password_hash_duration_seconds_count", operation="hash") > 0
+
+    client.get("/missing/1")
+    client.get("/missing/2")
+    unmatched = {"method": "GET", "route": "unmatched", "status": "404"}
+    assert sample("http_request_duration_seconds_count", **unmatched) >= 2
+
+
+def test_metrics_file_operations(
+    client: TestClient,
+    project_data: src.project.models.Project,
+    main_user_token_header: dict[str, str],
+):
+    labels = {"backend": "local", "operation": "save_file"}
+    saved = sample("file_operation_bytes_total", **labels)
+    saves = sample("file_operation_duration_seconds_count", **labels)
+
+    content = b"Measured Document"
+    res = client.post(
+        f"/project/{project_data.id}/documents",
+        headers=main_user_token_header,
+        files={"file": ("measured.pdf", content, "application/pdf")},
+    )
+    client.get(f"/document/{res.json()['id']}", headers=main_user_token_header)
+
+    assert sample("file_operation_bytes_total", **labels) == saved + len(content)
+    assert sample("file_operation_duration_seconds_count", **labels) == saves + 1
+    download = {"backend": "local", "operation": "download_file"}
+    assert sample("file_operation_bytes_total", **download) >= len(content)
+
+    file_service.get_file_service("logos")  # gauge is registered by the service
+    res = client.get("/metrics")
+    assert "logo_processing_pending 0.0" in res.text
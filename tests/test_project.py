@@ -1,7 +1,23 @@
+import hashlib
+import os
+from datetime import datetime
+from typing import Any, Callable, ContextManager
+
 from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
 
+import src.logo.dao as logo_dao
+import src.project.dao as project_dao
+import src.project.dto
 import src.project.models
+import src.project.permission_cache as permission_cache
 import src.user.models
+from src.services import file_service
+from src.services.deletion import deletions
+from src.services.renditions import logo_renditions
+from src.shared.database import CountStrategy, count_total, encode_cursor
+
+image_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample.jpg")
 
 
 def test_projects_accessible_to_authorized(
@@ -9,14 +25,19 @@ def test_projects_accessible_to_authorized(
     authorized_users_token_header: list[dict[str, str]],
     project_data_list: list[src.project.models.Project],
 ):
-    for user_header in authorized_users_token_header:
+    roles = ["OWNER", "PARTICIPANT"]  # of the main and the participant users
+    for user_header, role in zip(authorized_users_token_header, roles, strict=True):
         res = client.get("/project/", headers=user_header)
-
         assert res.json() == [
-            {"name": p.name, "description": p.description, "id": p.id}
+            {"name": p.name, "description": p.description, "id": p.id, "role": role}
             for p in project_data_list
         ]
 
+        res = client.get("/project/", headers=user_header, params={"cursor": ""})
+        assert [(p["id"], p["role"]) for p in res.json()["items"]] == [
+            (p.id, role) for p in project_data_list
+        ]
+
 
 def test_projects_accessible_to_unauthorized(
     client: TestClient,
@@ -131,6 +152,37 @@ def test_delete_project_owner(
     assert res.status_code == 204
 
 
+def test_delete_project_files(
+    client: TestClient,
+    db: Session,
+    main_user_token_header: dict[str, str],
+    project_data: src.project.models.Project,
+):
+    res = client.post(
+        f"/project/{project_data.id}/documents",
+        headers=main_user_token_header,
+        files={"file": ("document.pdf", b"Project Document", "application/pdf")},
+    )
+    document_path = file_service.documents.get_file_path(
+        hashlib.sha256(b"Project Document").hexdigest()
+    )
+    logo_id = logo_dao.create_logo(db, project_data)
+    file_service.logos.save_file(open(image_path, "rb"), logo_id)
+    file_service.logos.download_file(logo_id)  # waits for the processing
+    assert os.path.exists(document_path)
+
+    project_id = project_data.id
+    res = client.delete(f"/project/{project_id}", headers=main_user_token_header)
+    deletions.join()
+
+    assert res.status_code == 204
+    db.expire_all()
+    assert project_dao.get_project(db, project_id) is None
+    assert not os.path.exists(document_path)
+    for rendition in logo_renditions(logo_id):
+        assert not os.path.exists(file_service.logos.get_file_path(rendition.name))
+
+
 def test_delete_project_participant(
     client: TestClient,
     participant_user_token_header: dict[str, str],
@@ -204,3 +256,183 @@ def test_project_invite_unauthorized(
     )
 
     assert res.status_code == 401
+
+
+def test_projects_cursor_pagination(
+    client: TestClient,
+    main_user_token_header: dict[str, str],
+    project_data_list: list[src.project.models.Project],
+):
+    res = client.get(
+        "/project/", headers=main_user_token_header, params={"cursor": "", "limit": 2}
+    )
+    first_page = res.json()
+
+    assert res.status_code == 200
+    assert first_page["count"] == 2
+    assert first_page["next_cursor"] is not None
+
+    res = client.get(
+        "/project/",
+        headers=main_user_token_header,
+        params={"cursor": first_page["next_cursor"], "limit": 2},
+    )
+    second_page = res.json()
+
+    assert res.status_code == 200
+    assert second_page["count"] == 1
+    assert second_page["next_cursor"] is None
+    assert [p["id"] for p in first_page["items"] + second_page["items"]] == [
+        p.id for p in project_data_list
+    ]
+
+
+def test_projects_cursor_pagination_invalid_cursor(
+    client: TestClient,
+    main_user_token_header: dict[str, str],
+):
+    res = client.get(
+        "/project/", headers=main_user_token_header, params={"cursor": "not a cursor"}
+    )
+    assert res.status_code == 422
+
+    # valid structure, but the id of a project is an integer
+    for id in ("1", True, None):
+        cursor = encode_cursor(datetime(2024, 1, 1), id)  # type: ignore
+        res = client.get(
+            "/project/", headers=main_user_token_header, params={"cursor": cursor}
+        )
+        assert res.status_code == 422
+
+
+def test_accessible_projects_single_query(
+    db: Session,
+    count_queries: Callable[[], ContextManager[list[str]]],
+    main_user: src.user.models.User,
+    project_data_list: list[src.project.models.Project],
+):
+    user_id = main_user.id
+    db.expire_all()
+    with count_queries() as statements:
+        projects = project_dao.get_accessible_projects(db, user_id)
+        listing = [(p.id, p.name, p.description, role) for p, role in projects]
+
+    assert len(statements) == 1
+    assert listing == [
+        (p.id, p.name, p.description, src.project.models.PermissionType.owner)
+        for p in project_data_list
+    ]
+
+
+def test_accessible_projects_endpoint_single_listing_query(
+    client: TestClient,
+    count_queries: Callable[[], ContextManager[list[str]]],
+    participant_user_token_header: dict[str, str],
+    project_data_list: list[src.project.models.Project],
+):
+    with count_queries() as statements:
+        res = client.get("/project/", headers=participant_user_token_header)
+
+    assert len(res.json()) == len(project_data_list)
+    assert len([s for s in statements if "FROM projects" in s]) == 1
+
+
+def test_projects_cursor_pagination_total(
+    client: TestClient,
+    main_user_token_header: dict[str, str],
+    project_data_list: list[src.project.models.Project],
+):
+    def first_page(count: str) -> Any:
+        res = client.get(
+            "/project/",
+            headers=main_user_token_header,
+            params={"cursor": "", "limit": 1, "count": count},
+        )
+        assert res.status_code == 200
+        return res.json()
+
+    assert first_page("none")["total"] is None
+    assert first_page("none")["has_more"] is True
+    assert first_page("exact")["total"] == len(project_data_list)
+    assert first_page("cached")["total"] == len(project_data_list)
+    assert first_page("estimate")["total"] >= 1
+
+
+def test_cached_total_invalidated_on_insert(
+    db: Session,
+    count_queries: Callable[[], ContextManager[list[str]]],
+    main_user: src.user.models.User,
+    project_data_list: list[src.project.models.Project],
+):
+    query = project_dao.accessible_projects_query(main_user.id)
+
+    assert count_total(db, query, CountStrategy.cached) == len(project_data_list)
+    with count_queries() as statements:
+        assert count_total(db, query, CountStrategy.cached) == len(project_data_list)
+    assert statements == []
+
+    project_dao.create_project(
+        db, src.project.dto.ProjectCreate(name="Another Project"), main_user
+    )
+    assert count_total(db, query, CountStrategy.cached) == len(project_data_list) + 1
+
+
+def test_project_role_cached_between_requests(
+    client: TestClient,
+    count_queries: Callable[[], ContextManager[list[str]]],
+    main_user_token_header: dict[str, str],
+    project_data: src.project.models.Project,
+):
+    client.get(f"/project/{project_data.id}", headers=main_user_token_header)
+    with count_queries() as statements:
+        res = client.get(f"/project/{project_data.id}", headers=main_user_token_header)
+
+    assert res.status_code == 200
+    assert not [s for s in statements if "FROM permissions" in s]
+
+
+def test_project_role_cache_invalidated_on_grant(
+    client: TestClient,
+    main_user_token_header: dict[str, str],
+    unauthorized_user: src.user.models.User,
+    unauthorized_user_token_header: dict[str, str],
+    project_data: src.project.models.Project,
+):
+    url = f"/project/{project_data.id}"
+    assert client.get(url, headers=unauthorized_user_token_header).status_code == 401
+    # missing roles are not cached, so a stale one is left e.g. by another worker
+    permission_cache.set_role(
+        project_data.id, unauthorized_user.id, src.project.models.PermissionType.owner
+    )
+
+    client.post(
+        f"{url}/invite",
+        headers=main_user_token_header,
+        params={"login": unauthorized_user.login},
+    )
+    assert permission_cache.get_role(project_data.id, unauthorized_user.id) is None
+    assert client.get(url, headers=unauthorized_user_token_header).status_code == 200
+    assert (
+        permission_cache.get_role(project_data.id, unauthorized_user.id)
+        == src.project.models.PermissionType.participant
+    )
+
+
+def test_project_role_cache_invalidated_on_delete(
+    client: TestClient,
+    main_user: src.user.models.User,
+    main_user_token_header: dict[str, str],
+    project_data: src.project.models.Project,
+):
+    project_id = project_data.id
+    url = f"/project/{project_id}"
+    assert client.get(url, headers=main_user_token_header).status_code == 200
+    assert (
+        permission_cache.get_role(project_id, main_user.id)
+        == src.project.models.PermissionType.owner
+    )
+
+    assert client.delete(url, headers=main_user_token_header).status_code == 204
+    assert permission_cache.get_role(project_id, main_user.id) is None
+    # with the stale role the request would pass the check and get 404
+    assert client.get(url, headers=main_user_token_header).status_code == 401
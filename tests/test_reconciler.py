@@ -0,0 +1,78 @@
+import os
+from pathlib import Path
+from time import time
+
+import pytest
+from sqlalchemy.orm import Session
+
+import src.document.dao as document_dao
+import src.document.models
+import src.project.models
+from src.services import file_service
+from src.services.local.file_service import LocalFileService
+from src.services.reconciler import reconcile
+
+
+@pytest.fixture(autouse=True)
+def temporary_file_services(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    # reconcile deletes every unknown file, so not the ones of the local development
+    for name in file_service.SERVICES:
+        folder = tmp_path / name
+        folder.mkdir()
+        monkeypatch.setitem(file_service._services, name, LocalFileService(str(folder)))
+
+
+def _touch(id: str, age: float) -> str:
+    path = file_service.documents.get_file_path(id)
+    with open(path, "wb") as f:
+        f.write(b"Orphaned Document")
+    os.utime(path, (time() - age, time() - age))
+    return path
+
+
+def test_reconcile_deletes_orphans(
+    db: Session, document_data: src.document.models.Document
+):
+    old_orphan = _touch("old-orphan", 7200)
+    new_orphan = _touch("new-orphan", 0)  # e.g. an upload in progress
+    document_path = file_service.documents.get_file_path(document_data.id)
+    os.utime(document_path, (time() - 7200, time() - 7200))
+
+    reconcile(db, grace=3600)
+
+    assert not os.path.exists(old_orphan)
+    assert os.path.exists(new_orphan)
+    assert os.path.exists(document_path)
+    os.remove(new_orphan)
+
+
+def test_reconcile_deletes_unreferenced_blobs(
+    db: Session, project_data: src.project.models.Project
+):
+    document_dao.acquire_blob(db, "unreferenced-blob")
+    document_dao.release_blob(db, "unreferenced-blob")
+    db.commit()
+    path = _touch("unreferenced-blob", 0)
+
+    reconcile(db, grace=0)
+
+    assert not os.path.exists(path)
+    assert db.get(src.document.models.Blob, "unreferenced-blob") is None
+
+
+def test_reconcile_keeps_hidden_files(tmp_path: Path, db: Session):
+    # e.g. .gitkeep, the streamed uploads and the sources of the logos in progress
+    hidden = [
+        tmp_path / "documents" / ".gitkeep",
+        tmp_path / "documents" / ".upload-in-progress",
+        tmp_path / "logos" / ".logo-id.source",
+    ]
+    for path in hidden:
+        path.write_bytes(b"")
+        os.utime(path, (time() - 7200, time() - 7200))
+    orphan = _touch("orphan", 7200)
+
+    assert reconcile(db, grace=0) == 1
+
+    assert not os.path.exists(orphan)
+    assert all(path.exists() for path in hidden)
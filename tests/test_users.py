@@ -1,7 +1,16 @@
+from threading import Event
+from typing import Callable, ContextManager
+from unittest.mock import patch
+
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
 
+import src.auth.dto
+import src.auth.utils as auth_utils
 import src.project.models
+import src.user.dependencies as user_deps
 import src.user.models
 
 
@@ -86,3 +95,72 @@ def test_user_login_fails(
     res = client.post("/login", json=data)
 
     assert res.status_code == 403
+
+
+def test_user_login_rejected_when_password_pool_is_full(
+    client: TestClient,
+    main_user: src.user.models.User,
+):
+    pool = auth_utils.PasswordPool(workers=1, queue_size=0)
+    release = Event()
+    pool.submit(release.wait)
+
+    with patch.object(auth_utils, "password_pool", pool):
+        data = {"login": main_user.login, "password": "C0mplex P455w0rd"}
+        res = client.post("/login", json=data)
+    release.set()
+
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+
+
+def test_current_user_cached(
+    db: Session,
+    count_queries: Callable[[], ContextManager[list[str]]],
+    main_user: src.user.models.User,
+    main_user_token: src.auth.dto.Token,
+):
+    user_deps.get_current_user(main_user_token.access_token, db)
+    db.expunge_all()
+    with count_queries() as statements:
+        user = user_deps.get_current_user(main_user_token.access_token, db)
+
+    assert statements == []
+    assert (user.id, user.login) == (main_user.id, main_user.login)
+    assert user in db
+
+
+def test_current_user_cache_invalidated_on_update(
+    db: Session,
+    main_user: src.user.models.User,
+    main_user_token: src.auth.dto.Token,
+):
+    user_deps.get_current_user(main_user_token.access_token, db)
+    main_user.login = "renamed_test_user"
+    db.commit()
+    db.expunge_all()
+
+    user = user_deps.get_current_user(main_user_token.access_token, db)
+    assert user.login == "renamed_test_user"
+
+
+def test_current_user_cache_invalidated_on_delete(
+    db: Session,
+    make_user: Callable[[str], src.user.models.User],
+    make_token: Callable[[src.user.models.User], src.auth.dto.Token],
+):
+    user = make_user("deleted_test_user")
+    token = make_token(user).access_token
+    user_deps.get_current_user(token, db)  # the token and the user are cached
+    db.delete(user)
+    db.commit()
+
+    with pytest.raises(HTTPException) as e:
+        user_deps.get_current_user(token, db)
+    assert e.value.status_code == 401
+
+
+def test_current_user_invalid_token(db: Session):
+    with pytest.raises(HTTPException) as e:
+        user_deps.get_current_user("not a token", db)
+    assert e.value.status_code == 401